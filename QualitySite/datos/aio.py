@@ -0,0 +1,27 @@
+"""
+Consultas desde vistas async.
+
+Los métodos async del ORM (aget, acount, ...) delegan en un único hilo por
+request (thread_sensitive=True), así que no corren en paralelo. Acá cada
+consulta va a un hilo del pool con sync_to_async(thread_sensitive=False): las
+conexiones de Django son por hilo, así que cada una usa su propia conexión y
+varias consultas independientes se ejecutan a la vez en la base.
+"""
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+
+
+def _in_worker(func, args, kwargs):
+    try:
+        return func(*args, **kwargs)
+    finally:
+        # Los hilos del pool no reciben request_finished: se libera acá su
+        # conexión (respeta CONN_MAX_AGE)
+        close_old_connections()
+
+
+async def run_query(func, *args, **kwargs):
+    """
+    Ejecuta una función de consulta síncrona en un hilo del pool con su propia conexión
+    """
+    return await sync_to_async(_in_worker, thread_sensitive=False)(func, args, kwargs)
@@ -0,0 +1,129 @@
+"""
+Versiones async (ASGI) de las vistas analíticas.
+
+Son vistas de Django (DRF no soporta handlers async) que comparten caché y
+ETags con las vistas síncronas del mismo endpoint. Las consultas
+independientes de cada respuesta corren en paralelo, cada una con su propia
+conexión (ver aio.run_query): la latencia del dashboard pasa a ser la de su
+sección más lenta en lugar de la suma.
+"""
+from datetime import timedelta
+from django.http import JsonResponse
+from django.utils import timezone
+from django.views import View
+from rest_framework import status
+from .aio import run_query
+from .cache import AsyncCachedAnalyticsMixin
+from .queries.dashboard_queries import aget_dashboard_summary
+from .queries.mqs_queries import get_top_failures_by_family, get_station_performance
+from .queries.yield_queries import aget_yield_complete_stats
+from .views import MAX_DASHBOARD_DAYS, MAX_TOP_FAILURES_LIMIT
+
+
+class AsyncDashboardView(AsyncCachedAnalyticsMixin, View):
+    """
+    Dashboard principal con las secciones consultadas en paralelo
+    """
+    cache_endpoint = 'dashboard'
+
+    async def get(self, request):
+        try:
+            days = int(request.GET.get('days', 7))
+            if not 1 <= days <= MAX_DASHBOARD_DAYS:
+                raise ValueError
+        except ValueError:
+            return JsonResponse({"error": f"days debe ser un entero entre 1 y {MAX_DASHBOARD_DAYS}"},
+                                status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            today = timezone.now().date()
+            return await self.cached_response(
+                request,
+                lambda: aget_dashboard_summary(date=today, days_back=days),
+                today - timedelta(days=days), today,
+                extra=today,
+            )
+        except Exception as e:
+            return JsonResponse({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class AsyncYieldStatsView(AsyncCachedAnalyticsMixin, View):
+    """
+    Estadísticas completas de Yield (Yield y reparaciones MES en paralelo)
+    """
+    cache_endpoint = 'yield-stats'
+
+    async def get(self, request):
+        date_from = request.GET.get('date_from')
+        date_to = request.GET.get('date_to')
+        family = request.GET.get('family')
+        line = request.GET.get('line')
+
+        if not date_from or not date_to:
+            return JsonResponse({"error": "Se requieren parámetros date_from y date_to"},
+                                status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            return await self.cached_response(
+                request,
+                lambda: aget_yield_complete_stats(date_from, date_to, family, line),
+                date_from, date_to,
+            )
+        except Exception as e:
+            return JsonResponse({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class AsyncTopFailuresView(AsyncCachedAnalyticsMixin, View):
+    """
+    Top de fallas por familia
+    """
+    cache_endpoint = 'top-failures'
+    cache_sources = ('mqs',)
+
+    async def get(self, request):
+        family = request.GET.get('family')
+        date_from = request.GET.get('date_from')
+        date_to = request.GET.get('date_to')
+        try:
+            limit = int(request.GET.get('limit', 10))
+            if not 1 <= limit <= MAX_TOP_FAILURES_LIMIT:
+                raise ValueError
+        except ValueError:
+            return JsonResponse({"error": f"limit debe ser un entero entre 1 y {MAX_TOP_FAILURES_LIMIT}"},
+                                status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            return await self.cached_response(
+                request,
+                lambda: run_query(lambda: list(get_top_failures_by_family(family, limit, date_from, date_to))),
+                date_from, date_to,
+            )
+        except Exception as e:
+            return JsonResponse({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class AsyncStationPerformanceView(AsyncCachedAnalyticsMixin, View):
+    """
+    Rendimiento de estaciones
+    """
+    cache_endpoint = 'station-performance'
+    cache_sources = ('mqs',)
+
+    async def get(self, request):
+        date_from = request.GET.get('date_from')
+        date_to = request.GET.get('date_to')
+        line = request.GET.get('line')
+        family = request.GET.get('family')
+
+        if not date_from or not date_to:
+            return JsonResponse({"error": "Se requieren parámetros date_from y date_to"},
+                                status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            return await self.cached_response(
+                request,
+                lambda: run_query(lambda: list(get_station_performance(date_from, date_to, line, family))),
+                date_from, date_to,
+            )
+        except Exception as e:
+            return JsonResponse({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
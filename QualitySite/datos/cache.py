@@ -0,0 +1,134 @@
+import hashlib
+import json
+from datetime import date, timedelta
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponseNotModified, JsonResponse
+from asgiref.sync import sync_to_async
+from rest_framework import status
+from rest_framework.response import Response
+
+# Fuentes de datos que invalidan la caché de las vistas analíticas
+SOURCES = ('mqs', 'mes', 'yield')
+
+
+def _version_key(source, month=None):
+    return f"analytics:version:{source}:{month or 'all'}"
+
+
+def _months(date_from, date_to):
+    meses = []
+    actual = date_from.replace(day=1)
+    while actual <= date_to:
+        meses.append(actual.strftime('%Y-%m'))
+        actual = (actual + timedelta(days=32)).replace(day=1)
+    return meses
+
+
+def _parse_date(value):
+    if isinstance(value, date):
+        return value
+    try:
+        return date.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def invalidate(source, dates=()):
+    """
+    Versiona la caché de una fuente después de que una importación guarda filas.
+
+    Se incrementa la versión global de la fuente y la de cada mes afectado: las
+    consultas acotadas a meses sin cambios siguen sirviéndose desde la caché.
+    """
+    keys = {_version_key(source)} | {_version_key(source, d.strftime('%Y-%m')) for d in dates}
+    for key in keys:
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, None)
+
+
+def _versions(sources, date_from=None, date_to=None):
+    date_from, date_to = _parse_date(date_from), _parse_date(date_to)
+    if date_from and date_to and date_from <= date_to:
+        keys = [_version_key(s, m) for s in sources for m in _months(date_from, date_to)]
+    else:
+        keys = [_version_key(s) for s in sources]
+    found = cache.get_many(keys)
+    return [found.get(key, 0) for key in keys]
+
+
+def _cache_key(endpoint, params, versions, extra=None):
+    normalizados = sorted((k, sorted(params.getlist(k))) for k in params)
+    raw = json.dumps([endpoint, normalizados, versions, extra], cls=DjangoJSONEncoder)
+    return f"analytics:{endpoint}:{hashlib.md5(raw.encode()).hexdigest()}"
+
+
+def versioned_keys(namespace, parts_list, sources=SOURCES, date_from=None, date_to=None):
+    """
+    Claves de caché para resultados intermedios (uno por elemento de
+    `parts_list`) que quedan invalidadas junto con las versiones de las fuentes
+    """
+    versions = _versions(sources, date_from, date_to)
+    claves = []
+    for parts in parts_list:
+        raw = json.dumps([namespace, parts, versions], cls=DjangoJSONEncoder)
+        claves.append(f"analytics:{namespace}:{hashlib.md5(raw.encode()).hexdigest()}")
+    return claves
+
+
+def _entry(data):
+    body = json.dumps(data, cls=DjangoJSONEncoder)
+    return {
+        'data': json.loads(body),
+        'etag': f'"{hashlib.md5(body.encode()).hexdigest()}"',
+    }
+
+
+class CachedAnalyticsMixin:
+    """
+    Cachea la respuesta de una vista analítica por endpoint + parámetros
+    normalizados + versión de las fuentes, y responde con ETag / 304.
+    """
+    cache_endpoint = None
+    cache_sources = SOURCES
+
+    def cached_response(self, request, compute, date_from=None, date_to=None, extra=None):
+        versions = _versions(self.cache_sources, date_from, date_to)
+        key = _cache_key(self.cache_endpoint, request.query_params, versions, extra)
+
+        entry = cache.get(key)
+        if entry is None:
+            entry = _entry(compute())
+            cache.set(key, entry, settings.ANALYTICS_CACHE_TIMEOUT)
+
+        headers = {'ETag': entry['etag']}
+        if entry['etag'] in request.headers.get('If-None-Match', ''):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        return Response(entry['data'], headers=headers)
+
+
+class AsyncCachedAnalyticsMixin:
+    """
+    Igual que CachedAnalyticsMixin para vistas async de Django: `compute` es
+    una corrutina y la respuesta es un JsonResponse. Comparte claves y ETags con
+    la vista síncrona del mismo endpoint.
+    """
+    cache_endpoint = None
+    cache_sources = SOURCES
+
+    async def cached_response(self, request, compute, date_from=None, date_to=None, extra=None):
+        versions = await sync_to_async(_versions)(self.cache_sources, date_from, date_to)
+        key = _cache_key(self.cache_endpoint, request.GET, versions, extra)
+
+        entry = await cache.aget(key)
+        if entry is None:
+            entry = _entry(await compute())
+            await cache.aset(key, entry, settings.ANALYTICS_CACHE_TIMEOUT)
+
+        headers = {'ETag': entry['etag']}
+        if entry['etag'] in request.headers.get('If-None-Match', ''):
+            return HttpResponseNotModified(headers=headers)
+        return JsonResponse(entry['data'], safe=False, headers=headers)
@@ -0,0 +1,200 @@
+"""
+Snapshots columnares (Parquet) particionados por fecha de MQS, MES y YieldTurno.
+
+Estructura: <PARQUET_EXPORT_ROOT>/<dataset>/date=YYYY-MM-DD/part-0.parquet
+(particionado estilo Hive, legible con pyarrow.dataset, pandas, DuckDB o Polars).
+pyarrow es una dependencia opcional: solo se necesita para exportar.
+"""
+import logging
+import os
+import threading
+from datetime import date, timedelta
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection, models, transaction
+from django.utils import timezone
+from .models import MES, MQS, MQS_DIMENSION_FIELDS, ExportRun, YieldTurno, dimension_field
+
+logger = logging.getLogger(__name__)
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - dependencia opcional
+    pa = pq = None
+
+EXPORT_CHUNK_SIZE = 5000
+# Una ExportRun 'running' más vieja se da por perdida (p. ej. se reinició el worker)
+EXPORT_RUN_TIMEOUT = timedelta(hours=2)
+PARTITION_FILE = 'part-0.parquet'
+
+# dataset -> (modelo, campo de fecha de partición, columnas categóricas)
+DATASETS = {
+    'mqs': (MQS, 'date', ['Line', 'Family', 'Model', 'Process', 'Station', 'Fixture', 'Testcode', 'Testcode_Desc']),
+    'mes': (MES, 'FECHA_REPARACION', ['MODELO', 'POSICION', 'FUNCION', 'CODIGO_FALLA', 'CAUSA', 'ORIGEN', 'REPARADOR']),
+    'yield': (YieldTurno, 'date', ['Name', 'Jornada', 'Turno', 'Line', 'Family', 'Process']),
+}
+
+
+def require_pyarrow():
+    if pa is None:
+        raise ImproperlyConfigured("La exportación Parquet requiere pyarrow (pip install pyarrow)")
+
+
+def export_root():
+    return getattr(settings, 'PARQUET_EXPORT_ROOT', settings.BASE_DIR / 'exports')
+
+
+def partition_path(dataset, fecha):
+    return os.path.join(export_root(), dataset, f"date={fecha.isoformat()}", PARTITION_FILE)
+
+
+def _arrow_type(field):
+    if isinstance(field, models.DateTimeField):
+        return pa.timestamp('us', tz='UTC')
+    if isinstance(field, models.DateField):
+        return pa.date32()
+    if isinstance(field, models.TimeField):
+        return pa.time64('us')
+    if isinstance(field, models.BooleanField):
+        return pa.bool_()
+    if isinstance(field, models.FloatField):
+        return pa.float64()
+    if isinstance(field, (models.IntegerField, models.AutoField)):
+        return pa.int64()
+    return pa.string()
+
+
+def _columns(dataset):
+    """
+    [(nombre, campo)] de las columnas exportadas. Las FKs de dimensión no se
+    exportan: MQS exporta el texto de cada dimensión (con dictionary encoding)
+    """
+    model, date_field, _ = DATASETS[dataset]
+    if model is MQS:
+        return [
+            (nombre, dimension_field(nombre) if nombre in MQS_DIMENSION_FIELDS else model._meta.get_field(nombre))
+            for nombre in MQS.API_FIELDS if nombre != date_field
+        ]
+    return [(f.attname, f) for f in model._meta.concrete_fields if f.attname != date_field and not f.is_relation]
+
+
+def write_partition(dataset, fecha):
+    """
+    Escribe (o reescribe) la partición de una fecha; devuelve la cantidad de filas.
+    Las columnas categóricas se guardan con dictionary encoding.
+    """
+    require_pyarrow()
+    model, date_field, categoricas = DATASETS[dataset]
+    columnas = _columns(dataset)
+    nombres = [nombre for nombre, _ in columnas]
+
+    valores = [[] for _ in columnas]
+    queryset = model.objects.filter(**{date_field: fecha})
+    if hasattr(queryset, 'with_names'):
+        queryset = queryset.with_names()
+    filas = queryset.order_by('id').values_list(*nombres).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    for fila in filas:
+        for columna, valor in zip(valores, fila):
+            columna.append(valor)
+
+    arrays = []
+    for (nombre, campo), columna in zip(columnas, valores):
+        array = pa.array(columna, type=_arrow_type(campo))
+        if nombre in categoricas:
+            array = array.dictionary_encode()
+        arrays.append(array)
+    tabla = pa.Table.from_arrays(arrays, names=nombres)
+
+    path = partition_path(dataset, fecha)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Escritura atómica: los lectores nunca ven un archivo a medio escribir
+    temporal = f"{path}.tmp"
+    pq.write_table(tabla, temporal, compression='zstd', use_dictionary=categoricas)
+    os.replace(temporal, path)
+    return tabla.num_rows
+
+
+def export_dataset(dataset, date_from=None, date_to=None, refresh_days=2, force=False):
+    """
+    Exporta las particiones que faltan. Las de los últimos `refresh_days` días
+    (que todavía reciben filas) se reescriben siempre; con `force` se reescribe
+    todo el rango. Genera (fecha, filas) por partición escrita.
+    """
+    require_pyarrow()
+    model, date_field, _ = DATASETS[dataset]
+    fechas = model.objects.order_by(date_field).dates(date_field, 'day')
+    if date_from:
+        fechas = fechas.filter(**{f'{date_field}__gte': date_from})
+    if date_to:
+        fechas = fechas.filter(**{f'{date_field}__lte': date_to})
+
+    recientes = date.today() - timedelta(days=refresh_days)
+    for fecha in fechas:
+        if not force and fecha < recientes and os.path.exists(partition_path(dataset, fecha)):
+            continue
+        yield fecha, write_partition(dataset, fecha)
+
+
+def list_partitions(dataset):
+    """
+    Particiones exportadas de un dataset con su cantidad de filas y tamaño
+    """
+    require_pyarrow()
+    base = os.path.join(export_root(), dataset)
+    if not os.path.isdir(base):
+        return []
+    particiones = []
+    for nombre in sorted(os.listdir(base)):
+        path = os.path.join(base, nombre, PARTITION_FILE)
+        if not nombre.startswith('date=') or not os.path.exists(path):
+            continue
+        particiones.append({
+            'date': nombre[len('date='):],
+            'rows': pq.read_metadata(path).num_rows,
+            'bytes': os.path.getsize(path),
+        })
+    return particiones
+
+
+def start_export(dataset):
+    """
+    Lanza export_dataset en un hilo de fondo y devuelve (ExportRun, creada).
+    Si ya hay una exportación en curso del dataset se devuelve esa.
+    """
+    require_pyarrow()
+    with transaction.atomic():
+        en_curso = ExportRun.objects.select_for_update().filter(
+            dataset=dataset, status='running', started_at__gte=timezone.now() - EXPORT_RUN_TIMEOUT,
+        ).first()
+        if en_curso is not None:
+            return en_curso, False
+        run = ExportRun.objects.create(dataset=dataset)
+    threading.Thread(target=_export_thread, args=(run.pk,), name=f"export-{dataset}", daemon=True).start()
+    return run, True
+
+
+def run_export(run_id):
+    """
+    Ejecuta una ExportRun y guarda su resultado (particiones escritas o error)
+    """
+    run = ExportRun.objects.get(pk=run_id)
+    try:
+        for fecha, filas in export_dataset(run.dataset):
+            run.written.append({'date': fecha.isoformat(), 'rows': filas})
+        run.status = 'ok'
+    except Exception as e:
+        logger.exception(f"Error exportando {run.dataset}")
+        run.status = 'error'
+        run.errors = str(e)
+    run.finished_at = timezone.now()
+    run.save()
+    return run
+
+
+def _export_thread(run_id):
+    try:
+        run_export(run_id)
+    finally:
+        # La conexión del hilo no la cierra ningún ciclo de request
+        connection.close()
@@ -0,0 +1,22 @@
+import django_filters
+from .models import MQS
+
+
+class MQSFilter(django_filters.FilterSet):
+    """
+    Filtros del listado de MQS; los de texto (Family, Line, ...) se resuelven
+    contra las tablas de dimensión y filtran por la clave
+    """
+    Family = django_filters.CharFilter(method='filter_dimension')
+    Line = django_filters.CharFilter(method='filter_dimension')
+    Station = django_filters.CharFilter(method='filter_dimension')
+    Testcode = django_filters.CharFilter(method='filter_dimension')
+
+    class Meta:
+        model = MQS
+        fields = {
+            'date': ['exact'], 'ts': ['gte', 'lt'], 'NTF': ['exact'], 'Prime': ['exact'],
+        }
+
+    def filter_dimension(self, queryset, name, value):
+        return queryset.filter_names(**{name: value})
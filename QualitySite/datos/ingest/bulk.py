@@ -0,0 +1,125 @@
+from itertools import islice
+from django.db import IntegrityError, connection, transaction
+
+DEFAULT_CHUNK_SIZE = 1000
+
+
+def chunked(iterable, size=DEFAULT_CHUNK_SIZE):
+    """
+    Agrupa un iterable en listas de hasta `size` elementos sin materializarlo completo
+    """
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def insert_new(model, objs, key_fields, date_field, retry=True):
+    """
+    Inserta solo los objetos cuya clave natural no existe todavía en la base.
+
+    Las claves existentes se precargan con una única consulta acotada a la
+    ventana de fechas del bloque y los nuevos se escriben con un solo
+    bulk_create. Si otra transacción insertó parte del bloque entre la
+    precarga y el INSERT, se vuelve a precargar y se reintenta una vez.
+    Devuelve la lista de objetos efectivamente insertados.
+    """
+    if not objs:
+        return []
+
+    def key(obj):
+        return tuple(getattr(obj, field) for field in key_fields)
+
+    fechas = [getattr(obj, date_field) for obj in objs]
+    existentes = set(
+        model.objects.filter(**{
+            f'{date_field}__range': (min(fechas), max(fechas)),
+            f'{key_fields[0]}__in': {getattr(obj, key_fields[0]) for obj in objs},
+        }).values_list(*key_fields)
+    )
+
+    nuevos = []
+    for obj in objs:
+        k = key(obj)
+        if k in existentes:
+            continue
+        existentes.add(k)  # Evita duplicados dentro del mismo bloque
+        nuevos.append(obj)
+
+    if nuevos:
+        # Sin ignore_conflicts: una fila descartada en silencio se contaría como insertada
+        try:
+            with transaction.atomic():
+                model.objects.bulk_create(nuevos, batch_size=len(nuevos))
+        except IntegrityError:
+            if not retry:
+                raise
+            return insert_new(model, objs, key_fields, date_field, retry=False)
+    return nuevos
+
+
+def upsert(model, objs, unique_fields, update_fields):
+    """
+    Inserta o actualiza un bloque con un solo INSERT ... ON CONFLICT DO UPDATE.
+
+    Si hay claves repetidas dentro del bloque gana la última fila. Devuelve
+    (creados, actualizados) usando una única consulta previa de claves existentes.
+    """
+    if not objs:
+        return 0, 0
+
+    por_clave = {}
+    for obj in objs:
+        por_clave[tuple(getattr(obj, field) for field in unique_fields)] = obj
+    objs = list(por_clave.values())
+
+    existentes = model.objects.filter(**{
+        f'{unique_fields[0]}__in': {k[0] for k in por_clave},
+        f'{unique_fields[1]}__in': {k[1] for k in por_clave},
+    }).values_list(*unique_fields)
+    actualizados = sum(1 for k in existentes if k in por_clave)
+
+    model.objects.bulk_create(
+        objs,
+        batch_size=len(objs),
+        update_conflicts=True,
+        unique_fields=unique_fields,
+        update_fields=update_fields,
+    )
+    return len(objs) - actualizados, actualizados
+
+
+INCREMENT_BATCH_SIZE = 500
+
+
+def increment(model, key_fields, count_field, counts):
+    """
+    Suma `counts` ({clave: n}) al contador `count_field` de las filas con esa
+    clave, creándolas si no existen, con INSERT ... ON CONFLICT DO UPDATE
+    (Postgres y SQLite). `key_fields` debe tener una restricción única.
+    """
+    if not counts:
+        return
+    qn = connection.ops.quote_name
+    campos = [model._meta.get_field(f) for f in key_fields]
+    columnas = [f.column for f in campos]
+    contador = model._meta.get_field(count_field).column
+    fila = '(' + ', '.join(['%s'] * (len(columnas) + 1)) + ')'
+    items = list(counts.items())
+    with connection.cursor() as cursor:
+        for inicio in range(0, len(items), INCREMENT_BATCH_SIZE):
+            bloque = items[inicio:inicio + INCREMENT_BATCH_SIZE]
+            sql = (
+                f"INSERT INTO {qn(model._meta.db_table)} "
+                f"({', '.join(qn(c) for c in columnas)}, {qn(contador)}) "
+                f"VALUES {', '.join([fila] * len(bloque))} "
+                f"ON CONFLICT ({', '.join(qn(c) for c in columnas)}) "
+                f"DO UPDATE SET {qn(contador)} = {qn(model._meta.db_table)}.{qn(contador)} + EXCLUDED.{qn(contador)}"
+            )
+            params = []
+            for clave, n in bloque:
+                params.extend(campo.get_db_prep_value(valor, connection) for campo, valor in zip(campos, clave))
+                params.append(n)
+            cursor.execute(sql, params)
@@ -0,0 +1,127 @@
+"""
+Caché en proceso de los IDs de las tablas de dimensión de MQS.
+
+Los importadores resuelven los valores de texto de cada bloque contra este
+caché: solo los valores que el proceso no vio nunca van a la base (una
+consulta por dimensión y bloque) y los que faltan se crean con
+bulk_create(ignore_conflicts=True). MQS guarda solo las claves; las consultas
+que agrupan por clave traducen los IDs a texto con el mismo caché.
+"""
+from django.db import transaction
+from ..models import (
+    MQS, DimFailDesc, DimFamily, DimFixture, DimLine, DimModel, DimProcess, DimStation, DimTestcode,
+)
+
+# Columna de MQS -> (FK en MQS, modelo de dimensión, campo clave, {campo extra: columna de MQS})
+MQS_DIMENSIONS = {
+    'Line': ('line_dim', DimLine, 'name', {}),
+    'Family': ('family_dim', DimFamily, 'name', {}),
+    'Model': ('model_dim', DimModel, 'name', {}),
+    'Process': ('process_dim', DimProcess, 'name', {}),
+    'Station': ('station_dim', DimStation, 'name', {}),
+    'Fixture': ('fixture_dim', DimFixture, 'name', {}),
+    'Testcode': ('testcode_dim', DimTestcode, 'code', {'description': 'Testcode_Desc'}),
+    # Clave: md5 del texto (DimFailDesc.key_for); el texto va como campo extra
+    'Fail_Desc': ('fail_desc_dim', DimFailDesc, 'md5', {'name': 'Fail_Desc'}),
+}
+# Columnas del CSV que solo se guardan como campo extra de otra dimensión
+_EXTRA_COLUMNS = {
+    origen for *_, extras in MQS_DIMENSIONS.values() for origen in extras.values()
+} - set(MQS_DIMENSIONS)
+
+
+def _key(model, valor):
+    return model.key_for(valor) if hasattr(model, 'key_for') else valor
+
+
+class DimensionCache:
+    """
+    {modelo: {valor: id}} compartido por los importadores del proceso
+    """
+    def __init__(self):
+        self._ids = {}
+        self._names = {}
+
+    def clear(self):
+        self._ids.clear()
+        self._names.clear()
+
+    def _remember(self, model, encontrados):
+        self._ids.setdefault(model, {}).update(encontrados)
+        self._names.setdefault(model, {}).update((id_, valor) for valor, id_ in encontrados.items())
+
+    def resolve(self, model, key_field, values):
+        """
+        Devuelve {valor: id} para `values` ({valor: campos extra}), creando las
+        filas que no existen todavía
+        """
+        ids = self._ids.setdefault(model, {})
+        faltantes = {valor: extra for valor, extra in values.items() if valor not in ids}
+        if not faltantes:
+            return {valor: ids[valor] for valor in values}
+
+        encontrados = dict(
+            model.objects.filter(**{f'{key_field}__in': list(faltantes)}).values_list(key_field, 'id')
+        )
+        nuevos = [valor for valor in faltantes if valor not in encontrados]
+        if nuevos:
+            model.objects.bulk_create(
+                [model(**{key_field: valor}, **faltantes[valor]) for valor in nuevos],
+                ignore_conflicts=True,
+            )
+            encontrados.update(
+                model.objects.filter(**{f'{key_field}__in': nuevos}).values_list(key_field, 'id')
+            )
+        # Solo se cachean IDs confirmados: si la transacción se revierte las filas nuevas no existen
+        transaction.on_commit(lambda: self._remember(model, encontrados))
+        return {valor: ids[valor] if valor in ids else encontrados[valor] for valor in values}
+
+    def names(self, model, key_field, ids):
+        """
+        Devuelve {id: valor} para `ids`; los que el proceso no vio se leen de la
+        base en una consulta
+        """
+        nombres = self._names.setdefault(model, {})
+        faltantes = {id_ for id_ in ids if id_ not in nombres}
+        if faltantes:
+            encontrados = dict(model.objects.filter(id__in=faltantes).values_list(key_field, 'id'))
+            transaction.on_commit(lambda: self._remember(model, encontrados))
+            leidos = {id_: valor for valor, id_ in encontrados.items()}
+            return {id_: nombres[id_] if id_ in nombres else leidos[id_] for id_ in ids}
+        return {id_: nombres[id_] for id_ in ids}
+
+
+dimension_cache = DimensionCache()
+
+
+def build_mqs(rows, cache=dimension_cache):
+    """
+    Crea los objetos MQS (sin guardar) de filas parseadas ({columna: valor},
+    ver parse_mqs_row): las columnas de texto se reemplazan por las claves de
+    sus dimensiones
+    """
+    ids_por_columna = {}
+    for columna, (fk, model, key_field, extras) in MQS_DIMENSIONS.items():
+        valores = {}
+        for row in rows:
+            clave = _key(model, row[columna])
+            if clave not in valores:
+                valores[clave] = {campo: row[origen] or '' for campo, origen in extras.items()}
+        ids_por_columna[columna] = cache.resolve(model, key_field, valores)
+
+    objs = []
+    for row in rows:
+        campos = {k: v for k, v in row.items() if k not in MQS_DIMENSIONS and k not in _EXTRA_COLUMNS}
+        for columna, (fk, model, *_) in MQS_DIMENSIONS.items():
+            campos[f'{fk}_id'] = ids_por_columna[columna][_key(model, row[columna])]
+        objs.append(MQS(**campos))
+    return objs
+
+
+def dimension_names(columna, ids, cache=dimension_cache):
+    """{id: texto} de una columna de MQS ('Line', 'Testcode', ...) para sus claves"""
+    _, model, key_field, _ = MQS_DIMENSIONS[columna]
+    if hasattr(model, 'key_for'):
+        # La clave es un hash: el texto se lee de la base
+        return dict(model.objects.filter(id__in=set(ids)).values_list('id', 'name'))
+    return cache.names(model, key_field, set(ids))
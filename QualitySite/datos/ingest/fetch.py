@@ -0,0 +1,158 @@
+import csv
+import hashlib
+import logging
+import tempfile
+import requests
+from .streaming import STREAM_CHUNK_SIZE, REQUEST_TIMEOUT, decode_lines, is_remote
+
+logger = logging.getLogger(__name__)
+
+# Cuerpos remotos hasta este tamaño quedan en memoria; los más grandes pasan a un archivo temporal
+SPOOL_MAX_SIZE = 16 * 1024 * 1024
+
+
+class FetchResult:
+    """
+    Resultado de una descarga condicional.
+
+    Si `not_modified` es True la fuente no cambió desde la última importación
+    (304, mismos validadores o mismo hash de contenido) y no hay nada que
+    parsear. En otro caso `open_csv()` parsea el cuerpo: el de una fuente
+    remota ya descargado en `body` (en memoria o en un archivo temporal) y el
+    de un archivo local desde el disco; releerlo desde el inicio no vuelve a
+    descargar nada.
+    """
+
+    def __init__(self, not_modified, reason, source=None, body=None, etag='', last_modified='', body_hash=''):
+        self.not_modified = not_modified
+        self.reason = reason
+        self.source = source
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+        self.body_hash = body_hash
+        self._stream = None
+
+    def _chunks(self):
+        if self.body is None:
+            yield from _iter_body(self.source)
+            return
+        self.body.seek(0)
+        yield from iter(lambda: self.body.read(STREAM_CHUNK_SIZE), b'')
+
+    def open_csv(self):
+        if self._stream is not None:
+            self._stream.close()
+        self._stream = self._chunks()
+        return csv.DictReader(decode_lines(self._stream))
+
+    def store(self, checkpoint):
+        """Copia los validadores al checkpoint; se persisten junto con la marca de agua"""
+        checkpoint.etag = self.etag
+        checkpoint.last_modified = self.last_modified
+        checkpoint.body_hash = self.body_hash
+
+    def close(self):
+        if self._stream is not None:
+            # Una lectura abandonada a mitad cierra su descarga
+            self._stream.close()
+            self._stream = None
+        if self.body is not None:
+            self.body.close()
+            self.body = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _get(source, headers=None):
+    response = requests.get(source, headers=headers or {}, stream=True, timeout=REQUEST_TIMEOUT)
+    if response.status_code != 304:
+        try:
+            response.raise_for_status()
+        except requests.HTTPError:
+            response.close()
+            raise
+    return response
+
+
+def _iter_body(path):
+    with open(path, 'rb') as f:
+        yield from iter(lambda: f.read(STREAM_CHUNK_SIZE), b'')
+
+
+def _file_hash(path):
+    digest = hashlib.sha256()
+    for chunk in _iter_body(path):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _spool(response):
+    """
+    Descarga el cuerpo a un archivo temporal (en memoria si es chico) y
+    devuelve (archivo, hash)
+    """
+    body = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    digest = hashlib.sha256()
+    try:
+        with response:
+            for chunk in response.iter_content(chunk_size=STREAM_CHUNK_SIZE):
+                digest.update(chunk)
+                body.write(chunk)
+    except BaseException:
+        body.close()
+        raise
+    return body, digest.hexdigest()
+
+
+def fetch_source(source, checkpoint, force=False):
+    """
+    Descarga condicional de la fuente. Si no cambió (304, mismo ETag o
+    Last-Modified aunque el servidor ignore los encabezados condicionales, o
+    mismo hash de contenido) no se parsea nada. El hash se calcula antes de
+    parsear: las fuentes sin validadores HTTP (los CSV publicados de Google
+    Sheets) se descargan completas y se descartan si no cambiaron.
+    """
+    name = checkpoint.source
+
+    if not is_remote(source):
+        # Un archivo local se puede hashear sin cargarlo y volver a leer al parsear
+        body_hash = _file_hash(source)
+        if not force and checkpoint.body_hash and body_hash == checkpoint.body_hash:
+            logger.info(f"Fuente '{name}': cache hit (mismo hash de contenido)")
+            return FetchResult(True, 'hash')
+        logger.info(f"Fuente '{name}': cache miss, contenido nuevo ({body_hash[:12]})")
+        return FetchResult(False, 'changed', source, body_hash=body_hash)
+
+    headers = {}
+    if not force and checkpoint.etag:
+        headers['If-None-Match'] = checkpoint.etag
+    if not force and checkpoint.last_modified:
+        headers['If-Modified-Since'] = checkpoint.last_modified
+
+    response = _get(source, headers)
+    if response.status_code == 304:
+        response.close()
+        logger.info(f"Fuente '{name}': cache hit (304 Not Modified)")
+        return FetchResult(True, '304')
+
+    etag = response.headers.get('ETag', '')
+    last_modified = response.headers.get('Last-Modified', '')
+    if not force and ((etag and etag == checkpoint.etag)
+                      or (not etag and last_modified and last_modified == checkpoint.last_modified)):
+        response.close()
+        logger.info(f"Fuente '{name}': cache hit (mismos validadores, el servidor respondió 200)")
+        return FetchResult(True, 'validators')
+
+    body, body_hash = _spool(response)
+    if not force and checkpoint.body_hash and body_hash == checkpoint.body_hash:
+        body.close()
+        logger.info(f"Fuente '{name}': cache hit (mismo hash de contenido)")
+        return FetchResult(True, 'hash')
+
+    logger.info(f"Fuente '{name}': cache miss, contenido nuevo ({body_hash[:12]})")
+    return FetchResult(False, 'changed', source, body, etag, last_modified, body_hash)
@@ -0,0 +1,364 @@
+import logging
+import time
+from collections import Counter
+from django.db import transaction
+from ..cache import invalidate
+from ..metrics import yield_metrics_columns
+from ..models import MES, MQS, YieldTurno
+from .bulk import DEFAULT_CHUNK_SIZE, chunked, insert_new, upsert
+from .checkpoints import CheckpointCursor
+from .dimensions import build_mqs
+from .fetch import fetch_source
+from .parallel import parse_file_parallel
+from .parsers import MQS_FIELDS, mes_row_pending, parse_mes_row, parse_mqs_row, parse_yield_row
+from .typed import combine_ts
+from .rollups import record_testcode_failures, refresh_daily_rollups
+
+logger = logging.getLogger(__name__)
+
+MQS_CSV_URL = 'https://docs.google.com/spreadsheets/d/e/2PACX-1vTbxUgc5VVgjlMwC6raz_fVWgVr2YvITNwWQEvtETd7n37-Vbu1SjqhrIrEfN-AoFT9B-xrJeiRwc2q/pub?gid=572560726&single=true&output=csv'
+MES_CSV_URL = 'https://docs.google.com/spreadsheets/d/e/2PACX-1vQoBW5pYMPZPF4_77hDMBaIMJpfdO--8mreybh3xo1NXEnmYgMUl9jf85U2jW_XKk0rLUorFddMg7_M/pub?gid=572560726&single=true&output=csv'
+YIELD_CSV_URL = "https://docs.google.com/spreadsheets/d/e/2PACX-1vSsIhdvsTlmQ2FQTiPJRLLw59vF5-uXwUZIguYAe2OFOTExm3TjtpxV_orvspHoDf7NN73MIq0vErR1/pub?gid=1321118416&single=true&output=csv"
+
+
+def log_to_logger(message, level='info'):
+    getattr(logger, 'info' if level == 'success' else level)(message)
+
+
+def command_log(command):
+    """
+    Adapta la salida de un importador al stdout/stderr con estilos de un comando
+    """
+    def log(message, level='info'):
+        if level == 'error':
+            command.stderr.write(command.style.ERROR(message))
+        elif level == 'warning':
+            command.stdout.write(command.style.WARNING(message))
+        elif level == 'success':
+            command.stdout.write(command.style.SUCCESS(message))
+        else:
+            command.stdout.write(message)
+    return log
+
+
+class SourceImporter:
+    """
+    Importación de una fuente en etapas separables:
+
+    - fetch(): descarga condicional y hash del cuerpo (no toca la base)
+    - records(): parsea las filas posteriores a la marca de agua (sin escrituras)
+    - write(records): escribe en la base
+    - finish(): persiste validadores HTTP y marca de agua si no hubo errores
+
+    Los comandos import_* las encadenan en streaming con run(); el pipeline
+    reparte fetch/parse entre hilos y ordena las escrituras.
+    """
+    source = None
+    default_url = None
+    refreshes_rollups = False
+
+    def __init__(self, url=None, force=False, chunk_size=DEFAULT_CHUNK_SIZE, log=None):
+        self.url = url or self.default_url
+        self.force = force
+        self.chunk_size = max(1, chunk_size or DEFAULT_CHUNK_SIZE)
+        self.log = log or log_to_logger
+        self.stats = Counter()
+        self.fechas_afectadas = set()
+        self.fetched = None
+        # Las fuentes alternativas (archivos locales) llevan su propia marca de agua
+        self.key = self.source if self.url == self.default_url else f"{self.source}:{self.url}"
+        self.cursor = CheckpointCursor(self.key)
+
+    def fetch(self):
+        """
+        Descarga condicional; devuelve False si la fuente no cambió desde la última importación
+        """
+        if self.cursor.skip:
+            self.log(f"Marca de agua: {self.cursor.skip} filas procesadas (hasta {self.cursor.last_timestamp})")
+        else:
+            self.log("Sin marca de agua previa, se procesa el CSV completo")
+
+        self.fetched = fetch_source(self.url, self.cursor.checkpoint, force=self.force)
+        if self.fetched.not_modified:
+            self.log(f"♻️ Sin cambios desde la última importación ({self.fetched.reason}), cache hit", 'success')
+            return False
+        self.log("Contenido nuevo, cache miss: se parsea el cuerpo descargado")
+        return True
+
+    def records(self):
+        """
+        Genera los registros parseados posteriores a la marca de agua; si el
+        prefijo ya procesado cambió, vuelve a leer el CSV desde el inicio
+        """
+        while True:
+            reader = self.fetched.open_csv()
+            self.check_header(reader)
+            yield from self.parse(reader)
+            if self.cursor.prefix_valid:
+                return
+            # El CSV cambió por encima de la marca de agua: reprocesar todo
+            self.log("⚠️ El CSV ya procesado fue modificado. Reprocesando desde el inicio.", 'warning')
+            self.cursor.reset()
+
+    def check_header(self, reader):
+        pass
+
+    def parse(self, reader):
+        raise NotImplementedError
+
+    def write(self, records):
+        raise NotImplementedError
+
+    def finish(self):
+        """
+        Avanza la marca de agua; si hubo errores de escritura se deja como estaba
+        para reintentar esas filas en la próxima corrida
+        """
+        if self.stats['errores_escritura']:
+            self.log(f"⚠️ {self.stats['errores_escritura']} filas no se guardaron; la marca de agua no avanza", 'warning')
+            return False
+        self.fetched.store(self.cursor.checkpoint)
+        self.cursor.commit()
+        return True
+
+    def publish(self):
+        """
+        Materializa los resúmenes diarios e invalida la caché de las fechas tocadas
+        """
+        if not self.fechas_afectadas:
+            return
+        if self.refreshes_rollups:
+            refresh_daily_rollups(self.fechas_afectadas)
+            self.log(f"📊 Resúmenes diarios actualizados para {len(self.fechas_afectadas)} fechas")
+        invalidate(self.source, self.fechas_afectadas)
+
+    def run(self):
+        """
+        Ejecuta todas las etapas en streaming; devuelve False si no había cambios
+        """
+        try:
+            if not self.fetch():
+                return False
+            try:
+                self.write(self.records())
+                self.finish()
+            finally:
+                # Los bloques ya confirmados se publican aunque falle uno posterior:
+                # al reintentar, insert_new los descarta y sus fechas no volverían a aparecer
+                self.publish()
+            return True
+        finally:
+            self.close()
+
+    def close(self):
+        if self.fetched is not None:
+            self.fetched.close()
+
+
+class MQSImporter(SourceImporter):
+    source = 'mqs'
+    default_url = MQS_CSV_URL
+    refreshes_rollups = True
+    expected_headers = [
+        'Name', 'ProcessQty', 'Date', 'Time', 'Line', 'Family', 'Model', 'Process',
+        'Station', 'Fixture', 'TrackId', 'NTF?', 'Prime?', 'Testcode', 'Testcode Desc',
+        'Fail Desc', 'TestTime', 'Test Val', 'LL', 'UL'
+    ]
+
+    _header_checked = False
+
+    def check_header(self, reader):
+        if self._header_checked:
+            return
+        self._header_checked = True
+        if reader.fieldnames != self.expected_headers:
+            self.log("⚠️ Advertencia: Los encabezados no coinciden exactamente.", 'warning')
+            self.log(f"Esperados: {self.expected_headers}")
+            self.log(f"Encontrados: {reader.fieldnames}")
+
+    def parse(self, reader):
+        """
+        Genera las filas parseadas ({columna: valor}) posteriores a la marca de agua
+        """
+        for index, row in self.cursor.unseen(reader):
+            # Mostrar progreso
+            if index % 1000 == 0:
+                self.log(f"Procesando registro {index+1}...")
+
+            try:
+                campos = parse_mqs_row(row)
+            except ValueError as e:
+                self.log(f"{e} en fila {index+1}", 'warning')
+                self.stats['errores'] += 1
+                continue
+
+            self.cursor.observe(campos['date'], campos['Time'])
+            yield campos
+
+    def write(self, records):
+        inicio = time.monotonic()
+        for chunk in chunked(records, self.chunk_size):
+            self.stats['candidatas'] += len(chunk)
+            for campos in chunk:
+                campos['ts'] = combine_ts(campos['date'], campos['Time'])
+            with transaction.atomic():
+                nuevos = insert_new(MQS, build_mqs(chunk), ('TrackId', 'date', 'Time'), 'date')
+                record_testcode_failures(nuevos)
+            self.stats['nuevos'] += len(nuevos)
+            self.stats['existentes'] += len(chunk) - len(nuevos)
+            self.fechas_afectadas.update(obj.date for obj in nuevos)
+            self.log(f"✅ Bloque de {len(chunk)} filas: {len(nuevos)} registros nuevos", 'success')
+        self.duracion = time.monotonic() - inicio
+
+    def backfill(self, workers):
+        """
+        Importa un archivo local completo parseándolo en `workers` procesos; las
+        filas tipadas se escriben desde este proceso. No usa ni avanza la marca
+        de agua: las filas ya existentes las descarta insert_new.
+        """
+        def records():
+            for filas, errores in parse_file_parallel(self.url, workers):
+                self.stats['errores'] += len(errores)
+                for error in errores[:5]:
+                    self.log(f"{error}", 'warning')
+                if len(errores) > 5:
+                    self.log(f"... y {len(errores) - 5} filas más con error en este bloque", 'warning')
+                for valores in filas:
+                    yield dict(zip(MQS_FIELDS, valores))
+
+        try:
+            self.write(records())
+        finally:
+            self.publish()
+
+
+class MESImporter(SourceImporter):
+    source = 'mes'
+    default_url = MES_CSV_URL
+    key_fields = ('NS', 'FECHA_REPARACION', 'HORA_REPARACION', 'CODIGO_FALLA')  # uq_mes_reparacion_codigo
+
+    def parse(self, reader):
+        """
+        Genera (lookup, defaults) de las reparaciones posteriores a la marca de agua
+        """
+        for index, row in self.cursor.unseen(reader):
+            self.stats['revisados'] += 1
+
+            # Mostrar progreso cada 1000 registros
+            if index % 1000 == 0:
+                self.log(f"Procesando registro {index+1}...")
+
+            try:
+                lookup, defaults, aviso = parse_mes_row(row)
+
+                # Saltar los registros con algún campo en "PENDIENTE"
+                if mes_row_pending(row):
+                    self.stats['pendientes'] += 1
+                    self.log(f"Registro pendiente no importado: {row['NS']}", 'warning')
+                    continue
+            except ValueError as e:
+                self.log(f"Fila ignorada - {e} en fila {index+1}", 'warning')
+                continue
+            except Exception as e:
+                self.log(f"Error al procesar la fila {index+1}: {e}", 'error')
+                continue
+
+            if aviso:
+                self.log(f"{aviso} en fila {index+1}", 'warning')
+            if self.stats['parseados'] < 5:
+                self.log(f"DEBUG: Procesando fila {index+1}: {lookup['FECHA_REPARACION']} {lookup['HORA_REPARACION']} - {lookup['NS']}")
+            self.stats['parseados'] += 1
+
+            self.cursor.observe(lookup['FECHA_REPARACION'], lookup['HORA_REPARACION'])
+            defaults['ts'] = combine_ts(lookup['FECHA_REPARACION'], lookup['HORA_REPARACION'])
+            yield lookup, defaults
+
+    def write(self, records):
+        """
+        Inserta las reparaciones en bloques; las que ya existen (por su clave
+        natural) se descartan con una sola consulta por bloque
+        """
+        for chunk in chunked(records, self.chunk_size):
+            objs = [MES(**lookup, **defaults) for lookup, defaults in chunk]
+            try:
+                nuevos = insert_new(MES, objs, self.key_fields, 'FECHA_REPARACION')
+            except Exception as e:
+                self.stats['errores_escritura'] += len(chunk)
+                self.log(f"❌ Error guardando bloque de {len(chunk)} registros: {str(e)}", 'error')
+                continue
+            self.stats['nuevos'] += len(nuevos)
+            self.stats['existentes'] += len(chunk) - len(nuevos)
+            self.fechas_afectadas.update(obj.FECHA_REPARACION for obj in nuevos)
+            self.log(f"✅ Bloque de {len(chunk)} filas: {len(nuevos)} registros nuevos", 'success')
+
+
+class YieldImporter(SourceImporter):
+    source = 'yield'
+    default_url = YIELD_CSV_URL
+    refreshes_rollups = True
+    unique_fields = ['Name', 'date', 'Turno', 'Line']
+    update_fields = [
+        'Jornada', 'Family', 'Process', 'Prime_Pass', 'Prime_Fail', 'Prime_Handle',
+        'Prime_NTF_Count', 'Prime_Defect_Count', 'FTY', 'DPHU', 'NTF',
+    ]
+
+    def parse(self, reader):
+        """
+        Genera los campos parseados de las filas posteriores a la marca de agua
+        """
+        for index, row in self.cursor.unseen(reader):
+            self.stats['revisados'] += 1
+
+            # Mostrar progreso cada 1000 registros
+            if index % 1000 == 0:
+                self.log(f"Procesando registro {index+1}...")
+
+            try:
+                campos, invalidas = parse_yield_row(row)
+            except (ValueError, KeyError) as e:
+                self.log(f"Fila {index+1} ignorada - {e}", 'warning')
+                continue
+            for columna in invalidas:
+                self.log(f"Valor no numérico para {columna} en fila {index+1}: {row[columna]}", 'warning')
+
+            self.cursor.observe(campos['date'])
+            yield campos
+
+    def write(self, records):
+        """
+        Importa los registros en bloques con upsert masivo
+        """
+        for chunk in chunked(records, self.chunk_size):
+            try:
+                creados, actualizados = upsert(
+                    YieldTurno, self._construir_turnos(chunk), self.unique_fields, self.update_fields
+                )
+            except Exception as e:
+                self.stats['errores_escritura'] += len(chunk)
+                self.log(f"❌ Error guardando bloque de {len(chunk)} filas: {str(e)}", 'error')
+                continue
+            self.stats['nuevos'] += creados
+            self.stats['actualizados'] += actualizados
+            self.fechas_afectadas.update(c['date'] for c in chunk)
+            self.log(f"✅ Bloque de {len(chunk)} filas: {creados} nuevos, {actualizados} actualizados", 'success')
+
+    def _construir_turnos(self, chunk):
+        """
+        Calcula FTY/DPHU/NTF por columnas para todo el bloque y arma las instancias
+        """
+        fty, dphu, ntf = yield_metrics_columns(
+            [c['Prime_Pass'] for c in chunk],
+            [c['Prime_Defect_Count'] for c in chunk],
+            [c['Prime_NTF_Count'] for c in chunk],
+            [c['Prime_Handle'] for c in chunk],
+        )
+        return [
+            YieldTurno(FTY=f, DPHU=d, NTF=n, **campos)
+            for campos, f, d, n in zip(chunk, fty, dphu, ntf)
+        ]
+
+
+IMPORTERS = {
+    importer.source: importer
+    for importer in (MESImporter, MQSImporter, YieldImporter)
+}
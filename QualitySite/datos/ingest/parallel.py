@@ -0,0 +1,129 @@
+"""
+Parseo paralelo de archivos CSV locales para backfills.
+
+Las funciones que corren en los procesos del pool no usan el ORM ni la base
+(los conversores de typed solo importan utilidades de Django) y devuelven
+tuplas tipadas, baratas de serializar entre procesos. La escritura queda en
+el proceso principal.
+"""
+import csv
+import io
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from .parsers import parse_mqs_values
+
+MIN_RANGE_SIZE = 1024 * 1024  # No vale la pena repartir bloques más chicos
+RANGES_PER_WORKER = 4  # Más bloques que procesos para balancear la carga
+IN_FLIGHT_PER_WORKER = 2  # Rangos encolados o con resultado sin consumir por proceso
+SCAN_SIZE = 1024 * 1024
+
+
+def _next_boundary(f, pos, quotes):
+    """
+    Devuelve el inicio de la primera línea completa a partir de `pos`, fuera de
+    un campo entre comillas, y la cantidad de comillas hasta ese punto.
+    `quotes` es la cantidad de comillas en el archivo antes de `pos`.
+    """
+    f.seek(pos)
+    while True:
+        block = f.read(SCAN_SIZE)
+        if not block:
+            return None, quotes
+        inicio = 0
+        while True:
+            nl = block.find(b'\n', inicio)
+            if nl < 0:
+                break
+            quotes += block.count(b'"', inicio, nl + 1)
+            inicio = nl + 1
+            # Con una cantidad par de comillas el salto de línea separa registros
+            if quotes % 2 == 0:
+                return pos + inicio, quotes
+        quotes += block.count(b'"', inicio)
+        pos += len(block)
+
+
+def split_ranges(path, parts):
+    """
+    Lee el encabezado y divide el resto del archivo en hasta `parts` rangos de
+    bytes alineados a registros completos (respetando campos multilínea).
+    Devuelve (fieldnames, [(inicio, fin), ...]).
+    """
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        data_start, quotes = _next_boundary(f, 0, 0)
+        if data_start is None:
+            return [], []
+        f.seek(0)
+        header = f.read(data_start).decode('utf-8-sig')
+        fieldnames = next(csv.reader(io.StringIO(header, newline='')))
+
+        step = max(MIN_RANGE_SIZE, (size - data_start) // max(1, parts))
+        ranges = []
+        inicio = data_start
+        while inicio < size:
+            objetivo = inicio + step
+            if objetivo >= size:
+                ranges.append((inicio, size))
+                break
+            # Las comillas entre el último corte y el objetivo se cuentan en bloque
+            f.seek(inicio)
+            quotes += f.read(objetivo - inicio).count(b'"')
+            fin, quotes = _next_boundary(f, objetivo, quotes)
+            if fin is None:
+                ranges.append((inicio, size))
+                break
+            ranges.append((inicio, fin))
+            inicio = fin
+    return fieldnames, ranges
+
+
+def parse_mqs_range(path, start, end, fieldnames):
+    """
+    Parsea las filas de MQS de un rango de bytes. Devuelve (filas, errores):
+    filas como tuplas en el orden de MQS_FIELDS y errores como (índice del
+    registro dentro del rango, mensaje).
+    """
+    with open(path, 'rb') as f:
+        f.seek(start)
+        texto = f.read(end - start).decode('utf-8')
+
+    filas = []
+    errores = []
+    for index, row in enumerate(csv.DictReader(io.StringIO(texto, newline=''), fieldnames=fieldnames)):
+        try:
+            filas.append(parse_mqs_values(row))
+        except ValueError as e:
+            errores.append((index, str(e)))
+    return filas, errores
+
+
+def parse_file_parallel(path, workers):
+    """
+    Genera (filas, errores) por rango, en el orden del archivo, parseando los
+    rangos en un ProcessPoolExecutor de `workers` procesos. Los errores llevan
+    el número de fila del archivo, como en el parseo secuencial.
+
+    Solo hay IN_FLIGHT_PER_WORKER rangos por proceso en curso o esperando ser
+    consumidos: si la escritura va más lenta, no se acumulan resultados en memoria.
+    """
+    fieldnames, ranges = split_ranges(path, workers * RANGES_PER_WORKER)
+    if not ranges:
+        return
+    pendientes = iter(ranges)
+    en_curso = deque()
+    # Registros de los rangos anteriores: cada registro es una fila o un error
+    base = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        while True:
+            while len(en_curso) < workers * IN_FLIGHT_PER_WORKER:
+                rango = next(pendientes, None)
+                if rango is None:
+                    break
+                en_curso.append(pool.submit(parse_mqs_range, path, *rango, fieldnames))
+            if not en_curso:
+                return
+            filas, errores = en_curso.popleft().result()
+            yield filas, [f"{mensaje} en fila {base + index + 1}" for index, mensaje in errores]
+            base += len(filas) + len(errores)
@@ -0,0 +1,158 @@
+from .typed import (
+    flag, parse_date_dmy, parse_date_ymd, parse_time_hm, parse_time_hms, to_float,
+    to_float_or_zero, to_int,
+)
+
+
+MQS_FIELDS = (
+    'TrackId', 'date', 'Time', 'Station', 'NTF', 'Test_Val', 'Line', 'Family', 'Model',
+    'Process', 'Fixture', 'Testcode', 'Testcode_Desc', 'Fail_Desc', 'TestTime', 'LL', 'UL', 'Prime',
+)
+
+
+def parse_mqs_values(row):
+    """
+    Convierte una fila del CSV de MQS en una tupla compacta en el orden de MQS_FIELDS.
+    Lanza ValueError si falta la fecha/hora o tienen formato inválido.
+    """
+    get = row.get
+    fecha_txt = get('Date')
+    hora_txt = get('Time')
+    if not fecha_txt:
+        raise ValueError("Falta fecha")
+    if not hora_txt:
+        raise ValueError("Falta hora")
+
+    try:
+        fecha = parse_date_ymd(fecha_txt)
+    except ValueError:
+        raise ValueError(f"Error en formato de fecha: {fecha_txt}")
+    try:
+        hora = parse_time_hms(hora_txt)
+    except ValueError:
+        raise ValueError(f"Error en formato de hora: {hora_txt}")
+
+    return (
+        get('TrackId') or '0',
+        fecha,
+        hora,
+        get('Station') or '0',
+        flag(get('NTF?')),
+        to_float_or_zero(get('Test Val')),
+        get('Line') or '0',
+        get('Family') or '0',
+        get('Model') or '0',
+        get('Process') or '0',
+        get('Fixture') or '0',
+        get('Testcode') or '0',
+        get('Testcode Desc') or '0',
+        get('Fail Desc') or '',
+        to_float(get('TestTime')),
+        to_float(get('LL')),
+        to_float(get('UL')),
+        flag(get('Prime?')),
+    )
+
+
+def parse_mqs_row(row):
+    """
+    Convierte una fila del CSV de MQS en los campos del modelo.
+    Lanza ValueError si falta la fecha/hora o tienen formato inválido.
+    """
+    return dict(zip(MQS_FIELDS, parse_mqs_values(row)))
+
+
+YIELD_COUNT_COLUMNS = {
+    'Prime_Pass': 'Prime Pass',
+    'Prime_Fail': 'Prime Fail',
+    'Prime_Handle': 'Prime Handle',
+    'Prime_NTF_Count': 'Prime NTF Count',
+    'Prime_Defect_Count': 'Prime Defect Count',
+}
+
+
+def parse_yield_row(row):
+    """
+    Convierte una fila del CSV de Yield en los campos del modelo (sin métricas derivadas).
+    Devuelve (campos, columnas_invalidas); los contadores no numéricos quedan en 0.
+    Lanza ValueError si faltan campos críticos o la fecha es inválida.
+    """
+    if not row.get('Date') or not row.get('Name') or not row.get('Line'):
+        raise ValueError("Campos críticos vacíos")
+    try:
+        fecha = parse_date_ymd(row['Date'])
+    except ValueError:
+        raise ValueError(f"Error de formato de fecha: {row['Date']}")
+
+    campos = {
+        'Name': row['Name'],
+        'date': fecha,
+        'Turno': row['Turno'],
+        'Line': row['Line'],
+        'Jornada': row['Jornada'],
+        'Family': row['Family'],
+        'Process': row['Process'],
+    }
+    invalidas = []
+    for campo, columna in YIELD_COUNT_COLUMNS.items():
+        valor = row.get(columna)
+        try:
+            campos[campo] = to_int(valor)
+        except ValueError:
+            invalidas.append(columna)
+            campos[campo] = 0
+    return campos, invalidas
+
+
+MES_PENDING_COLUMNS = ('FUNCION', 'POSICION', 'ACCION CORRECTIVA', 'ORIGEN')
+
+
+def mes_row_pending(row):
+    """Indica si la reparación sigue pendiente (alguna columna vale PENDIENTE)"""
+    return any((row.get(columna) or '').strip().upper() == 'PENDIENTE' for columna in MES_PENDING_COLUMNS)
+
+
+def parse_mes_row(row):
+    """
+    Convierte una fila del CSV de MES en (lookup, defaults): la clave natural y
+    el resto de los campos, más un aviso si la fecha/hora de rechazo era inválida y se usó la de reparación.
+    Lanza ValueError si faltan campos críticos o la fecha/hora de reparación es inválida.
+    """
+    if not row.get("MODELO") or not row.get("NS") or not row.get("FECHA REPARACION") or not row.get("HORA REPARACION"):
+        raise ValueError("campos críticos vacíos")
+    try:
+        fecha_rep = parse_date_ymd(row["FECHA REPARACION"])
+        hora_rep = parse_time_hm(row["HORA REPARACION"])
+    except ValueError as e:
+        raise ValueError(f"Error en formato de fecha/hora: {e}")
+
+    aviso = None
+    try:
+        fecha_rec = parse_date_dmy(row["FECHA RECHAZO"])
+        hora_rec = parse_time_hm(row["HORA RECHAZO"])
+    except ValueError as e:
+        # Usar valores por defecto en caso de error
+        aviso = f"Error en formato de fecha/hora de rechazo: {e}"
+        fecha_rec = fecha_rep
+        hora_rec = hora_rep
+
+    lookup = {
+        'FECHA_REPARACION': fecha_rep,
+        'HORA_REPARACION': hora_rep,
+        'NS': row["NS"],
+        'CODIGO_FALLA': row.get("CODIGO DE FALLA REPARACION", ""),
+    }
+    defaults = {
+        "MODELO": row.get("MODELO", ""),
+        "FECHA_RECHAZO": fecha_rec,
+        "HORA_RECHAZO": hora_rec,
+        "POSICION": row.get("POSICION", "").strip(),
+        "FUNCION": row.get("FUNCION", ""),
+        "CAUSA": row.get("CAUSA DE REPARACION", ""),
+        "ACCION": row.get("ACCION CORRECTIVA", ""),
+        "ORIGEN": row.get("ORIGEN", ""),
+        "IMAGEN": row.get("IMAGEN", "0") if row.get("IMAGEN") else "0",
+        "REPARADOR": row.get("REPARADOR", ""),
+        "COMENTARIO": row.get("COMENTARIO", "") if row.get("COMENTARIO") else ""
+    }
+    return lookup, defaults, aviso
@@ -0,0 +1,182 @@
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from django.utils import timezone
+from ..cache import invalidate
+from ..locks import advisory_lock
+from ..models import IngestionRun
+from .bulk import chunked
+from .importers import IMPORTERS, log_to_logger
+from .rollups import refresh_daily_rollups
+
+# Orden fijo de escritura: reparaciones MES, luego fallas MQS y por último Yield,
+# que combina sus contadores con el resumen de testcodes en QualityAnalytics
+PIPELINE_ORDER = ('mes', 'mqs', 'yield')
+
+# Bloques parseados que una fuente puede tener esperando su escritura: la
+# memoria queda acotada a QUEUE_CHUNKS * chunk_size registros por fuente
+QUEUE_CHUNKS = 4
+QUEUE_POLL_SECONDS = 0.5
+
+# Marcas de la cola: la fuente cambió (siguen bloques) / no hay más bloques
+_CAMBIADO = object()
+_FIN = object()
+
+
+class _Cancelado(Exception):
+    pass
+
+
+def _put(cola, item, cancelado):
+    """Encola esperando lugar, salvo que el escritor haya abandonado la fuente"""
+    while not cancelado.is_set():
+        try:
+            cola.put(item, timeout=QUEUE_POLL_SECONDS)
+            return
+        except queue.Full:
+            continue
+    raise _Cancelado
+
+
+def _fetch_and_parse(importer, cola, cancelado, timings):
+    """
+    Etapas de red y CPU de una fuente; corre en un hilo del pool, no toca la
+    base y entrega los registros por bloques en una cola acotada. Si la
+    escritura va atrasada, el parseo se detiene hasta que haya lugar.
+    """
+    try:
+        inicio = time.monotonic()
+        cambiado = importer.fetch()
+        timings['fetch'] = round(time.monotonic() - inicio, 3)
+        if not cambiado:
+            return
+
+        _put(cola, _CAMBIADO, cancelado)
+        inicio, espera = time.monotonic(), 0.0
+        for chunk in chunked(importer.records(), importer.chunk_size):
+            inicio_espera = time.monotonic()
+            _put(cola, chunk, cancelado)
+            espera += time.monotonic() - inicio_espera
+        timings['parse'] = round(time.monotonic() - inicio - espera, 3)
+        timings['queue_wait'] = round(espera, 3)
+    except _Cancelado:
+        pass
+    finally:
+        try:
+            _put(cola, _FIN, cancelado)
+        except _Cancelado:
+            pass
+
+
+def _drain(cola, future):
+    """
+    Registros de la cola hasta el final de la fuente; los errores de
+    descarga/parseo se propagan al escritor
+    """
+    while True:
+        item = cola.get()
+        if item is _FIN:
+            future.result()
+            return
+        yield from item
+
+
+def run_pipeline(sources=PIPELINE_ORDER, force=False, log=None, urls=None):
+    """
+    Ciclo completo de importación:
+
+    1. Descarga y parsea todas las fuentes en paralelo (un hilo por fuente),
+       cada una hacia una cola acotada de QUEUE_CHUNKS bloques.
+    2. Escribe en orden fijo (MES → MQS → Yield) desde el hilo principal,
+       consumiendo los bloques a medida que llegan.
+    3. Recalcula los resúmenes diarios una sola vez, con todas las fuentes ya
+       escritas, e invalida la caché analítica.
+
+    Cada fuente se protege con un advisory lock para no solaparse con otra
+    ejecución (manual o del scheduler). Los tiempos por etapa quedan en un
+    IngestionRun y en el log. `urls` permite reemplazar la URL de alguna fuente
+    (p. ej. {'mqs': '/ruta/archivo.csv'}).
+    """
+    log = log or log_to_logger
+    sources = [s for s in PIPELINE_ORDER if s in sources]
+    run = IngestionRun.objects.create()
+    inicio_ciclo = time.monotonic()
+    timings = {}
+    errores = []
+
+    with ExitStack() as stack:
+        importers = []
+        for source in sources:
+            if not stack.enter_context(advisory_lock(f"ingest:{source}")):
+                log(f"⚠️ Ya hay una importación de {source} en curso; se omite en este ciclo", 'warning')
+                continue
+            importer = IMPORTERS[source]((urls or {}).get(source), force=force, log=log)
+            stack.callback(importer.close)
+            importers.append(importer)
+
+        fechas_rollups = set()
+        with ThreadPoolExecutor(max_workers=max(1, len(importers)), thread_name_prefix='ingest') as pool:
+            colas, cancelados, futures = {}, {}, {}
+            for importer in importers:
+                source = importer.source
+                colas[source] = queue.Queue(maxsize=QUEUE_CHUNKS)
+                cancelados[source] = threading.Event()
+                timings[source] = {}
+                futures[source] = pool.submit(_fetch_and_parse, importer, colas[source], cancelados[source], timings[source])
+
+            try:
+                for importer in importers:  # Orden fijo de escritura
+                    source = importer.source
+                    if colas[source].get() is not _CAMBIADO:
+                        # Sin cambios, o falló la descarga antes de empezar a parsear
+                        try:
+                            futures[source].result()
+                        except Exception as e:
+                            errores.append(f"{source}: {e}")
+                            log(f"❌ Error descargando/parseando {source}: {e}", 'error')
+                        continue
+
+                    # 'write' incluye la espera de los bloques que todavía se están parseando
+                    inicio = time.monotonic()
+                    try:
+                        importer.write(_drain(colas[source], futures[source]))
+                        importer.finish()
+                    except Exception as e:
+                        # El productor deja de parsear una fuente que ya no se va a escribir
+                        cancelados[source].set()
+                        etapa = 'descargando/parseando' if futures[source].done() and futures[source].exception() else 'escribiendo'
+                        errores.append(f"{source}: {e}")
+                        log(f"❌ Error {etapa} {source}: {e}", 'error')
+                    timings[source]['write'] = round(time.monotonic() - inicio, 3)
+                    if importer.refreshes_rollups:
+                        fechas_rollups |= importer.fechas_afectadas
+            finally:
+                # Ningún productor queda bloqueado en una cola llena al cerrar el pool
+                for cancelado in cancelados.values():
+                    cancelado.set()
+
+        inicio = time.monotonic()
+        try:
+            if fechas_rollups:
+                refresh_daily_rollups(fechas_rollups)
+                log(f"📊 Resúmenes diarios actualizados para {len(fechas_rollups)} fechas")
+        except Exception as e:
+            errores.append(f"rollups: {e}")
+            log(f"❌ Error actualizando resúmenes diarios: {e}", 'error')
+        for importer in importers:
+            if importer.fechas_afectadas:
+                invalidate(importer.source, importer.fechas_afectadas)
+        timings['rollups'] = round(time.monotonic() - inicio, 3)
+
+    run.duration = round(time.monotonic() - inicio_ciclo, 3)
+    run.finished_at = timezone.now()
+    run.status = 'error' if errores else 'ok'
+    run.timings = timings
+    run.rows = {importer.source: dict(importer.stats) for importer in importers}
+    run.errors = '\n'.join(errores)
+    run.save()
+
+    log(f"⏱️ Ciclo de importación en {run.duration:.2f}s: {timings}")
+    return run
@@ -0,0 +1,204 @@
+import logging
+from collections import Counter
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from ..models import (
+    MQS, YieldTurno, QualityAnalytics, StationDailyStats, TestcodeDailyStats, YieldDailyRollup,
+)
+from .bulk import increment
+from .dimensions import dimension_names
+
+logger = logging.getLogger(__name__)
+
+ALL = 'ALL'  # Jornada/Turno agregados en YieldDailyRollup
+# Contador del rollup de Yield (prime_<k> / cum_<k>) -> columna de YieldTurno
+YIELD_COUNTS = {
+    'pass': 'Prime_Pass',
+    'fail': 'Prime_Fail',
+    'handle': 'Prime_Handle',
+    'ntf': 'Prime_NTF_Count',
+    'defect': 'Prime_Defect_Count',
+}
+
+
+def _names(filas, columnas):
+    """{columna: {id: texto}} para las claves `<columna>` de filas agrupadas por dimensión"""
+    return {columna: dimension_names(columna, {f[columna] for f in filas}) for columna in columnas}
+
+
+def _refresh_stations(fecha):
+    # Agrupado por las claves de dimensión; el texto se traduce al final
+    filas = list(MQS.objects.filter(date=fecha).values(
+        Line=F('line_dim_id'), Family=F('family_dim_id'), Station=F('station_dim_id'),
+    ).annotate(
+        total_tests=Count('id'),
+        failures=Count('id', filter=Q(Prime=True)),
+        ntf_count=Count('id', filter=Q(NTF=True)),
+    ))
+    nombres = _names(filas, ('Line', 'Family', 'Station'))
+    StationDailyStats.objects.filter(date=fecha).delete()
+    StationDailyStats.objects.bulk_create([
+        StationDailyStats(
+            date=fecha,
+            line=nombres['Line'][f['Line']],
+            family=nombres['Family'][f['Family']],
+            station=nombres['Station'][f['Station']],
+            total_tests=f['total_tests'],
+            failures=f['failures'],
+            ntf_count=f['ntf_count'],
+        )
+        for f in filas
+    ])
+
+
+def _refresh_testcodes(fecha):
+    # Recalculo completo de los contadores (los importadores los incrementan)
+    filas = list(MQS.objects.filter(date=fecha, Prime=True).values(
+        Line=F('line_dim_id'), Family=F('family_dim_id'), Testcode=F('testcode_dim_id'),
+    ).annotate(failure_count=Count('id')))
+    nombres = _names(filas, ('Line', 'Family', 'Testcode'))
+    stats = sorted(
+        (
+            TestcodeDailyStats(
+                date=fecha,
+                line=nombres['Line'][f['Line']],
+                family=nombres['Family'][f['Family']],
+                testcode=nombres['Testcode'][f['Testcode']],
+                failure_count=f['failure_count'],
+            )
+            for f in filas
+        ),
+        key=lambda stat: (stat.line, stat.family, stat.testcode),
+    )
+    TestcodeDailyStats.objects.filter(date=fecha).delete()
+    TestcodeDailyStats.objects.bulk_create(stats)
+    return stats
+
+
+def _refresh_analytics(fecha, testcodes):
+    # Falla principal por línea/familia a partir del resumen de testcodes del día
+    top = {}
+    for stat in testcodes:
+        clave = (stat.line, stat.family)
+        if clave not in top or stat.failure_count > top[clave].failure_count:
+            top[clave] = stat
+
+    yields = {
+        (y['Line'], y['Family']): y
+        for y in YieldTurno.objects.filter(date=fecha).values('Line', 'Family').annotate(
+            handle=Sum('Prime_Handle'),
+            passed=Sum('Prime_Pass'),
+            ntf=Sum('Prime_NTF_Count'),
+        )
+    }
+
+    analytics = []
+    for line, family in set(top) | set(yields):
+        y = yields.get((line, family), {})
+        handle = y.get('handle') or 0
+        falla = top.get((line, family))
+        analytics.append(QualityAnalytics(
+            date=fecha,
+            line=line,
+            family=family,
+            top_failure=falla.testcode if falla else '',
+            failure_count=falla.failure_count if falla else 0,
+            ntf_rate=(y['ntf'] * 100 / handle) if handle else 0,
+            average_fty=(y['passed'] * 100 / handle) if handle else 0,
+            total_units=handle,
+            pass_units=y.get('passed') or 0,
+        ))
+    QualityAnalytics.objects.filter(date=fecha).delete()
+    QualityAnalytics.objects.bulk_create(analytics)
+
+
+def record_testcode_failures(objs):
+    """
+    Incrementa los contadores diarios de fallas Prime con filas MQS recién
+    insertadas (con sus claves de dimensión ya resueltas por build_mqs).
+    Llamar en la misma transacción que la inserción.
+    """
+    claves = Counter(
+        (obj.date, obj.line_dim_id, obj.family_dim_id, obj.testcode_dim_id) for obj in objs if obj.Prime
+    )
+    lineas = dimension_names('Line', {c[1] for c in claves})
+    familias = dimension_names('Family', {c[2] for c in claves})
+    testcodes = dimension_names('Testcode', {c[3] for c in claves})
+    conteos = Counter()
+    for (fecha, linea, familia, testcode), n in claves.items():
+        conteos[(fecha, lineas[linea], familias[familia], testcodes[testcode])] += n
+    increment(TestcodeDailyStats, ('date', 'line', 'family', 'testcode'), 'failure_count', conteos)
+
+
+def _yield_totals(fecha):
+    # Totales del día por (jornada, turno), por jornada y generales
+    filas = YieldTurno.objects.filter(date=fecha).values('Jornada', 'Turno').annotate(
+        **{k: Sum(columna) for k, columna in YIELD_COUNTS.items()}
+    )
+    totales = {}
+    for f in filas:
+        for clave in ((f['Jornada'], f['Turno']), (f['Jornada'], ALL), (ALL, ALL)):
+            total = totales.setdefault(clave, dict.fromkeys(YIELD_COUNTS, 0))
+            for k in YIELD_COUNTS:
+                total[k] += f[k] or 0
+    return totales
+
+
+def _refresh_yield_day(fecha):
+    """
+    Actualiza los totales de un día y corre la diferencia sobre los acumulados
+    de los días posteriores (un UPDATE por clave que cambió)
+    """
+    totales = _yield_totals(fecha)
+    existentes = {(r.jornada, r.turno): r for r in YieldDailyRollup.objects.filter(date=fecha)}
+    for jornada, turno in set(totales) | set(existentes):
+        nuevos = totales.get((jornada, turno), dict.fromkeys(YIELD_COUNTS, 0))
+        fila = existentes.get((jornada, turno))
+        if fila is None:
+            previa = YieldDailyRollup.objects.filter(jornada=jornada, turno=turno, date__lt=fecha).order_by('-date').first()
+            fila = YieldDailyRollup(date=fecha, jornada=jornada, turno=turno)
+            for k in YIELD_COUNTS:
+                setattr(fila, f'cum_{k}', getattr(previa, f'cum_{k}') if previa else 0)
+
+        delta = {k: nuevos[k] - getattr(fila, f'prime_{k}') for k in YIELD_COUNTS}
+        if fila.pk and not any(delta.values()):
+            continue
+        for k, d in delta.items():
+            setattr(fila, f'prime_{k}', nuevos[k])
+            setattr(fila, f'cum_{k}', getattr(fila, f'cum_{k}') + d)
+        fila.save()
+        cambios = {f'cum_{k}': F(f'cum_{k}') + d for k, d in delta.items() if d}
+        if cambios:
+            YieldDailyRollup.objects.filter(jornada=jornada, turno=turno, date__gt=fecha).update(**cambios)
+
+
+def refresh_yield_rollups(dates):
+    """
+    Mantiene YieldDailyRollup para las fechas afectadas, en orden cronológico
+    """
+    fechas = sorted(set(dates))
+    for fecha in fechas:
+        with transaction.atomic():
+            _refresh_yield_day(fecha)
+    return fechas
+
+
+def refresh_daily_rollups(dates, rebuild_testcodes=False):
+    """
+    Recalcula los resúmenes diarios solo para las fechas afectadas por una importación.
+    Los contadores de testcodes ya vienen incrementados desde la importación; con
+    `rebuild_testcodes` se recalculan desde MQS (reparación/backfill).
+    """
+    fechas = sorted(set(dates))
+    for fecha in fechas:
+        with transaction.atomic():
+            _refresh_stations(fecha)
+            if rebuild_testcodes:
+                testcodes = _refresh_testcodes(fecha)
+            else:
+                testcodes = list(TestcodeDailyStats.objects.filter(date=fecha).order_by('line', 'family', 'testcode'))
+            _refresh_analytics(fecha, testcodes)
+    refresh_yield_rollups(fechas)
+    if fechas:
+        logger.info(f"Resúmenes diarios actualizados para {len(fechas)} fechas ({fechas[0]} a {fechas[-1]})")
+    return fechas
@@ -0,0 +1,49 @@
+import codecs
+import csv
+import requests
+
+STREAM_CHUNK_SIZE = 64 * 1024
+REQUEST_TIMEOUT = 60  # Segundos
+
+
+def is_remote(source):
+    return source.startswith(('http://', 'https://'))
+
+
+def decode_lines(chunks, encoding='utf-8-sig'):
+    """
+    Decodifica bloques de bytes de forma incremental y genera líneas completas
+    (con su fin de línea) para que csv pueda respetar los campos multilínea.
+    """
+    decoder = codecs.getincrementaldecoder(encoding)()
+    pendiente = ''
+    for chunk in chunks:
+        pendiente += decoder.decode(chunk)
+        *lineas, pendiente = pendiente.split('\n')
+        for linea in lineas:
+            yield linea + '\n'
+    pendiente += decoder.decode(b'', final=True)
+    if pendiente:
+        yield pendiente
+
+
+def iter_lines(source, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Genera las líneas de un CSV desde una URL (descarga en streaming) o una ruta local
+    """
+    if not is_remote(source):
+        with open(source, encoding='utf-8-sig', newline='') as f:
+            yield from f
+        return
+
+    with requests.get(source, stream=True, timeout=REQUEST_TIMEOUT) as response:
+        response.raise_for_status()
+        yield from decode_lines(response.iter_content(chunk_size=chunk_size))
+
+
+def open_csv(source):
+    """
+    Devuelve un csv.DictReader perezoso sobre la fuente: las filas se parsean
+    a medida que llegan y nunca se mantiene el archivo completo en memoria.
+    """
+    return csv.DictReader(iter_lines(source))
@@ -0,0 +1,100 @@
+"""
+Conversores tipados para los formatos fijos de los CSV de origen.
+
+Las fechas y horas se decodifican por posición (slicing) y se memoizan: un
+export tiene pocas fechas distintas y las horas se repiten entre filas. Si el
+texto no tiene la forma exacta esperada se delega en strptime, así que los
+valores aceptados y los mensajes de error son los mismos que antes.
+"""
+from datetime import date, datetime, time
+from functools import lru_cache
+from django.utils import timezone
+
+DATE_CACHE_SIZE = 4096
+TIME_CACHE_SIZE = 1 << 17  # Alcanza para todos los segundos de un día
+
+
+def _digits(*parts):
+    return all(p.isdigit() for p in parts)
+
+
+@lru_cache(maxsize=DATE_CACHE_SIZE)
+def parse_date_ymd(value):
+    """'YYYY-MM-DD' -> date"""
+    if len(value) == 10 and value[4] == '-' and value[7] == '-':
+        y, m, d = value[:4], value[5:7], value[8:]
+        if _digits(y, m, d):
+            try:
+                return date(int(y), int(m), int(d))
+            except ValueError:
+                pass
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+
+@lru_cache(maxsize=DATE_CACHE_SIZE)
+def parse_date_dmy(value):
+    """'DD/MM/YYYY' -> date"""
+    if len(value) == 10 and value[2] == '/' and value[5] == '/':
+        d, m, y = value[:2], value[3:5], value[6:]
+        if _digits(y, m, d):
+            try:
+                return date(int(y), int(m), int(d))
+            except ValueError:
+                pass
+    return datetime.strptime(value, '%d/%m/%Y').date()
+
+
+@lru_cache(maxsize=TIME_CACHE_SIZE)
+def parse_time_hms(value):
+    """'HH:MM:SS' -> time"""
+    if len(value) == 8 and value[2] == ':' and value[5] == ':':
+        h, m, s = value[:2], value[3:5], value[6:]
+        if _digits(h, m, s):
+            try:
+                return time(int(h), int(m), int(s))
+            except ValueError:
+                pass
+    return datetime.strptime(value, '%H:%M:%S').time()
+
+
+@lru_cache(maxsize=TIME_CACHE_SIZE)
+def parse_time_hm(value):
+    """'HH:MM' -> time"""
+    if len(value) == 5 and value[2] == ':':
+        h, m = value[:2], value[3:]
+        if _digits(h, m):
+            try:
+                return time(int(h), int(m))
+            except ValueError:
+                pass
+    return datetime.strptime(value, '%H:%M').time()
+
+
+def combine_ts(fecha, hora):
+    """date + time -> datetime aware en la zona horaria del proyecto; sin hora, medianoche"""
+    return timezone.make_aware(datetime.combine(fecha, time.min if hora is None else hora))
+
+
+def flag(value):
+    """Columna Y/N -> bool"""
+    return value == 'Y'
+
+
+def to_float(value):
+    """Float estricto; vacío -> 0.0, texto inválido lanza ValueError"""
+    return float(value) if value else 0.0
+
+
+def to_float_or_zero(value):
+    """Float tolerante; vacío o inválido -> 0.0"""
+    if not value:
+        return 0.0
+    try:
+        return float(value)
+    except ValueError:
+        return 0.0
+
+
+def to_int(value):
+    """Entero estricto; vacío -> 0, texto inválido lanza ValueError"""
+    return int(value) if value else 0
@@ -0,0 +1,141 @@
+import hashlib
+import logging
+import threading
+from contextlib import contextmanager
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connection, connections
+
+logger = logging.getLogger(__name__)
+
+
+def lock_key(name):
+    """
+    Convierte un nombre de lock en la clave bigint que usa pg_advisory_lock
+    """
+    digest = hashlib.sha256(name.encode()).digest()
+    return int.from_bytes(digest[:8], 'big', signed=True)
+
+
+@contextmanager
+def advisory_lock(name):
+    """
+    Intenta tomar un advisory lock de sesión de Postgres sin bloquear y devuelve
+    si se obtuvo. El lock vive en la conexión del hilo actual y se libera al
+    salir del bloque (o si el proceso muere y la conexión se cierra).
+
+    En otras bases no hay advisory locks: se avisa y se continúa como si se
+    hubiera obtenido, así que la exclusión queda a cargo del despliegue.
+    """
+    if connection.vendor != 'postgresql':
+        logger.warning(f"Advisory lock '{name}' no disponible en {connection.vendor}; se continúa sin exclusión entre procesos")
+        yield True
+        return
+
+    key = lock_key(name)
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_try_advisory_lock(%s)", [key])
+        adquirido = cursor.fetchone()[0]
+    try:
+        yield adquirido
+    finally:
+        if adquirido:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT pg_advisory_unlock(%s)", [key])
+
+
+class SessionLock:
+    """
+    Advisory lock de sesión sobre una conexión propia, fuera del registro de
+    conexiones de Django: ni close_old_connections ni los reintentos ante
+    errores de base (que cierran la conexión del hilo y con ella el lock)
+    la tocan. Dura hasta release() o hasta que se corta la conexión, cosa
+    que held() detecta para que el dueño deje de actuar como tal.
+
+    Como advisory_lock, en otras bases avisa y se comporta como si se hubiera
+    obtenido.
+    """
+
+    def __init__(self, name, using=DEFAULT_DB_ALIAS):
+        self.name = name
+        self.key = lock_key(name)
+        self.using = using
+        self._connection = None
+        # La conexión se comparte entre el hilo principal y los de los jobs
+        self._mutex = threading.Lock()
+
+    @property
+    def supported(self):
+        return connections[self.using].vendor == 'postgresql'
+
+    def acquire(self):
+        """
+        Intenta tomar el lock sin bloquear; devuelve si se obtuvo
+        """
+        if not self.supported:
+            logger.warning(f"Advisory lock '{self.name}' no disponible en {connections[self.using].vendor}; "
+                           "se continúa sin exclusión entre procesos")
+            return True
+        with self._mutex:
+            conexion = connections.create_connection(self.using)
+            conexion.inc_thread_sharing()
+            try:
+                with conexion.cursor() as cursor:
+                    cursor.execute("SELECT pg_try_advisory_lock(%s)", [self.key])
+                    adquirido = cursor.fetchone()[0]
+            except Exception:
+                self._close(conexion)
+                raise
+            if not adquirido:
+                self._close(conexion)
+                return False
+            self._connection = conexion
+            return True
+
+    def held(self):
+        """
+        Comprueba en pg_locks que la sesión sigue viva y conserva el lock
+        """
+        if not self.supported:
+            return True
+        with self._mutex:
+            if self._connection is None:
+                return False
+            try:
+                with self._connection.cursor() as cursor:
+                    # Un advisory lock bigint figura como classid (32 bits altos) + objid (32 bajos)
+                    cursor.execute(
+                        "SELECT EXISTS (SELECT 1 FROM pg_locks WHERE locktype = 'advisory' "
+                        "AND classid = %s::bigint::oid AND objid = %s::bigint::oid AND objsubid = 1 "
+                        "AND pid = pg_backend_pid() AND granted)",
+                        [(self.key >> 32) & 0xFFFFFFFF, self.key & 0xFFFFFFFF],
+                    )
+                    return cursor.fetchone()[0]
+            except DatabaseError as e:
+                logger.error(f"Advisory lock '{self.name}': se perdió la conexión que lo sostenía ({e})")
+                return False
+
+    def release(self):
+        with self._mutex:
+            conexion, self._connection = self._connection, None
+            if conexion is None:
+                return
+            try:
+                with conexion.cursor() as cursor:
+                    cursor.execute("SELECT pg_advisory_unlock(%s)", [self.key])
+            except DatabaseError:
+                # Con la sesión cortada el lock ya no existe
+                pass
+            finally:
+                self._close(conexion)
+
+    @staticmethod
+    def _close(conexion):
+        try:
+            conexion.close()
+        finally:
+            conexion.dec_thread_sharing()
+
+    def __enter__(self):
+        return self.acquire()
+
+    def __exit__(self, *exc):
+        self.release()
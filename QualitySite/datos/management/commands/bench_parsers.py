@@ -0,0 +1,124 @@
+import csv
+import random
+import time
+from datetime import date, datetime, timedelta
+from django.core.management.base import BaseCommand
+from QualitySite.datos.ingest.parsers import parse_mes_row, parse_mqs_row, parse_mqs_values
+from QualitySite.datos.ingest.typed import (
+    parse_date_dmy, parse_date_ymd, parse_time_hm, parse_time_hms,
+)
+
+
+def _legacy_float(value):
+    try:
+        return float(value) if value else 0.0
+    except ValueError:
+        return 0.0
+
+
+def legacy_parse_mqs_row(row):
+    """Parseo por fila anterior (strptime + float por campo), como referencia"""
+    fecha = datetime.strptime(row['Date'], '%Y-%m-%d').date()
+    hora = datetime.strptime(row['Time'], '%H:%M:%S').time()
+    return {
+        'TrackId': row.get('TrackId') or '0',
+        'date': fecha,
+        'Time': hora,
+        'Station': row.get('Station') or '0',
+        'NTF': row.get('NTF?') == 'Y',
+        'Test_Val': _legacy_float(row.get('Test Val')),
+        'Line': row.get('Line') or '0',
+        'Family': row.get('Family') or '0',
+        'Model': row.get('Model') or '0',
+        'Process': row.get('Process') or '0',
+        'Fixture': row.get('Fixture') or '0',
+        'Testcode': row.get('Testcode') or '0',
+        'Testcode_Desc': row.get('Testcode Desc') or '0',
+        'Fail_Desc': row.get('Fail Desc') or '',
+        'TestTime': float(row['TestTime']) if row.get('TestTime') else 0.0,
+        'LL': float(row['LL']) if row.get('LL') else 0.0,
+        'UL': float(row['UL']) if row.get('UL') else 0.0,
+        'Prime': row.get('Prime?') == 'Y',
+    }
+
+
+def legacy_parse_mes_dates(row):
+    return (
+        datetime.strptime(row["FECHA REPARACION"], "%Y-%m-%d").date(),
+        datetime.strptime(row["HORA REPARACION"], "%H:%M").time(),
+        datetime.strptime(row["FECHA RECHAZO"], "%d/%m/%Y").date(),
+        datetime.strptime(row["HORA RECHAZO"], "%H:%M").time(),
+    )
+
+
+def _filas_sinteticas(cantidad, dias):
+    """Filas MQS/MES con la forma de los exports: pocas fechas, horas repetidas"""
+    rnd = random.Random(42)
+    inicio = date(2025, 5, 1)
+    mqs, mes = [], []
+    for i in range(cantidad):
+        fecha = inicio + timedelta(days=rnd.randrange(dias))
+        hora = f"{rnd.randrange(24):02d}:{rnd.randrange(60):02d}:{rnd.randrange(60):02d}"
+        mqs.append({
+            'Name': 'x', 'ProcessQty': '1', 'Date': fecha.isoformat(), 'Time': hora,
+            'Line': f"L{rnd.randrange(4)}", 'Family': 'FA', 'Model': 'M', 'Process': 'P',
+            'Station': f"S{rnd.randrange(10)}", 'Fixture': 'F', 'TrackId': f"T{i}",
+            'NTF?': rnd.choice('YN'), 'Prime?': rnd.choice('YN'), 'Testcode': f"TC{rnd.randrange(50)}",
+            'Testcode Desc': 'desc', 'Fail Desc': 'fd', 'TestTime': '1.5',
+            'Test Val': f"{rnd.random():.6f}", 'LL': '0.1', 'UL': '0.9',
+        })
+        mes.append({
+            'MODELO': 'M1', 'NS': f"T{i}", 'FECHA REPARACION': fecha.isoformat(), 'HORA REPARACION': hora[:5],
+            'FECHA RECHAZO': fecha.strftime('%d/%m/%Y'), 'HORA RECHAZO': hora[:5],
+            'POSICION': 'P', 'FUNCION': 'F', 'ACCION CORRECTIVA': 'A', 'ORIGEN': 'O',
+        })
+    return mqs, mes
+
+
+class Command(BaseCommand):
+    help = "Micro-benchmark del parser tipado (slicing + memo) contra el parseo anterior con strptime"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100000, help="Filas sintéticas a parsear")
+        parser.add_argument('--days', type=int, default=30, help="Fechas distintas en las filas sintéticas")
+        parser.add_argument('--source', help="CSV local de MQS a usar en lugar de filas sintéticas")
+        parser.add_argument('--repeat', type=int, default=3, help="Pasadas por variante (se toma la mejor)")
+
+    def _medir(self, nombre, funcion, filas):
+        mejor = None
+        for _ in range(self._repeat):
+            for cache in (parse_date_ymd, parse_date_dmy, parse_time_hms, parse_time_hm):
+                cache.cache_clear()  # Cada pasada arranca con la memo vacía
+            inicio = time.perf_counter()
+            for row in filas:
+                funcion(row)
+            duracion = time.perf_counter() - inicio
+            mejor = duracion if mejor is None else min(mejor, duracion)
+        velocidad = len(filas) / mejor if mejor > 0 else 0
+        self.stdout.write(f"⏱️ {nombre}: {mejor * 1000:.1f} ms ({velocidad:.0f} filas/s)")
+        return mejor
+
+    def handle(self, *args, **kwargs):
+        self._repeat = max(1, kwargs['repeat'])
+        mqs, mes = _filas_sinteticas(kwargs['rows'], kwargs['days'])
+        if kwargs.get('source'):
+            with open(kwargs['source'], newline='', encoding='utf-8-sig') as f:
+                mqs = list(csv.DictReader(f))
+        self.stdout.write(f"📏 {len(mqs)} filas MQS, {len(mes)} filas MES")
+
+        # Los dos parsers tienen que devolver exactamente lo mismo
+        for row in mqs[:1000]:
+            if legacy_parse_mqs_row(row) != parse_mqs_row(row):
+                self.stderr.write(self.style.ERROR(f"❌ Resultado distinto para la fila {row}"))
+                return
+
+        antes = self._medir("MQS strptime (anterior)", legacy_parse_mqs_row, mqs)
+        dicts = self._medir("MQS tipado -> dict", parse_mqs_row, mqs)
+        tuplas = self._medir("MQS tipado -> tupla", parse_mqs_values, mqs)
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ MQS: {antes / dicts:.1f}x (dict), {antes / tuplas:.1f}x (tupla)"
+        ))
+
+        antes = self._medir("MES fechas strptime (anterior)", legacy_parse_mes_dates, mes)
+        despues = self._medir("MES fila completa tipada", parse_mes_row, mes)
+        self.stdout.write(self.style.SUCCESS(f"✅ MES: {antes / despues:.1f}x"))
@@ -0,0 +1,56 @@
+import time
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+from QualitySite.datos.mixins import api_fields, select_api_fields
+from QualitySite.datos.models import MQS, MES, YieldTurno
+from QualitySite.datos.serializers import MQSSerializer, MESSerializer, YieldTurnoSerializer
+
+MODELOS = {
+    'mqs': (MQS, MQSSerializer),
+    'mes': (MES, MESSerializer),
+    'yield': (YieldTurno, YieldTurnoSerializer),
+}
+
+class Command(BaseCommand):
+    help = "Compara ModelSerializer contra la ruta rápida con .values() al serializar a JSON"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model', choices=sorted(MODELOS), default='mqs', help="Tabla a medir")
+        parser.add_argument('--rows', type=int, default=1000, help="Filas por pasada (como un page_size)")
+        parser.add_argument('--repeat', type=int, default=5, help="Cantidad de pasadas por variante")
+        parser.add_argument('--fields', help="Lista de campos separada por comas (sparse fieldset)")
+
+    def handle(self, *args, **kwargs):
+        model, serializer_class = MODELOS[kwargs['model']]
+        rows = kwargs['rows']
+        fields = [f.strip() for f in kwargs['fields'].split(',')] if kwargs.get('fields') else None
+        queryset = select_api_fields(model.objects.order_by('-id'), fields)
+        renderer = JSONRenderer()
+
+        def serializer():
+            data = serializer_class(queryset[:rows], many=True, fields=fields).data
+            return renderer.render(data)
+
+        def values():
+            qs = queryset.values(*(fields or api_fields(model)))
+            return renderer.render(list(qs[:rows]))
+
+        total = queryset[:rows].count()
+        self.stdout.write(f"📏 {total} filas de {model.__name__} x {kwargs['repeat']} pasadas"
+                          + (f" con fields={','.join(fields)}" if fields else ""))
+
+        resultados = {}
+        for nombre, variante in (('ModelSerializer', serializer), ('values()', values)):
+            variante()  # calentamiento
+            inicio = time.perf_counter()
+            for _ in range(kwargs['repeat']):
+                cuerpo = variante()
+            duracion = (time.perf_counter() - inicio) / kwargs['repeat']
+            resultados[nombre] = duracion
+            velocidad = total / duracion if duracion > 0 else 0
+            self.stdout.write(f"⏱️ {nombre}: {duracion * 1000:.1f} ms/pasada ({velocidad:.0f} filas/s, {len(cuerpo)} bytes)")
+
+        if resultados['values()'] > 0:
+            self.stdout.write(self.style.SUCCESS(
+                f"✅ Ruta rápida {resultados['ModelSerializer'] / resultados['values()']:.1f}x más rápida"
+            ))
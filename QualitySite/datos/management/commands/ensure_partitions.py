@@ -0,0 +1,34 @@
+from datetime import datetime
+from django.core.management.base import BaseCommand, CommandError
+from QualitySite.datos.models import MQS
+from QualitySite.datos.partitions import (
+    MONTHS_AHEAD, PARTITIONED_TABLES, ensure_partitions, is_partitioned, list_partitions, scanned_partitions,
+)
+
+class Command(BaseCommand):
+    help = "Crea las particiones mensuales futuras de quality_mqs y muestra qué particiones recorre una consulta por fechas"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--months-ahead', type=int, default=MONTHS_AHEAD, help="Meses a crear por adelantado")
+        parser.add_argument('--check-from', help="Fecha inicial (YYYY-MM-DD) de la consulta a comprobar")
+        parser.add_argument('--check-to', help="Fecha final (YYYY-MM-DD) de la consulta a comprobar")
+
+    def handle(self, *args, **kwargs):
+        for table in PARTITIONED_TABLES:
+            if not is_partitioned(table):
+                self.stdout.write(self.style.WARNING(f"⚠️ {table} no está particionada (requiere Postgres y la migración 0011)"))
+                return
+            for nombre in ensure_partitions(table, kwargs['months_ahead']):
+                self.stdout.write(self.style.SUCCESS(f"✅ Partición {nombre} creada"))
+            particiones = list_partitions(table)
+            if particiones:
+                self.stdout.write(f"📅 {table}: {len(particiones)} particiones, de {particiones[0][1]} a {particiones[-1][1]}")
+
+        if kwargs.get('check_from') or kwargs.get('check_to'):
+            try:
+                date_from = datetime.strptime(kwargs['check_from'], '%Y-%m-%d').date()
+                date_to = datetime.strptime(kwargs['check_to'], '%Y-%m-%d').date()
+            except (TypeError, ValueError):
+                raise CommandError("--check-from y --check-to deben ser fechas YYYY-MM-DD")
+            recorridas = scanned_partitions(MQS.objects.filter(date__range=[date_from, date_to]))
+            self.stdout.write(f"🔎 Consulta de {date_from} a {date_to}: recorre {', '.join(recorridas) or 'ninguna partición'}")
@@ -0,0 +1,48 @@
+import time
+from datetime import datetime
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+from QualitySite.datos.exports import DATASETS, export_dataset, export_root
+
+class Command(BaseCommand):
+    help = "Exporta snapshots Parquet particionados por fecha de MQS, MES y Yield (solo particiones nuevas)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--datasets',
+            nargs='+',
+            choices=sorted(DATASETS),
+            default=sorted(DATASETS),
+            help="Datasets a exportar (por defecto todos)",
+        )
+        parser.add_argument('--date-from', help="Fecha inicial (YYYY-MM-DD)")
+        parser.add_argument('--date-to', help="Fecha final (YYYY-MM-DD)")
+        parser.add_argument(
+            '--refresh-days',
+            type=int,
+            default=2,
+            help="Reescribir siempre las particiones de los últimos N días (todavía reciben filas)",
+        )
+        parser.add_argument('--force', action='store_true', help="Reescribir todas las particiones del rango")
+
+    def handle(self, *args, **kwargs):
+        try:
+            date_from = datetime.strptime(kwargs['date_from'], '%Y-%m-%d').date() if kwargs.get('date_from') else None
+            date_to = datetime.strptime(kwargs['date_to'], '%Y-%m-%d').date() if kwargs.get('date_to') else None
+        except ValueError as e:
+            raise CommandError(f"Formato de fecha inválido: {e}")
+
+        self.stdout.write(f"📦 Exportando a {export_root()}")
+        try:
+            for dataset in kwargs['datasets']:
+                inicio = time.monotonic()
+                particiones = filas = 0
+                for fecha, cantidad in export_dataset(dataset, date_from, date_to, kwargs['refresh_days'], kwargs['force']):
+                    particiones += 1
+                    filas += cantidad
+                    self.stdout.write(f"  {dataset} {fecha}: {cantidad} filas")
+                self.stdout.write(self.style.SUCCESS(
+                    f"✅ {dataset}: {particiones} particiones, {filas} filas en {time.monotonic() - inicio:.2f}s"
+                ))
+        except ImproperlyConfigured as e:
+            raise CommandError(str(e))
@@ -0,0 +1,97 @@
+import asyncio
+import itertools
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.error import HTTPError
+from urllib.parse import urlencode
+from urllib.request import urlopen
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import AsyncClient, override_settings
+from django.urls import reverse
+
+class Command(BaseCommand):
+    help = ("Compara latencias (p50/p99) de las vistas analíticas síncronas y async con clientes concurrentes. "
+            "Sin --base-url las requests se resuelven en proceso por el handler ASGI de Django.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--paths', nargs='+', help="Rutas a medir (por defecto dashboard/ y async/dashboard/)")
+        parser.add_argument('--clients', type=int, default=10, help="Clientes concurrentes")
+        parser.add_argument('--requests', type=int, default=20, help="Requests por cliente")
+        parser.add_argument('--days', type=int, default=7, help="Parámetro days del dashboard")
+        parser.add_argument('--param', action='append', default=[], metavar='CLAVE=VALOR',
+                            help="Parámetro extra de la query (repetible, ej. --param date_from=2025-01-01)")
+        parser.add_argument('--cold', action='store_true',
+                            help="Agrega un parámetro distinto por request para no responder desde la caché")
+        parser.add_argument('--base-url', help="Servidor a medir (ej. http://localhost:8000); si no, en proceso")
+
+    def handle(self, *args, **kwargs):
+        paths = kwargs['paths'] or [reverse('dashboard-summary'), reverse('async-dashboard-summary')]
+        clients, per_client = kwargs['clients'], kwargs['requests']
+        self.nonce = itertools.count()
+        self.stdout.write(f"🚦 {clients} clientes x {per_client} requests por ruta"
+                          + (" (sin caché)" if kwargs['cold'] else "")
+                          + f" contra {kwargs['base_url'] or 'el handler ASGI en proceso'}")
+
+        for path in paths:
+            if kwargs['base_url']:
+                latencias, errores, duracion = self._run_http(kwargs['base_url'], path, clients, per_client, kwargs)
+            else:
+                # El cliente de prueba usa el host 'testserver'
+                with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+                    latencias, errores, duracion = asyncio.run(self._run_asgi(path, clients, per_client, kwargs))
+            self._report(path, latencias, errores, duracion)
+
+    def _query(self, kwargs):
+        params = {'days': kwargs['days'], **dict(p.split('=', 1) for p in kwargs['param'])}
+        if kwargs['cold']:
+            params['nocache'] = next(self.nonce)
+        return params
+
+    async def _run_asgi(self, path, clients, per_client, kwargs):
+        client = AsyncClient(raise_request_exception=False)
+        latencias, errores = [], 0
+
+        async def cliente():
+            nonlocal errores
+            for _ in range(per_client):
+                inicio = time.perf_counter()
+                response = await client.get(path, self._query(kwargs))
+                latencias.append(time.perf_counter() - inicio)
+                if response.status_code != 200:
+                    errores += 1
+
+        await client.get(path, self._query(kwargs))  # calentamiento
+        inicio = time.perf_counter()
+        await asyncio.gather(*(cliente() for _ in range(clients)))
+        return latencias, errores, time.perf_counter() - inicio
+
+    def _run_http(self, base_url, path, clients, per_client, kwargs):
+        def request():
+            url = f"{base_url.rstrip('/')}{path}?{urlencode(self._query(kwargs))}"
+            inicio = time.perf_counter()
+            try:
+                with urlopen(url) as response:
+                    response.read()
+                    ok = response.status == 200
+            except HTTPError:
+                ok = False
+            return time.perf_counter() - inicio, ok
+
+        request()  # calentamiento
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=clients) as pool:
+            resultados = list(pool.map(lambda _: request(), range(clients * per_client)))
+        duracion = time.perf_counter() - inicio
+        return [r[0] for r in resultados], sum(1 for r in resultados if not r[1]), duracion
+
+    def _report(self, path, latencias, errores, duracion):
+        ordenadas = sorted(latencias)
+        p50 = statistics.median(ordenadas) * 1000
+        p99 = ordenadas[min(len(ordenadas) - 1, int(len(ordenadas) * 0.99))] * 1000
+        media = statistics.mean(ordenadas) * 1000
+        self.stdout.write(f"⏱️ {path}: p50 {p50:.1f} ms, p99 {p99:.1f} ms, media {media:.1f} ms, "
+                          f"{len(latencias) / duracion:.0f} req/s")
+        if errores:
+            self.stdout.write(self.style.WARNING(f"⚠️ {errores} de {len(latencias)} requests con error"))
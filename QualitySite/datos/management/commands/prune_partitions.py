@@ -0,0 +1,49 @@
+from datetime import date
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+from QualitySite.datos.cache import invalidate
+from QualitySite.datos.exports import write_partition
+from QualitySite.datos.models import MQS
+from QualitySite.datos.partitions import add_months, detach_partition, is_partitioned, list_partitions, month_start
+
+class Command(BaseCommand):
+    help = "Retención de MQS: separa (o elimina) las particiones mensuales más viejas que --keep-months, sin DELETE masivos"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--keep-months', type=int, default=24, help="Meses completos a conservar además del actual")
+        parser.add_argument('--archive', action='store_true', help="Exportar cada día a Parquet antes de separar la partición")
+        parser.add_argument('--drop', action='store_true', help="Eliminar la partición en lugar de dejarla como tabla independiente")
+        parser.add_argument('--dry-run', action='store_true', help="Solo mostrar las particiones afectadas")
+
+    def handle(self, *args, **kwargs):
+        table = MQS._meta.db_table
+        if not is_partitioned(table):
+            raise CommandError(f"{table} no está particionada (requiere Postgres y la migración 0011)")
+        if kwargs['keep_months'] < 1:
+            raise CommandError("--keep-months debe ser al menos 1")
+
+        limite = add_months(month_start(date.today()), -kwargs['keep_months'])
+        viejas = [(mes, nombre) for mes, nombre in list_partitions(table) if mes < limite]
+        if not viejas:
+            self.stdout.write(f"No hay particiones anteriores a {limite}")
+            return
+
+        accion = 'eliminar' if kwargs['drop'] else 'separar'
+        for mes, nombre in viejas:
+            if kwargs['dry_run']:
+                self.stdout.write(f"🔎 Se va a {accion} {nombre}")
+                continue
+
+            if kwargs['archive']:
+                fechas = MQS.objects.filter(date__gte=mes, date__lt=add_months(mes, 1)).dates('date', 'day')
+                try:
+                    filas = sum(write_partition('mqs', fecha) for fecha in fechas)
+                except ImproperlyConfigured as e:
+                    raise CommandError(str(e))
+                self.stdout.write(f"📦 {nombre}: {filas} filas archivadas en Parquet")
+
+            detach_partition(table, mes, drop=kwargs['drop'])
+            invalidate('mqs', [mes])
+            self.stdout.write(self.style.SUCCESS(
+                f"✅ {nombre} {'eliminada' if kwargs['drop'] else 'separada (tabla independiente, lista para pg_dump)'}"
+            ))
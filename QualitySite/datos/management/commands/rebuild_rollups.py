@@ -0,0 +1,37 @@
+from datetime import datetime, timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max, Min
+from QualitySite.datos.models import MQS, YieldTurno
+from QualitySite.datos.ingest.rollups import refresh_daily_rollups
+
+class Command(BaseCommand):
+    help = "Recalcula desde MQS/Yield los resúmenes diarios (estaciones, contadores de testcodes, QualityAnalytics y acumulados de Yield) para un rango de fechas"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date-from', help="Fecha inicial (YYYY-MM-DD); por defecto la primera con datos")
+        parser.add_argument('--date-to', help="Fecha final (YYYY-MM-DD); por defecto la última con datos")
+
+    def handle(self, *args, **kwargs):
+        try:
+            date_from = datetime.strptime(kwargs['date_from'], '%Y-%m-%d').date() if kwargs.get('date_from') else None
+            date_to = datetime.strptime(kwargs['date_to'], '%Y-%m-%d').date() if kwargs.get('date_to') else None
+        except ValueError as e:
+            raise CommandError(f"Formato de fecha inválido: {e}")
+
+        if date_from is None or date_to is None:
+            limites = [
+                MQS.objects.aggregate(inicio=Min('date'), fin=Max('date')),
+                YieldTurno.objects.aggregate(inicio=Min('date'), fin=Max('date')),
+            ]
+            inicios = [l['inicio'] for l in limites if l['inicio']]
+            fines = [l['fin'] for l in limites if l['fin']]
+            if not inicios:
+                self.stdout.write("No hay datos para resumir")
+                return
+            date_from = date_from or min(inicios)
+            date_to = date_to or max(fines)
+
+        dias = (date_to - date_from).days + 1
+        self.stdout.write(f"📊 Recalculando resúmenes de {date_from} a {date_to} ({dias} días)...")
+        refresh_daily_rollups((date_from + timedelta(days=i) for i in range(dias)), rebuild_testcodes=True)
+        self.stdout.write(self.style.SUCCESS("✅ Resúmenes actualizados"))
@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand, CommandError
+from QualitySite.datos.ingest.importers import command_log
+from QualitySite.datos.ingest.pipeline import PIPELINE_ORDER, run_pipeline
+
+class Command(BaseCommand):
+    help = "Ejecuta un ciclo del pipeline de importación: descarga en paralelo y escribe MES → MQS → Yield"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sources',
+            nargs='+',
+            choices=PIPELINE_ORDER,
+            default=list(PIPELINE_ORDER),
+            help="Fuentes a importar (por defecto todas)",
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help="Ignora ETag/Last-Modified y el hash del último contenido importado",
+        )
+
+        parser.add_argument(
+            '--url',
+            action='append',
+            default=[],
+            metavar='FUENTE=URL',
+            help="Reemplaza la URL o ruta local de una fuente, p. ej. --url mqs=/tmp/mqs.csv",
+        )
+
+    def handle(self, *args, **kwargs):
+        urls = {}
+        for valor in kwargs['url']:
+            source, sep, url = valor.partition('=')
+            if not sep or source not in PIPELINE_ORDER or not url:
+                raise CommandError(f"--url inválido: {valor} (se espera FUENTE=URL con FUENTE en {', '.join(PIPELINE_ORDER)})")
+            urls[source] = url
+
+        run = run_pipeline(kwargs['sources'], force=kwargs['force'], log=command_log(self), urls=urls)
+
+        self.stdout.write(self.style.SUCCESS(f"✅ Ciclo #{run.pk} terminado ({run.status}) en {run.duration:.2f}s"))
+        for source, etapas in run.timings.items():
+            if isinstance(etapas, dict):
+                detalle = ', '.join(f"{etapa} {segundos:.2f}s" for etapa, segundos in etapas.items())
+                self.stdout.write(f"⏱️ {source}: {detalle}")
+            else:
+                self.stdout.write(f"⏱️ {source}: {etapas:.2f}s")
+        for source, contadores in run.rows.items():
+            self.stdout.write(f"📊 {source}: {contadores}")
+        if run.errors:
+            self.stderr.write(self.style.ERROR(f"❌ Errores:\n{run.errors}"))
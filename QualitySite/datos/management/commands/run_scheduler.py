@@ -0,0 +1,62 @@
+import signal
+import sys
+import time
+from django.core.management.base import BaseCommand, CommandError
+from QualitySite.datos.locks import SessionLock
+from QualitySite.jobs import build_scheduler
+
+SCHEDULER_LOCK = 'quality-scheduler'
+
+class Command(BaseCommand):
+    help = ("Ejecuta el scheduler de importaciones como proceso dedicado (una sola instancia por base de datos). "
+            "La exclusión usa un advisory lock de Postgres: en otras bases solo se registra una advertencia "
+            "y no hay exclusión entre procesos, así que cada despliegue debe correr una sola instancia.")
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--wait',
+            action='store_true',
+            help="Si otra instancia tiene el lock, esperar en standby hasta obtenerlo en lugar de salir",
+        )
+        parser.add_argument(
+            '--retry-seconds',
+            type=int,
+            default=30,
+            help="Segundos entre intentos de tomar el lock con --wait",
+        )
+
+    def handle(self, *args, **kwargs):
+        while True:
+            # El lock vive en una conexión propia que los jobs y los reintentos
+            # de django_apscheduler no cierran
+            lock = SessionLock(SCHEDULER_LOCK)
+            with lock as adquirido:
+                if adquirido and not self._ejecutar(lock):
+                    return
+            if adquirido:
+                if not kwargs['wait']:
+                    raise CommandError("Se perdió el lock del scheduler; se detuvieron los jobs")
+                self.stderr.write(self.style.WARNING("⚠️ Se perdió el lock del scheduler; se vuelve a standby"))
+            elif not kwargs['wait']:
+                self.stderr.write(self.style.WARNING("⚠️ Otra instancia del scheduler ya está corriendo; se sale"))
+                return
+            self.stdout.write(f"⏳ Scheduler en standby, reintentando en {kwargs['retry_seconds']}s...")
+            time.sleep(kwargs['retry_seconds'])
+
+    def _ejecutar(self, lock):
+        """
+        Corre el scheduler hasta Ctrl+C/SIGTERM (devuelve False) o hasta que
+        un job detecta que se perdió el lock (devuelve True)
+        """
+        scheduler = build_scheduler(lock=lock)
+        # systemd/supervisor detienen con SIGTERM: cerrar igual que con Ctrl+C
+        signal.signal(signal.SIGTERM, lambda *args: sys.exit(0))
+        self.stdout.write(self.style.SUCCESS("🕒 Scheduler iniciado (Ctrl+C para detener)"))
+        try:
+            scheduler.start()
+        except (KeyboardInterrupt, SystemExit):
+            self.stdout.write("Deteniendo scheduler...")
+            scheduler.shutdown()
+            self.stdout.write(self.style.SUCCESS("✅ Scheduler detenido"))
+            return False
+        return True
@@ -0,0 +1,31 @@
+"""
+Definición canónica de las métricas de Yield (FTY, DPHU, NTF).
+
+Todas las tasas se expresan en porcentaje sobre Prime_Handle y valen 0 cuando
+no hubo equipos procesados.
+"""
+
+
+def yield_metrics(prime_pass, prime_defect, prime_ntf, prime_handle):
+    """
+    Calcula (FTY, DPHU, NTF) para un turno
+    """
+    if prime_handle <= 0:
+        return 0.0, 0.0, 0.0
+    return (
+        prime_pass * 100 / prime_handle,
+        prime_defect * 100 / prime_handle,
+        prime_ntf * 100 / prime_handle,
+    )
+
+
+def yield_metrics_columns(prime_pass, prime_defect, prime_ntf, prime_handle):
+    """
+    Versión por columnas: recibe listas paralelas y devuelve las listas
+    (FTY, DPHU, NTF), aplicando yield_metrics a cada turno del bloque.
+    """
+    filas = list(map(yield_metrics, prime_pass, prime_defect, prime_ntf, prime_handle))
+    if not filas:
+        return [], [], []
+    fty, dphu, ntf = map(list, zip(*filas))
+    return fty, dphu, ntf
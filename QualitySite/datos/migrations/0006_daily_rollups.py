@@ -0,0 +1,70 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datos', '0005_ingestioncheckpoint_http_validators'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='yieldturno',
+            name='Jornada',
+            field=models.CharField(choices=[('Day', 'Día'), ('Night', 'Noche')], max_length=10),
+        ),
+        migrations.CreateModel(
+            name='QualityAnalytics',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('line', models.CharField(max_length=255)),
+                ('family', models.CharField(max_length=255)),
+                ('top_failure', models.CharField(max_length=255)),
+                ('failure_count', models.IntegerField(default=0)),
+                ('ntf_rate', models.FloatField(default=0)),
+                ('average_fty', models.FloatField(default=0)),
+                ('total_units', models.IntegerField(default=0)),
+                ('pass_units', models.IntegerField(default=0)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['date'], name='datos_quali_date_f17108_idx'), models.Index(fields=['line', 'family'], name='datos_quali_line_57d832_idx')],
+                'unique_together': {('date', 'line', 'family')},
+            },
+        ),
+        migrations.CreateModel(
+            name='StationDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('line', models.CharField(max_length=255)),
+                ('family', models.CharField(max_length=255)),
+                ('station', models.CharField(max_length=255)),
+                ('total_tests', models.IntegerField(default=0)),
+                ('failures', models.IntegerField(default=0)),
+                ('ntf_count', models.IntegerField(default=0)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['date'], name='datos_stati_date_86e7ce_idx')],
+                'unique_together': {('date', 'line', 'family', 'station')},
+            },
+        ),
+        migrations.CreateModel(
+            name='TestcodeDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('line', models.CharField(max_length=255)),
+                ('family', models.CharField(max_length=255)),
+                ('testcode', models.CharField(max_length=255)),
+                ('testcode_desc', models.TextField(blank=True, default='')),
+                ('failure_count', models.IntegerField(default=0)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['date'], name='datos_testc_date_bbe4e4_idx'), models.Index(fields=['family', 'date'], name='datos_testc_family_d4ca42_idx')],
+                'unique_together': {('date', 'line', 'family', 'testcode')},
+            },
+        ),
+    ]
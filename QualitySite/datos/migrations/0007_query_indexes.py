@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datos', '0006_daily_rollups'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='mes',
+            index=models.Index(fields=['NS'], name='mes_ns_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='mes',
+            index=models.Index(fields=['FECHA_REPARACION', 'HORA_REPARACION'], name='mes_fecha_hora_rep_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='mqs',
+            index=models.Index(fields=['date', 'Line', 'Family', 'Process'], name='mqs_date_line_fam_proc_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='mqs',
+            index=models.Index(condition=models.Q(('Prime', True)), fields=['date', 'Family', 'Testcode'], name='mqs_prime_date_fam_tc_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='mqs',
+            index=models.Index(condition=models.Q(('Prime', True)), fields=['Family', 'date'], name='mqs_prime_family_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='yieldturno',
+            index=models.Index(fields=['date', 'Line', 'Family'], name='yield_date_line_family_idx'),
+        ),
+    ]
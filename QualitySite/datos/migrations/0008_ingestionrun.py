@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datos', '0007_query_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IngestionRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('started_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('status', models.CharField(choices=[('running', 'En curso'), ('ok', 'Completada'), ('error', 'Con errores')], default='running', max_length=10)),
+                ('duration', models.FloatField(default=0)),
+                ('timings', models.JSONField(default=dict)),
+                ('rows', models.JSONField(default=dict)),
+                ('errors', models.TextField(blank=True, default='')),
+            ],
+            options={
+                'ordering': ['-started_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:17
+
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def poblar_testcodes(apps, schema_editor):
+    # Las descripciones salen de los rollups existentes antes de borrar la columna
+    TestcodeDailyStats = apps.get_model('datos', 'TestcodeDailyStats')
+    DimTestcode = apps.get_model('datos', 'DimTestcode')
+    filas = TestcodeDailyStats.objects.values('testcode').annotate(desc=Max('testcode_desc'))
+    DimTestcode.objects.bulk_create(
+        [DimTestcode(code=f['testcode'], description=f['desc'] or '') for f in filas],
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datos', '0008_ingestionrun'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DimTestcode',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('code', models.CharField(max_length=255, unique=True)),
+                ('description', models.TextField(blank=True, default='')),
+            ],
+        ),
+        migrations.RunPython(poblar_testcodes, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='testcodedailystats',
+            name='testcode_desc',
+        ),
+    ]
@@ -0,0 +1,148 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Max, OuterRef, Subquery
+
+# (columna de MQS, FK, modelo de dimensión, campo clave)
+DIMENSIONES = [
+    ('Line', 'line_dim', 'DimLine', 'name'),
+    ('Family', 'family_dim', 'DimFamily', 'name'),
+    ('Model', 'model_dim', 'DimModel', 'name'),
+    ('Process', 'process_dim', 'DimProcess', 'name'),
+    ('Station', 'station_dim', 'DimStation', 'name'),
+    ('Fixture', 'fixture_dim', 'DimFixture', 'name'),
+    ('Testcode', 'testcode_dim', 'DimTestcode', 'code'),
+]
+
+
+def poblar_dimensiones(apps, schema_editor):
+    MQS = apps.get_model('datos', 'MQS')
+    DimTestcode = apps.get_model('datos', 'DimTestcode')
+
+    # DimTestcode ya tiene los testcodes con fallas Prime; faltan los demás
+    DimTestcode.objects.bulk_create(
+        [
+            DimTestcode(code=f['Testcode'], description=f['desc'] or '')
+            for f in MQS.objects.order_by().values('Testcode').annotate(desc=Max('Testcode_Desc'))
+        ],
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+
+    asignaciones = {}
+    for columna, fk, modelo, clave in DIMENSIONES:
+        Dim = apps.get_model('datos', modelo)
+        if modelo != 'DimTestcode':
+            valores = MQS.objects.order_by().values_list(columna, flat=True).distinct()
+            Dim.objects.bulk_create([Dim(**{clave: v}) for v in valores], batch_size=1000, ignore_conflicts=True)
+        asignaciones[fk] = Subquery(Dim.objects.filter(**{clave: OuterRef(columna)}).values('id')[:1])
+
+    # Un solo UPDATE para todas las FKs: cada fila de MQS se reescribe una vez
+    MQS.objects.update(**asignaciones)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datos', '0009_testcode_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DimFamily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='DimFixture',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='DimLine',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='DimModel',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='DimProcess',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='DimStation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.AddField(
+            model_name='mqs',
+            name='testcode_dim',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='datos.dimtestcode'),
+        ),
+        migrations.AddField(
+            model_name='mqs',
+            name='family_dim',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='datos.dimfamily'),
+        ),
+        migrations.AddField(
+            model_name='mqs',
+            name='fixture_dim',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='datos.dimfixture'),
+        ),
+        migrations.AddField(
+            model_name='mqs',
+            name='line_dim',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='datos.dimline'),
+        ),
+        migrations.AddField(
+            model_name='mqs',
+            name='model_dim',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='datos.dimmodel'),
+        ),
+        migrations.AddField(
+            model_name='mqs',
+            name='process_dim',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='datos.dimprocess'),
+        ),
+        migrations.AddField(
+            model_name='mqs',
+            name='station_dim',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='datos.dimstation'),
+        ),
+        migrations.RunPython(poblar_dimensiones, migrations.RunPython.noop),
+    ]
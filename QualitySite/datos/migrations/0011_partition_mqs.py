@@ -0,0 +1,141 @@
+import re
+from datetime import date
+
+from django.db import migrations
+
+TABLA = 'quality_mqs'
+LEGACY = 'quality_mqs_legacy'
+MESES_ADELANTE = 3
+
+
+def _mes_siguiente(mes):
+    return date(mes.year + mes.month // 12, mes.month % 12 + 1, 1)
+
+
+def particionar_mqs(apps, schema_editor):
+    """
+    Convierte quality_mqs en una tabla particionada por rango mensual de `date`.
+
+    Postgres exige que las restricciones únicas incluyan la columna de
+    partición: unique_mqs_trackid_datetime ya la incluye y la clave primaria
+    pasa a ser (id, date). Las filas se copian a la tabla nueva y las
+    restricciones e índices se recrean al final (más rápido que mantenerlos
+    durante la copia). En otras bases no hace nada.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    execute = schema_editor.execute
+    cursor = schema_editor.connection.cursor()
+
+    execute(f'ALTER TABLE "{TABLA}" RENAME TO "{LEGACY}"')
+
+    # Restricciones (menos la PK) e índices sueltos de la tabla original
+    cursor.execute(
+        "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+        "WHERE conrelid = %s::regclass AND contype IN ('u', 'f', 'c')",
+        [LEGACY],
+    )
+    restricciones = cursor.fetchall()
+    cursor.execute(
+        "SELECT indexdef FROM pg_indexes WHERE tablename = %s AND indexname NOT IN "
+        "(SELECT conname FROM pg_constraint WHERE conrelid = %s::regclass)",
+        [LEGACY, LEGACY],
+    )
+    indices = [fila[0] for fila in cursor.fetchall()]
+
+    execute(f'CREATE TABLE "{TABLA}" (LIKE "{LEGACY}" INCLUDING DEFAULTS) PARTITION BY RANGE ("date")')
+    # Si el id era serial, su default apunta a una secuencia de la tabla original
+    execute(f'ALTER TABLE "{TABLA}" ALTER COLUMN "id" DROP DEFAULT')
+
+    cursor.execute(f'SELECT MIN("date"), MAX("date"), MAX("id") FROM "{LEGACY}"')
+    minima, maxima, max_id = cursor.fetchone()
+    hoy = date.today()
+    mes = (minima or hoy).replace(day=1)
+    ultimo = max(maxima or hoy, hoy).replace(day=1)
+    for _ in range(MESES_ADELANTE):
+        ultimo = _mes_siguiente(ultimo)
+    while mes <= ultimo:
+        siguiente = _mes_siguiente(mes)
+        execute(
+            f'CREATE TABLE "{TABLA}_p{mes.year:04d}_{mes.month:02d}" PARTITION OF "{TABLA}" '
+            f"FOR VALUES FROM ('{mes.isoformat()}') TO ('{siguiente.isoformat()}')"
+        )
+        mes = siguiente
+    execute(f'CREATE TABLE "{TABLA}_default" PARTITION OF "{TABLA}" DEFAULT')
+
+    execute(f'INSERT INTO "{TABLA}" SELECT * FROM "{LEGACY}"')
+    execute(f'DROP TABLE "{LEGACY}"')
+
+    # El id deja de ser identity (no soportado en tablas particionadas antes de
+    # PG 17) y toma su valor de una secuencia propia. Se crea después de borrar
+    # la tabla original, dueña de la secuencia identity con el mismo nombre.
+    execute(f'CREATE SEQUENCE "{TABLA}_id_seq" OWNED BY "{TABLA}"."id"')
+    execute(f'ALTER TABLE "{TABLA}" ALTER COLUMN "id" SET DEFAULT nextval(\'"{TABLA}_id_seq"\')')
+    if max_id:
+        cursor.execute(f"SELECT setval('\"{TABLA}_id_seq\"', %s)", [max_id])
+
+    execute(f'ALTER TABLE "{TABLA}" ADD CONSTRAINT "{TABLA}_pkey" PRIMARY KEY ("id", "date")')
+    for nombre, definicion in restricciones:
+        execute(f'ALTER TABLE "{TABLA}" ADD CONSTRAINT "{nombre}" {definicion}')
+    for definicion in indices:
+        execute(re.sub(rf'\bON ((?:\S+\.)?){LEGACY}\b', rf'ON \g<1>{TABLA}', definicion, count=1))
+    cursor.close()
+
+
+def desparticionar_mqs(apps, schema_editor):
+    """
+    Reverso de particionar_mqs: copia las filas de todas las particiones
+    adjuntas a una tabla común con clave primaria (id) e id identity, como la
+    dejaba 0010. Las particiones ya separadas con prune_partitions no se
+    copian. En otras bases no hace nada.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    execute = schema_editor.execute
+    cursor = schema_editor.connection.cursor()
+
+    execute(f'ALTER TABLE "{TABLA}" RENAME TO "{LEGACY}"')
+
+    cursor.execute(
+        "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+        "WHERE conrelid = %s::regclass AND contype IN ('u', 'f', 'c')",
+        [LEGACY],
+    )
+    restricciones = cursor.fetchall()
+    cursor.execute(
+        "SELECT indexdef FROM pg_indexes WHERE tablename = %s AND indexname NOT IN "
+        "(SELECT conname FROM pg_constraint WHERE conrelid = %s::regclass)",
+        [LEGACY, LEGACY],
+    )
+    indices = [fila[0] for fila in cursor.fetchall()]
+
+    execute(f'CREATE TABLE "{TABLA}" (LIKE "{LEGACY}" INCLUDING DEFAULTS)')
+    # El default apunta a la secuencia de la tabla particionada, que se borra con ella
+    execute(f'ALTER TABLE "{TABLA}" ALTER COLUMN "id" DROP DEFAULT')
+    execute(f'INSERT INTO "{TABLA}" SELECT * FROM "{LEGACY}"')
+    execute(f'DROP TABLE "{LEGACY}"')
+
+    execute(f'ALTER TABLE "{TABLA}" ALTER COLUMN "id" ADD GENERATED BY DEFAULT AS IDENTITY')
+    cursor.execute(f'SELECT MAX("id") FROM "{TABLA}"')
+    max_id = cursor.fetchone()[0]
+    if max_id:
+        cursor.execute("SELECT setval(pg_get_serial_sequence(%s, 'id'), %s)", [f'"{TABLA}"', max_id])
+
+    execute(f'ALTER TABLE "{TABLA}" ADD CONSTRAINT "{TABLA}_pkey" PRIMARY KEY ("id")')
+    for nombre, definicion in restricciones:
+        execute(f'ALTER TABLE "{TABLA}" ADD CONSTRAINT "{nombre}" {definicion}')
+    for definicion in indices:
+        # Los índices de una tabla particionada se definen ON ONLY; en la tabla común no aplica
+        execute(re.sub(rf'\bON (?:ONLY )?((?:\S+\.)?){LEGACY}\b', rf'ON \g<1>{TABLA}', definicion, count=1))
+    cursor.close()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datos', '0010_mqs_dimensions'),
+    ]
+
+    operations = [
+        migrations.RunPython(particionar_mqs, desparticionar_mqs),
+    ]
@@ -0,0 +1,66 @@
+from django.db import migrations, models
+from django.db.models import CharField, DateTimeField, Value
+from django.db.models.functions import Cast, Coalesce, Concat
+
+
+def calcular_ts(apps, schema_editor):
+    # Un UPDATE por tabla: fecha y hora se combinan en la base, sin traer filas.
+    # La conexión usa la zona del proyecto, igual que combine_ts al importar.
+    # Una hora nula cuenta como medianoche (como combine_ts) en lugar de depender
+    # de cómo cada base concatena un NULL.
+    for modelo, fecha, hora in [('MQS', 'date', 'Time'), ('MES', 'FECHA_REPARACION', 'HORA_REPARACION')]:
+        Model = apps.get_model('datos', modelo)
+        Model.objects.update(ts=Cast(
+            Concat(
+                Cast(fecha, CharField()), Value(' '), Coalesce(Cast(hora, CharField()), Value('00:00:00')),
+                output_field=CharField(),
+            ),
+            DateTimeField(),
+        ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datos', '0011_partition_mqs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mqs',
+            name='ts',
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.AddField(
+            model_name='mes',
+            name='ts',
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.RunPython(calcular_ts, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='mqs',
+            name='ts',
+            field=models.DateTimeField(),
+        ),
+        migrations.AlterField(
+            model_name='mes',
+            name='ts',
+            field=models.DateTimeField(),
+        ),
+        migrations.RemoveIndex(
+            model_name='mqs',
+            name='quality_mqs_date_fa8af4_idx',
+        ),
+        migrations.AddIndex(
+            model_name='mqs',
+            index=models.Index(fields=['ts'], name='mqs_ts_idx'),
+        ),
+        migrations.RemoveIndex(
+            model_name='mes',
+            name='mes_fecha_hora_rep_idx',
+        ),
+        migrations.AddIndex(
+            model_name='mes',
+            index=models.Index(fields=['ts'], name='mes_ts_idx'),
+        ),
+    ]
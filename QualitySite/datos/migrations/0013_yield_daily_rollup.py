@@ -0,0 +1,73 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:27
+
+from django.db import migrations, models
+from django.db.models import Sum
+
+CONTADORES = {
+    'pass': 'Prime_Pass',
+    'fail': 'Prime_Fail',
+    'handle': 'Prime_Handle',
+    'ntf': 'Prime_NTF_Count',
+    'defect': 'Prime_Defect_Count',
+}
+
+
+def poblar_rollup(apps, schema_editor):
+    # Una pasada ordenada por fecha sobre los totales de YieldTurno, acumulando en memoria
+    YieldTurno = apps.get_model('datos', 'YieldTurno')
+    YieldDailyRollup = apps.get_model('datos', 'YieldDailyRollup')
+    filas = YieldTurno.objects.values('date', 'Jornada', 'Turno') \
+        .annotate(**{k: Sum(c) for k, c in CONTADORES.items()}).order_by('date')
+
+    diarios = {}
+    for f in filas:
+        for jornada, turno in ((f['Jornada'], f['Turno']), (f['Jornada'], 'ALL'), ('ALL', 'ALL')):
+            total = diarios.setdefault((f['date'], jornada, turno), dict.fromkeys(CONTADORES, 0))
+            for k in CONTADORES:
+                total[k] += f[k] or 0
+
+    acumulados = {}
+    objetos = []
+    for (fecha, jornada, turno), total in sorted(diarios.items()):
+        acumulado = acumulados.setdefault((jornada, turno), dict.fromkeys(CONTADORES, 0))
+        for k in CONTADORES:
+            acumulado[k] += total[k]
+        objetos.append(YieldDailyRollup(
+            date=fecha, jornada=jornada, turno=turno,
+            **{f'prime_{k}': v for k, v in total.items()},
+            **{f'cum_{k}': v for k, v in acumulado.items()},
+        ))
+    YieldDailyRollup.objects.bulk_create(objetos, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datos', '0012_timestamps'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='YieldDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('jornada', models.CharField(max_length=10)),
+                ('turno', models.CharField(max_length=10)),
+                ('prime_pass', models.IntegerField(default=0)),
+                ('prime_fail', models.IntegerField(default=0)),
+                ('prime_handle', models.IntegerField(default=0)),
+                ('prime_ntf', models.IntegerField(default=0)),
+                ('prime_defect', models.IntegerField(default=0)),
+                ('cum_pass', models.BigIntegerField(default=0)),
+                ('cum_fail', models.BigIntegerField(default=0)),
+                ('cum_handle', models.BigIntegerField(default=0)),
+                ('cum_ntf', models.BigIntegerField(default=0)),
+                ('cum_defect', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'unique_together': {('jornada', 'turno', 'date')},
+            },
+        ),
+        migrations.RunPython(poblar_rollup, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datos', '0013_yield_daily_rollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExportRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dataset', models.CharField(max_length=20)),
+                ('started_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('status', models.CharField(choices=[('running', 'En curso'), ('ok', 'Completada'), ('error', 'Con errores')], default='running', max_length=10)),
+                ('written', models.JSONField(default=list)),
+                ('errors', models.TextField(blank=True, default='')),
+            ],
+            options={
+                'ordering': ['-started_at'],
+                'indexes': [models.Index(fields=['dataset', 'status'], name='exportrun_dataset_status_idx')],
+            },
+        ),
+    ]
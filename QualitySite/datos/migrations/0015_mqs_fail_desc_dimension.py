@@ -0,0 +1,84 @@
+import hashlib
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Max, OuterRef, Subquery
+from django.db.models.functions import MD5
+
+# (columna de MQS, FK, modelo de dimensión, campo clave)
+DIMENSIONES = [
+    ('Line', 'line_dim', 'DimLine', 'name'),
+    ('Family', 'family_dim', 'DimFamily', 'name'),
+    ('Model', 'model_dim', 'DimModel', 'name'),
+    ('Process', 'process_dim', 'DimProcess', 'name'),
+    ('Station', 'station_dim', 'DimStation', 'name'),
+    ('Fixture', 'fixture_dim', 'DimFixture', 'name'),
+    ('Testcode', 'testcode_dim', 'DimTestcode', 'code'),
+]
+
+
+def poblar_dimensiones(apps, schema_editor):
+    """
+    Completa las claves de dimensión de todas las filas de MQS antes de borrar
+    sus columnas de texto (0016): Fail_Desc para todas y las demás solo donde
+    falten. Va en su propia migración: en Postgres las FKs son diferidas y un
+    UPDATE seguido de ALTER TABLE en la misma transacción falla. Las columnas
+    de texto quedan intactas, así que no hace falta deshacer nada.
+    """
+    MQS = apps.get_model('datos', 'MQS')
+    DimTestcode = apps.get_model('datos', 'DimTestcode')
+    DimFailDesc = apps.get_model('datos', 'DimFailDesc')
+    DimTestcode.objects.bulk_create(
+        [
+            DimTestcode(code=f['Testcode'], description=f['desc'] or '')
+            for f in MQS.objects.filter(testcode_dim__isnull=True).order_by()
+            .values('Testcode').annotate(desc=Max('Testcode_Desc'))
+        ],
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+
+    for columna, fk, modelo, clave in DIMENSIONES:
+        Dim = apps.get_model('datos', modelo)
+        pendientes = MQS.objects.filter(**{f'{fk}__isnull': True})
+        if modelo != 'DimTestcode':
+            valores = pendientes.order_by().values_list(columna, flat=True).distinct()
+            Dim.objects.bulk_create([Dim(**{clave: v}) for v in valores], batch_size=1000, ignore_conflicts=True)
+        pendientes.update(**{fk: Subquery(Dim.objects.filter(**{clave: OuterRef(columna)}).values('id')[:1])})
+
+    # Las descripciones de falla se identifican por el md5 del texto
+    DimFailDesc.objects.bulk_create(
+        [
+            DimFailDesc(md5=hashlib.md5(texto.encode('utf-8')).hexdigest(), name=texto)
+            for texto in MQS.objects.order_by().values_list('Fail_Desc', flat=True).distinct()
+        ],
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+    MQS.objects.update(fail_desc_dim=Subquery(
+        DimFailDesc.objects.filter(md5=MD5(OuterRef('Fail_Desc'))).values('id')[:1]
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datos', '0014_export_runs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DimFailDesc',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('md5', models.CharField(max_length=32, unique=True)),
+                ('name', models.TextField()),
+            ],
+        ),
+        migrations.AddField(
+            model_name='mqs',
+            name='fail_desc_dim',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='datos.dimfaildesc'),
+        ),
+        migrations.RunPython(poblar_dimensiones, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,59 @@
+from django.db import migrations, models
+
+
+# Paso previo a borrar las columnas de texto de MQS (0017): al revertir, 0017
+# las recrea nulas y las llena desde las dimensiones, y recién esta migración
+# (en otra transacción) vuelve a exigir NOT NULL
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datos', '0015_mqs_fail_desc_dimension'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='mqs',
+            name='Line',
+            field=models.CharField(max_length=255, null=True),
+        ),
+        migrations.AlterField(
+            model_name='mqs',
+            name='Family',
+            field=models.CharField(max_length=255, null=True),
+        ),
+        migrations.AlterField(
+            model_name='mqs',
+            name='Model',
+            field=models.CharField(max_length=255, null=True),
+        ),
+        migrations.AlterField(
+            model_name='mqs',
+            name='Process',
+            field=models.CharField(max_length=255, null=True),
+        ),
+        migrations.AlterField(
+            model_name='mqs',
+            name='Station',
+            field=models.CharField(max_length=255, null=True),
+        ),
+        migrations.AlterField(
+            model_name='mqs',
+            name='Fixture',
+            field=models.CharField(max_length=255, null=True),
+        ),
+        migrations.AlterField(
+            model_name='mqs',
+            name='Testcode',
+            field=models.CharField(max_length=255, null=True),
+        ),
+        migrations.AlterField(
+            model_name='mqs',
+            name='Testcode_Desc',
+            field=models.TextField(null=True),
+        ),
+        migrations.AlterField(
+            model_name='mqs',
+            name='Fail_Desc',
+            field=models.TextField(null=True),
+        ),
+    ]
@@ -0,0 +1,143 @@
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+# Columna de texto de MQS -> (FK, modelo de dimensión, campo con el texto)
+TEXTO = {
+    'Line': ('line_dim', 'DimLine', 'name'),
+    'Family': ('family_dim', 'DimFamily', 'name'),
+    'Model': ('model_dim', 'DimModel', 'name'),
+    'Process': ('process_dim', 'DimProcess', 'name'),
+    'Station': ('station_dim', 'DimStation', 'name'),
+    'Fixture': ('fixture_dim', 'DimFixture', 'name'),
+    'Testcode': ('testcode_dim', 'DimTestcode', 'code'),
+    'Testcode_Desc': ('testcode_dim', 'DimTestcode', 'description'),
+    'Fail_Desc': ('fail_desc_dim', 'DimFailDesc', 'name'),
+}
+
+
+def restaurar_texto(apps, schema_editor):
+    """
+    Al revertir: llena las columnas de texto (recién recreadas, nulas) desde
+    las dimensiones con un solo UPDATE; 0016 vuelve a exigir NOT NULL después
+    """
+    MQS = apps.get_model('datos', 'MQS')
+    MQS.objects.update(**{
+        columna: Subquery(apps.get_model('datos', modelo).objects.filter(id=OuterRef(fk)).values(campo)[:1])
+        for columna, (fk, modelo, campo) in TEXTO.items()
+    })
+
+
+# MQS guarda solo las claves de sus dimensiones: se borran las columnas de texto
+# y los índices compuestos pasan a las claves (con los mismos nombres). Es
+# reversible: al revertir, el texto se reconstruye desde las dimensiones.
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datos', '0016_mqs_text_columns_nullable'),
+    ]
+
+    operations = [
+        # Primera operación: al revertir corre última, con las columnas ya recreadas
+        migrations.RunPython(migrations.RunPython.noop, restaurar_texto),
+        migrations.RemoveIndex(
+            model_name='mqs',
+            name='mqs_date_line_fam_proc_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='mqs',
+            name='mqs_prime_date_fam_tc_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='mqs',
+            name='mqs_prime_family_date_idx',
+        ),
+        migrations.RemoveField(
+            model_name='mqs',
+            name='Line',
+        ),
+        migrations.RemoveField(
+            model_name='mqs',
+            name='Family',
+        ),
+        migrations.RemoveField(
+            model_name='mqs',
+            name='Model',
+        ),
+        migrations.RemoveField(
+            model_name='mqs',
+            name='Process',
+        ),
+        migrations.RemoveField(
+            model_name='mqs',
+            name='Station',
+        ),
+        migrations.RemoveField(
+            model_name='mqs',
+            name='Fixture',
+        ),
+        migrations.RemoveField(
+            model_name='mqs',
+            name='Testcode',
+        ),
+        migrations.RemoveField(
+            model_name='mqs',
+            name='Testcode_Desc',
+        ),
+        migrations.RemoveField(
+            model_name='mqs',
+            name='Fail_Desc',
+        ),
+        migrations.AlterField(
+            model_name='mqs',
+            name='family_dim',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='datos.dimfamily'),
+        ),
+        migrations.AlterField(
+            model_name='mqs',
+            name='fixture_dim',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='datos.dimfixture'),
+        ),
+        migrations.AlterField(
+            model_name='mqs',
+            name='line_dim',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='datos.dimline'),
+        ),
+        migrations.AlterField(
+            model_name='mqs',
+            name='model_dim',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='datos.dimmodel'),
+        ),
+        migrations.AlterField(
+            model_name='mqs',
+            name='process_dim',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='datos.dimprocess'),
+        ),
+        migrations.AlterField(
+            model_name='mqs',
+            name='station_dim',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='datos.dimstation'),
+        ),
+        migrations.AlterField(
+            model_name='mqs',
+            name='testcode_dim',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='datos.dimtestcode'),
+        ),
+        migrations.AlterField(
+            model_name='mqs',
+            name='fail_desc_dim',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='datos.dimfaildesc'),
+        ),
+        migrations.AddIndex(
+            model_name='mqs',
+            index=models.Index(fields=['date', 'line_dim', 'family_dim', 'process_dim'], name='mqs_date_line_fam_proc_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='mqs',
+            index=models.Index(condition=models.Q(('Prime', True)), fields=['date', 'family_dim', 'testcode_dim'], name='mqs_prime_date_fam_tc_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='mqs',
+            index=models.Index(condition=models.Q(('Prime', True)), fields=['family_dim', 'date'], name='mqs_prime_family_date_idx'),
+        ),
+    ]
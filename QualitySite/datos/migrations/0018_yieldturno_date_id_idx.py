@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datos', '0017_mqs_drop_text_columns'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='yieldturno',
+            index=models.Index(fields=['date', 'id'], name='yield_date_id_idx'),
+        ),
+    ]
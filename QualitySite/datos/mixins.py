@@ -0,0 +1,131 @@
+import csv
+import json
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from .pagination import KeysetOrderingFilter, keyset_fields
+
+STREAM_CHUNK_SIZE = 2000
+
+
+def api_fields(model):
+    """
+    Columnas expuestas por la API: `model.API_FIELDS` si el modelo las declara
+    (MQS, con el texto de sus dimensiones) o las concretas sin FKs
+    """
+    declaradas = getattr(model, 'API_FIELDS', None)
+    if declaradas:
+        return list(declaradas)
+    return [f.attname for f in model._meta.concrete_fields if not f.is_relation]
+
+
+def select_api_fields(queryset, fields=None):
+    """
+    Restringe el queryset a `fields` (o a todas las columnas de la API): las
+    concretas con .only() y las de dimensión anotadas con with_names()
+    """
+    if fields is not None:
+        concretas = {f.attname for f in queryset.model._meta.concrete_fields}
+        queryset = queryset.only(*(f for f in fields if f in concretas))
+    if hasattr(queryset, 'with_names'):
+        queryset = queryset.with_names(*(fields or ()))
+    return queryset
+
+
+class _Echo:
+    """Buffer mínimo para que csv.writer devuelva cada línea en lugar de acumularla"""
+    def write(self, value):
+        return value
+
+
+class StreamingListMixin:
+    """
+    Agrega a una ListAPIView el modo `?stream=ndjson|csv`, que recorre el
+    queryset filtrado con .iterator(chunk_size=...) y envía las filas a medida
+    que salen de la base, sin cargar el resultado completo en memoria.
+    """
+    stream_query_param = 'stream'
+
+    def get_stream_fields(self):
+        return api_fields(self.get_queryset().model)
+
+    def list(self, request, *args, **kwargs):
+        formato = request.query_params.get(self.stream_query_param)
+        if formato not in ('ndjson', 'csv'):
+            return super().list(request, *args, **kwargs)
+
+        fields = self.get_stream_fields()
+        queryset = self.filter_queryset(self.get_queryset()) \
+            .values_list(*fields) \
+            .iterator(chunk_size=STREAM_CHUNK_SIZE)
+
+        if formato == 'csv':
+            writer = csv.writer(_Echo())
+
+            def filas_csv():
+                yield writer.writerow(fields)
+                for fila in queryset:
+                    yield writer.writerow(fila)
+
+            return StreamingHttpResponse(filas_csv(), content_type='text/csv')
+
+        cuerpo = (
+            json.dumps(dict(zip(fields, fila)), cls=DjangoJSONEncoder) + '\n'
+            for fila in queryset
+        )
+        return StreamingHttpResponse(cuerpo, content_type='application/x-ndjson')
+
+
+class SparseFieldsMixin:
+    """
+    Agrega a una ListAPIView:
+
+    - `?fields=a,b,c`: solo se leen (.only() y las dimensiones pedidas) y
+      serializan esos campos.
+    - `?fast=1`: ruta rápida de solo lectura con .values(): las filas van como
+      dicts directo al renderer JSON, sin instanciar modelos ni serializers;
+      combinable con `fields`.
+
+    Las columnas del orden (keyset) siempre se incluyen para poder armar el cursor.
+    """
+    fields_query_param = 'fields'
+    fast_query_param = 'fast'
+
+    def get_requested_fields(self):
+        raw = self.request.query_params.get(self.fields_query_param)
+        if not raw:
+            return None
+        requested = [f.strip() for f in raw.split(',') if f.strip()]
+        valid = set(api_fields(self.queryset.model))
+        invalid = [f for f in requested if f not in valid]
+        if invalid:
+            raise ValidationError({self.fields_query_param: f"Campos desconocidos: {', '.join(invalid)}"})
+        ordering = KeysetOrderingFilter().get_ordering(self.request, self.queryset, self)
+        return list(dict.fromkeys([*requested, *keyset_fields(ordering)]))
+
+    def get_stream_fields(self):
+        return self.get_requested_fields() or super().get_stream_fields()
+
+    def get_serializer(self, *args, **kwargs):
+        fields = self.get_requested_fields()
+        if fields is not None:
+            kwargs['fields'] = fields
+        return super().get_serializer(*args, **kwargs)
+
+    def list(self, request, *args, **kwargs):
+        fast = request.query_params.get(self.fast_query_param) in ('1', 'true')
+        if request.query_params.get(self.stream_query_param) or not fast:
+            return super().list(request, *args, **kwargs)
+
+        fields = self.get_stream_fields()
+        queryset = self.filter_queryset(self.get_queryset()).values(*fields)
+        page = self.paginate_queryset(queryset)
+        if page is None:
+            return Response(list(queryset))
+        return self.get_paginated_response(page)
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        fields = self.get_requested_fields() if hasattr(self, 'request') else None
+        return select_api_fields(queryset, fields)
@@ -1,26 +1,129 @@
 import csv
+import hashlib
 from datetime import datetime
 from django.db import models
+from django.db.models import F
+from .metrics import yield_metrics
+
+class Dimension(models.Model):
+    """Tabla de dimensión: un valor categórico de MQS guardado una sola vez"""
+    name = models.CharField(max_length=255, unique=True)
+
+    class Meta:
+        abstract = True
+
+    def __str__(self):
+        return self.name
+
+class DimLine(Dimension):
+    pass
+
+class DimFamily(Dimension):
+    pass
+
+class DimModel(Dimension):
+    pass
+
+class DimProcess(Dimension):
+    pass
+
+class DimStation(Dimension):
+    pass
+
+class DimFixture(Dimension):
+    pass
+
+class DimFailDesc(models.Model):
+    """
+    Descripción de falla: texto libre del equipo de test, sin largo acotado.
+    Es única por su md5 (un índice btree sobre el texto rechaza valores largos)
+    """
+    md5 = models.CharField(max_length=32, unique=True)
+    name = models.TextField()
+
+    @staticmethod
+    def key_for(texto):
+        return hashlib.md5(texto.encode('utf-8')).hexdigest()
+
+    def __str__(self):
+        return self.name
+
+def _dimension_fk(model):
+    # Sin índice propio: los filtros usan los índices compuestos de MQS.Meta
+    return models.ForeignKey(model, on_delete=models.PROTECT, related_name='+', db_index=False)
+
+# Columna de la API/CSV -> campo de la dimensión que guarda su valor
+MQS_DIMENSION_FIELDS = {
+    'Line': 'line_dim__name',
+    'Family': 'family_dim__name',
+    'Model': 'model_dim__name',
+    'Process': 'process_dim__name',
+    'Station': 'station_dim__name',
+    'Fixture': 'fixture_dim__name',
+    'Testcode': 'testcode_dim__code',
+    'Testcode_Desc': 'testcode_dim__description',
+    'Fail_Desc': 'fail_desc_dim__name',
+}
+
+def dimension_field(nombre):
+    """Campo de la tabla de dimensión que guarda una columna de MQS (p. ej. DimLine.name para Line)"""
+    fk, campo = MQS_DIMENSION_FIELDS[nombre].split('__')
+    return MQS._meta.get_field(fk).related_model._meta.get_field(campo)
+
+class MQSQuerySet(models.QuerySet):
+    def with_names(self, *names):
+        """
+        Anota las columnas de texto de MQS (Line, Family, ..., Fail_Desc) desde
+        sus dimensiones; sin argumentos, todas. Los nombres que no son de una
+        dimensión se ignoran.
+        """
+        seleccion = [n for n in names if n in MQS_DIMENSION_FIELDS] if names else MQS_DIMENSION_FIELDS
+        return self.annotate(**{n: F(MQS_DIMENSION_FIELDS[n]) for n in seleccion})
+
+    def filter_names(self, **valores):
+        """
+        Filtra por el texto de las dimensiones (Line='L1', Family=...): cada valor
+        se resuelve a su id con una subconsulta (por su clave única) y el filtro
+        queda sobre la columna *_dim_id. Los valores vacíos se ignoran.
+        """
+        filtros = {}
+        for nombre, valor in valores.items():
+            if not valor:
+                continue
+            fk, campo = MQS_DIMENSION_FIELDS[nombre].split('__')
+            dimension = self.model._meta.get_field(fk).related_model
+            clave = {'md5': dimension.key_for(valor)} if hasattr(dimension, 'key_for') else {campo: valor}
+            filtros[f'{fk}__in'] = dimension.objects.filter(**clave).values('id')
+        return self.filter(**filtros)
 
 class MQS(models.Model):
     TrackId = models.CharField(max_length=100)  # Remove unique=True if it exists
     date = models.DateField()  # Nota: "date" con "d" minúscula
     Time = models.TimeField()
-    Line = models.CharField(max_length=255)
-    Family = models.CharField(max_length=255)
-    Model = models.CharField(max_length=255)
-    Process = models.CharField(max_length=255)
-    Station = models.CharField(max_length=255)
-    Fixture = models.CharField(max_length=255)
+    ts = models.DateTimeField()  # date + Time en una sola columna para rangos y ordenamientos
     NTF = models.BooleanField()
     Prime = models.BooleanField()
-    Testcode = models.CharField(max_length=255)
-    Testcode_Desc = models.TextField()
-    Fail_Desc = models.TextField()
     TestTime = models.FloatField(null=True, blank=True)
     Test_Val = models.FloatField(null=True, blank=True)
     LL = models.FloatField(null=True, blank=True)
     UL = models.FloatField(null=True, blank=True)
+    # Columnas categóricas: claves de sus dimensiones (el texto se lee con with_names())
+    line_dim = _dimension_fk(DimLine)
+    family_dim = _dimension_fk(DimFamily)
+    model_dim = _dimension_fk(DimModel)
+    process_dim = _dimension_fk(DimProcess)
+    station_dim = _dimension_fk(DimStation)
+    fixture_dim = _dimension_fk(DimFixture)
+    testcode_dim = _dimension_fk('DimTestcode')
+    fail_desc_dim = _dimension_fk(DimFailDesc)
+
+    # Columnas que expone la API, en el orden del CSV original
+    API_FIELDS = (
+        'id', 'TrackId', 'date', 'Time', 'ts', 'Line', 'Family', 'Model', 'Process', 'Station', 'Fixture',
+        'NTF', 'Prime', 'Testcode', 'Testcode_Desc', 'Fail_Desc', 'TestTime', 'Test_Val', 'LL', 'UL',
+    )
+
+    objects = MQSQuerySet.as_manager()
 
     class Meta:
         constraints = [
@@ -30,8 +133,13 @@ class MQS(models.Model):
             )
         ]
         indexes = [
-            models.Index(fields=['date', 'Time']),
+            models.Index(fields=['ts'], name='mqs_ts_idx'),
             models.Index(fields=['TrackId']),
+            # Cruce con YieldTurno (yield_queries) y filtros por línea/familia
+            models.Index(fields=['date', 'line_dim', 'family_dim', 'process_dim'], name='mqs_date_line_fam_proc_idx'),
+            # Fallas Prime: resumen diario de testcodes y filtros por familia
+            models.Index(fields=['date', 'family_dim', 'testcode_dim'], condition=models.Q(Prime=True), name='mqs_prime_date_fam_tc_idx'),
+            models.Index(fields=['family_dim', 'date'], condition=models.Q(Prime=True), name='mqs_prime_family_date_idx'),
         ]
         db_table = 'quality_mqs'
 
@@ -40,6 +148,7 @@ class MES(models.Model):
     NS = models.CharField(max_length=100)      # New field
     FECHA_REPARACION = models.DateField()
     HORA_REPARACION = models.TimeField()
+    ts = models.DateTimeField()  # FECHA_REPARACION + HORA_REPARACION
     FECHA_RECHAZO = models.DateField()
     HORA_RECHAZO = models.TimeField()
     POSICION = models.CharField(max_length=100)
@@ -63,6 +172,10 @@ class MES(models.Model):
                 name='uq_mes_reparacion_codigo'
             )
         ]
+        indexes = [
+            models.Index(fields=['NS'], name='mes_ns_idx'),
+            models.Index(fields=['ts'], name='mes_ts_idx'),
+        ]
 
 class YieldTurno(models.Model):
     JORNADA_CHOICES = [
@@ -99,13 +212,17 @@ class YieldTurno(models.Model):
                 name='unique_yield_turno'
             )
         ]
+        indexes = [
+            models.Index(fields=['date', 'Line', 'Family'], name='yield_date_line_family_idx'),
+            # Keyset del listado por fecha: ORDER BY date, id recorre el índice
+            models.Index(fields=['date', 'id'], name='yield_date_id_idx'),
+        ]
 
     # Relación inversa con MQS (opcional)
     @property
     def mqs_records(self):
         """Retorna todos los registros MQS relacionados con este turno"""
-        return MQS.objects.filter(
-            date=self.date,
+        return MQS.objects.filter(date=self.date).filter_names(
             Line=self.Line,
             Family=self.Family,
             Process=self.Process
@@ -114,15 +231,13 @@ class YieldTurno(models.Model):
     @property
     def calculate_fty(self):
         """Calcula FTY (First Time Yield) basado en datos actuales"""
-        if self.Prime_Handle == 0:
-            return 0
-        return (self.Prime_Pass / self.Prime_Handle) * 100
+        return yield_metrics(self.Prime_Pass, self.Prime_Defect_Count, self.Prime_NTF_Count, self.Prime_Handle)[0]
     
     def save(self, *args, **kwargs):
-        # Auto-calcular FTY y DPHU al guardar
-        if self.Prime_Handle > 0:
-            self.FTY = (self.Prime_Pass / self.Prime_Handle) * 100
-            self.DPHU = (self.Prime_Defect_Count / self.Prime_Handle) * 100
+        # Auto-calcular FTY, DPHU y NTF al guardar (misma definición que el importador)
+        self.FTY, self.DPHU, self.NTF = yield_metrics(
+            self.Prime_Pass, self.Prime_Defect_Count, self.Prime_NTF_Count, self.Prime_Handle
+        )
         super().save(*args, **kwargs)
 
 class QualityAnalytics(models.Model):
@@ -134,6 +249,8 @@ class QualityAnalytics(models.Model):
     failure_count = models.IntegerField(default=0)
     ntf_rate = models.FloatField(default=0)
     average_fty = models.FloatField(default=0)
+    total_units = models.IntegerField(default=0)
+    pass_units = models.IntegerField(default=0)
     
     class Meta:
         unique_together = ['date', 'line', 'family']
@@ -142,3 +259,125 @@ class QualityAnalytics(models.Model):
             models.Index(fields=['line', 'family']),
         ]
 
+class StationDailyStats(models.Model):
+    """Resumen diario de tests MQS por estación"""
+    date = models.DateField()
+    line = models.CharField(max_length=255)
+    family = models.CharField(max_length=255)
+    station = models.CharField(max_length=255)
+    total_tests = models.IntegerField(default=0)
+    failures = models.IntegerField(default=0)
+    ntf_count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ['date', 'line', 'family', 'station']
+        indexes = [
+            models.Index(fields=['date']),
+        ]
+
+class YieldDailyRollup(models.Model):
+    """
+    Totales Prime diarios de YieldTurno por Jornada/Turno ('ALL' agrupa todos)
+    y sus sumas acumuladas desde el primer día: cualquier ventana [a, b] sale de
+    restar dos filas (acumulado en b menos acumulado antes de a)
+    """
+    date = models.DateField()
+    jornada = models.CharField(max_length=10)
+    turno = models.CharField(max_length=10)
+    prime_pass = models.IntegerField(default=0)
+    prime_fail = models.IntegerField(default=0)
+    prime_handle = models.IntegerField(default=0)
+    prime_ntf = models.IntegerField(default=0)
+    prime_defect = models.IntegerField(default=0)
+    cum_pass = models.BigIntegerField(default=0)
+    cum_fail = models.BigIntegerField(default=0)
+    cum_handle = models.BigIntegerField(default=0)
+    cum_ntf = models.BigIntegerField(default=0)
+    cum_defect = models.BigIntegerField(default=0)
+
+    class Meta:
+        # El índice único también resuelve "última fila <= fecha" por (jornada, turno)
+        unique_together = ['jornada', 'turno', 'date']
+
+class DimTestcode(models.Model):
+    """Descripción de cada testcode, guardada una sola vez"""
+    code = models.CharField(max_length=255, unique=True)
+    description = models.TextField(blank=True, default='')
+
+    def __str__(self):
+        return self.code
+
+class TestcodeDailyStats(models.Model):
+    """
+    Contadores diarios de fallas MQS (Prime) por testcode; se incrementan al
+    importar (la descripción está en DimTestcode)
+    """
+    date = models.DateField()
+    line = models.CharField(max_length=255)
+    family = models.CharField(max_length=255)
+    testcode = models.CharField(max_length=255)
+    failure_count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ['date', 'line', 'family', 'testcode']
+        indexes = [
+            models.Index(fields=['date']),
+            models.Index(fields=['family', 'date']),
+        ]
+
+class IngestionCheckpoint(models.Model):
+    """Marca de agua de importación por fuente de datos (MQS, MES, Yield)"""
+    source = models.CharField(max_length=255, unique=True)
+    last_row_offset = models.IntegerField(default=0)
+    last_timestamp = models.DateTimeField(null=True, blank=True)
+    prefix_hash = models.CharField(max_length=64, blank=True, default='')
+    # Validadores HTTP y hash del último cuerpo descargado
+    etag = models.CharField(max_length=255, blank=True, default='')
+    last_modified = models.CharField(max_length=64, blank=True, default='')
+    body_hash = models.CharField(max_length=64, blank=True, default='')
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.source} @ {self.last_row_offset}"
+
+class IngestionRun(models.Model):
+    """Ejecución del pipeline de importación con los tiempos de cada etapa"""
+    STATUS_CHOICES = [
+        ('running', 'En curso'),
+        ('ok', 'Completada'),
+        ('error', 'Con errores'),
+    ]
+    started_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='running')
+    duration = models.FloatField(default=0)  # Segundos de reloj de todo el ciclo
+    # {"mqs": {"fetch": s, "parse": s, "write": s}, ..., "rollups": s}
+    timings = models.JSONField(default=dict)
+    # Contadores por fuente (nuevos, existentes, errores, ...)
+    rows = models.JSONField(default=dict)
+    errors = models.TextField(blank=True, default='')
+
+    class Meta:
+        ordering = ['-started_at']
+
+    def __str__(self):
+        return f"{self.started_at:%Y-%m-%d %H:%M} {self.status} ({self.duration:.1f}s)"
+
+class ExportRun(models.Model):
+    """Exportación Parquet de un dataset lanzada desde la API; corre en segundo plano"""
+    dataset = models.CharField(max_length=20)
+    started_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    status = models.CharField(max_length=10, choices=IngestionRun.STATUS_CHOICES, default='running')
+    # [{"date": "YYYY-MM-DD", "rows": n}, ...] por partición escrita
+    written = models.JSONField(default=list)
+    errors = models.TextField(blank=True, default='')
+
+    class Meta:
+        ordering = ['-started_at']
+        indexes = [
+            models.Index(fields=['dataset', 'status'], name='exportrun_dataset_status_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.dataset} {self.started_at:%Y-%m-%d %H:%M} {self.status}"
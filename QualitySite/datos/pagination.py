@@ -0,0 +1,117 @@
+import base64
+import json
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.filters import OrderingFilter
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+def _value(row, field):
+    return row[field] if isinstance(row, dict) else getattr(row, field)
+
+
+class KeysetOrderingFilter(OrderingFilter):
+    """
+    `?ordering=` restringido a las columnas indexadas de `ordering_fields`:
+    cualquier otro valor responde 400 en lugar de ignorarse. El orden se
+    completa con `id` para que sirva de keyset a KeysetPagination.
+    """
+    def remove_invalid_fields(self, queryset, fields, view, request):
+        validos = [campo for campo, _ in self.get_valid_fields(queryset, view, {'request': request})]
+        invalidos = [term for term in fields if term.lstrip('-') not in validos]
+        if invalidos:
+            raise ValidationError({self.ordering_param: f"Orden no soportado: {', '.join(invalidos)}. "
+                                                        f"Opciones: {', '.join(validos)} (con - para descendente)"})
+        return list(dict.fromkeys(fields))
+
+    def get_ordering(self, request, queryset, view):
+        ordering = list(super().get_ordering(request, queryset, view) or ['-id'])
+        if not any(term.lstrip('-') in ('id', 'pk') for term in ordering):
+            ordering.append('-id' if ordering[-1].startswith('-') else 'id')
+        return ordering
+
+
+def keyset_fields(ordering):
+    return [term.lstrip('-') for term in ordering]
+
+
+class KeysetPagination(BasePagination):
+    """
+    Paginación por cursor (keyset) sobre el orden del queryset (el de
+    KeysetOrderingFilter; por defecto `-id`). Cada página es un
+    WHERE (a, b, id) < cursor ... LIMIT n que aprovecha el índice, sin OFFSET
+    ni COUNT sobre la tabla completa.
+    """
+    page_size = 100
+    max_page_size = 1000
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except ValueError:
+            size = self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def encode_cursor(self, row):
+        # El cursor lleva el orden con el que se generó: no vale para otro
+        raw = json.dumps([self.ordering, [_value(row, f) for f in self.fields]], cls=DjangoJSONEncoder)
+        return base64.urlsafe_b64encode(raw.encode()).decode()
+
+    def decode_cursor(self, queryset, encoded):
+        try:
+            ordering, valores = json.loads(base64.urlsafe_b64decode(encoded.encode()).decode())
+            if ordering != self.ordering:
+                raise ValueError
+            model = queryset.model
+            return [model._meta.get_field(f).to_python(v) for f, v in zip(self.fields, valores)]
+        except Exception:
+            raise NotFound("Cursor inválido")
+
+    def _after(self, cursor):
+        # (f1 < v1) OR (f1 = v1 AND f2 < v2) OR ...; > en las columnas ascendentes
+        condicion = Q()
+        for i, (term, field) in enumerate(zip(self.ordering, self.fields)):
+            iguales = {f: v for f, v in zip(self.fields[:i], cursor[:i])}
+            lookup = 'lt' if term.startswith('-') else 'gt'
+            condicion |= Q(**iguales, **{f'{field}__{lookup}': cursor[i]})
+        return condicion
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.ordering = [str(term) for term in queryset.query.order_by] or ['-id']
+        self.fields = keyset_fields(self.ordering)
+        self.request = request
+        size = self.get_page_size(request)
+
+        queryset = queryset.order_by(*self.ordering)
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded:
+            queryset = queryset.filter(self._after(self.decode_cursor(queryset, encoded)))
+
+        rows = list(queryset[:size + 1])
+        self.next_cursor = self.encode_cursor(rows[size - 1]) if len(rows) > size else None
+        return rows[:size]
+
+    def get_next_link(self):
+        if self.next_cursor is None:
+            return None
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
@@ -0,0 +1,160 @@
+"""
+Particionado mensual por rango de fechas (solo Postgres).
+
+La migración 0011 convierte quality_mqs en una tabla particionada por `date`
+con una partición por mes (quality_mqs_pYYYY_MM) y una partición DEFAULT para
+fechas sin partición propia. Este módulo crea las particiones futuras (job del
+scheduler) y separa las viejas (comando prune_partitions) sin DELETE masivos.
+En otras bases todas las operaciones son no-ops.
+"""
+import logging
+import re
+from datetime import date
+from django.db import connection, transaction
+
+logger = logging.getLogger(__name__)
+
+# Tabla particionada -> columna de partición
+PARTITIONED_TABLES = {'quality_mqs': 'date'}
+MONTHS_AHEAD = 3
+
+_PARTITION_RE = re.compile(r'_p(\d{4})_(\d{2})$')
+
+
+def month_start(fecha):
+    return fecha.replace(day=1)
+
+
+def add_months(fecha, months):
+    indice = fecha.year * 12 + fecha.month - 1 + months
+    return date(indice // 12, indice % 12 + 1, 1)
+
+
+def partition_name(table, month):
+    return f"{table}_p{month.year:04d}_{month.month:02d}"
+
+
+def default_partition_name(table):
+    return f"{table}_default"
+
+
+def is_partitioned(table):
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+            "WHERE c.relname = %s AND pg_table_is_visible(c.oid)",
+            [table],
+        )
+        return cursor.fetchone() is not None
+
+
+def list_partitions(table):
+    """
+    Particiones mensuales adjuntas como [(mes, nombre)], ordenadas por mes
+    """
+    if not is_partitioned(table):
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE p.relname = %s AND pg_table_is_visible(p.oid)",
+            [table],
+        )
+        nombres = [fila[0] for fila in cursor.fetchall()]
+    particiones = []
+    for nombre in nombres:
+        m = _PARTITION_RE.search(nombre)
+        if m:
+            particiones.append((date(int(m.group(1)), int(m.group(2)), 1), nombre))
+    return sorted(particiones)
+
+
+def create_partition(table, month):
+    """
+    Crea la partición de un mes si no existe. Si la partición DEFAULT ya tiene
+    filas de ese mes, se mueven a la nueva antes de adjuntarla (Postgres no
+    permite crear una partición que solape filas de la DEFAULT).
+    Devuelve True si la creó.
+    """
+    columna = PARTITIONED_TABLES[table]
+    nombre = partition_name(table, month)
+    if nombre in {n for _, n in list_partitions(table)}:
+        return False
+
+    qn = connection.ops.quote_name
+    desde, hasta = month_start(month), add_months(month, 1)
+    # Los límites de partición van como literales de texto, no como expresiones
+    limites = [desde.isoformat(), hasta.isoformat()]
+    default = default_partition_name(table)
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT EXISTS (SELECT 1 FROM {qn(default)} WHERE {qn(columna)} >= %s AND {qn(columna)} < %s)",
+            [desde, hasta],
+        )
+        if cursor.fetchone()[0]:
+            cursor.execute(f"CREATE TABLE {qn(nombre)} (LIKE {qn(table)} INCLUDING DEFAULTS)")
+            cursor.execute(
+                f"WITH movidas AS (DELETE FROM {qn(default)} WHERE {qn(columna)} >= %s AND {qn(columna)} < %s RETURNING *) "
+                f"INSERT INTO {qn(nombre)} SELECT * FROM movidas",
+                [desde, hasta],
+            )
+            cursor.execute(
+                f"ALTER TABLE {qn(table)} ATTACH PARTITION {qn(nombre)} FOR VALUES FROM (%s) TO (%s)",
+                limites,
+            )
+        else:
+            cursor.execute(
+                f"CREATE TABLE {qn(nombre)} PARTITION OF {qn(table)} FOR VALUES FROM (%s) TO (%s)",
+                limites,
+            )
+    logger.info(f"Partición {nombre} creada ({desde} a {hasta})")
+    return True
+
+
+def months_to_ensure(months_ahead=MONTHS_AHEAD, today=None):
+    """Primer día del mes actual y de los `months_ahead` siguientes"""
+    actual = month_start(today or date.today())
+    return [add_months(actual, i) for i in range(months_ahead + 1)]
+
+
+def ensure_partitions(table, months_ahead=MONTHS_AHEAD, today=None):
+    """
+    Asegura las particiones del mes actual y de los `months_ahead` siguientes.
+    Devuelve los nombres de las particiones creadas.
+    """
+    if not is_partitioned(table):
+        return []
+    creadas = []
+    for mes in months_to_ensure(months_ahead, today):
+        if create_partition(table, mes):
+            creadas.append(partition_name(table, mes))
+    return creadas
+
+
+def detach_partition(table, month, drop=False):
+    """
+    Separa la partición de un mes de la tabla (queda como tabla independiente,
+    lista para pg_dump) o la elimina con `drop`. Es una operación de catálogo:
+    no recorre ni borra filas una por una.
+    """
+    qn = connection.ops.quote_name
+    nombre = partition_name(table, month)
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f"ALTER TABLE {qn(table)} DETACH PARTITION {qn(nombre)}")
+        if drop:
+            cursor.execute(f"DROP TABLE {qn(nombre)}")
+    return nombre
+
+
+def scanned_partitions(queryset):
+    """
+    Particiones que el plan de Postgres recorre para un queryset (para
+    comprobar el partition pruning de las consultas acotadas por fecha)
+    """
+    tabla = queryset.model._meta.db_table
+    plan = queryset.explain()
+    return sorted(set(re.findall(rf'\b({re.escape(tabla)}_(?:p\d{{4}}_\d{{2}}|default))\b', plan)))
@@ -1,59 +1,106 @@
+import asyncio
 from django.db import models
 from django.db.models import Count, Avg, Sum, F, Q
 from django.utils import timezone
 from datetime import timedelta
-from ..models import MQS, MES, YieldTurno, QualityAnalytics
+from ..aio import run_query
+from ..models import MQS, MES, YieldTurno, QualityAnalytics, TestcodeDailyStats
+from .mqs_queries import with_testcode_descriptions
+from .yield_queries import get_yield_window
 
-def get_dashboard_summary(date=None, days_back=7):
+def get_yield_summary(start_date, date):
     """
-    Obtiene un resumen para el dashboard principal
+    Resumen de Yield ponderado por volumen (acumulados diarios de YieldDailyRollup)
     """
-    if not date:
-        date = timezone.now().date()
-        
-    start_date = date - timedelta(days=days_back)
-    
-    # Resumen de Yield
-    yield_summary = YieldTurno.objects.filter(
+    ventana = get_yield_window(start_date, date)
+    return {
+        'avg_fty': ventana['fty'],
+        'avg_dphu': ventana['dphu'],
+        'avg_ntf': ventana['ntf'],
+        'total_units': ventana['total_units'],
+        'pass_units': ventana['pass_units'],
+        'fail_units': ventana['fail_units'],
+    }
+
+def get_top_failures_summary(start_date, date, limit=5):
+    """
+    Top fallas MQS (contadores diarios de testcodes)
+    """
+    return with_testcode_descriptions(TestcodeDailyStats.objects.filter(
         date__range=[start_date, date]
-    ).aggregate(
-        avg_fty=Avg('FTY'),
-        avg_dphu=Avg('DPHU'),
-        avg_ntf=Avg('NTF'),
-        total_units=Sum('Prime_Handle'),
-        pass_units=Sum('Prime_Pass'),
-        fail_units=Sum('Prime_Fail')
-    )
-    
-    # Top fallas MQS
-    top_failures = MQS.objects.filter(
-        date__range=[start_date, date],
-        Prime=True
-    ).values('Testcode', 'Testcode_Desc').annotate(
-        failure_count=Count('id')
-    ).order_by('-failure_count')[:5]
-    
-    # Conteo de reparaciones MES
-    mes_repairs = MES.objects.filter(
+    ).values(Testcode=F('testcode')).annotate(
+        failure_count=Sum('failure_count')
+    ).order_by('-failure_count')[:limit])
+
+def get_mes_repairs_count(start_date, date):
+    """
+    Conteo de reparaciones MES
+    """
+    return MES.objects.filter(
         FECHA_REPARACION__range=[start_date, date]
     ).count()
-    
-    # Datos por familia
-    family_data = YieldTurno.objects.filter(
-        date__range=[start_date, date]
-    ).values('Family').annotate(
-        avg_fty=Avg('FTY'),
-        total_units=Sum('Prime_Handle')
+
+def get_family_breakdown(start_date, date):
+    """
+    Datos por familia (resumen diario por línea/familia)
+    """
+    family_data = QualityAnalytics.objects.filter(
+        date__range=[start_date, date],
+        total_units__gt=0
+    ).values(Family=F('family')).annotate(
+        total_units=Sum('total_units'),
+        pass_units=Sum('pass_units')
     ).order_by('-total_units')
-    
+    return [
+        {
+            'Family': f['Family'],
+            'avg_fty': (f['pass_units'] * 100 / f['total_units']) if f['total_units'] else None,
+            'total_units': f['total_units'],
+        }
+        for f in family_data
+    ]
+
+# Secciones independientes del dashboard: clave de la respuesta -> consulta
+DASHBOARD_SECTIONS = {
+    'yield': get_yield_summary,
+    'top_failures': get_top_failures_summary,
+    'mes_repairs': get_mes_repairs_count,
+    'families': get_family_breakdown,
+}
+
+def _period(date, days_back):
+    if not date:
+        date = timezone.now().date()
+    return date - timedelta(days=days_back), date
+
+def get_dashboard_summary(date=None, days_back=7):
+    """
+    Obtiene un resumen para el dashboard principal
+    """
+    start_date, date = _period(date, days_back)
+    return {
+        'period': {
+            'start': start_date,
+            'end': date,
+            'days': days_back
+        },
+        **{clave: seccion(start_date, date) for clave, seccion in DASHBOARD_SECTIONS.items()},
+    }
+
+async def aget_dashboard_summary(date=None, days_back=7):
+    """
+    Versión async de get_dashboard_summary: las secciones corren en paralelo,
+    cada una en su propio hilo y conexión, así la latencia es la de la más lenta
+    """
+    start_date, date = _period(date, days_back)
+    resultados = await asyncio.gather(*(
+        run_query(seccion, start_date, date) for seccion in DASHBOARD_SECTIONS.values()
+    ))
     return {
         'period': {
             'start': start_date,
             'end': date,
             'days': days_back
         },
-        'yield': yield_summary,
-        'top_failures': list(top_failures),
-        'mes_repairs': mes_repairs,
-        'families': list(family_data)
-    }
\ No newline at end of file
+        **dict(zip(DASHBOARD_SECTIONS, resultados)),
+    }
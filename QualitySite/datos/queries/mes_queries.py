@@ -1,53 +1,129 @@
+import heapq
+from collections import defaultdict
+from itertools import islice
+from operator import itemgetter
 from django.db import models
+from django.db.models import Count, Window
 from ..models import MES, MQS
+from ..ingest.bulk import chunked
+
+MQS_EVENT_FIELDS = ('ts', 'date', 'Time', 'Testcode', 'Testcode_Desc', 'Station', 'Line')
+MES_EVENT_FIELDS = ('ts', 'FECHA_REPARACION', 'HORA_REPARACION', 'CODIGO_FALLA', 'ACCION', 'CAUSA', 'REPARADOR')
+BATCH_CHUNK_SIZE = 500  # TrackIds por consulta IN, por debajo del límite de parámetros de la base
+
+def _mqs_event(row):
+    _, fecha, hora, testcode, descripcion, station, line = row
+    return {
+        'fecha': fecha,
+        'hora': hora,
+        'tipo': 'Falla MQS',
+        'testcode': testcode,
+        'descripcion': descripcion,
+        'station': station,
+        'line': line
+    }
+
+def _mes_event(row):
+    _, fecha, hora, codigo, accion, causa, reparador = row
+    return {
+        'fecha': fecha,
+        'hora': hora,
+        'tipo': 'Reparación MES',
+        'codigo': codigo,
+        'accion': accion,
+        'causa': causa,
+        'reparador': reparador
+    }
+
+def merge_history(mqs_rows, mes_rows):
+    """
+    Mezcla perezosamente dos secuencias de filas ya ordenadas por ts (su
+    primera columna) en un único historial; ante empates la falla MQS va
+    antes que la reparación
+    """
+    eventos = heapq.merge(
+        ((row[0], _mqs_event(row)) for row in mqs_rows),
+        ((row[0], _mes_event(row)) for row in mes_rows),
+        key=itemgetter(0),
+    )
+    return (evento for _, evento in eventos)
+
+def _filas_y_total(queryset, fin):
+    """
+    Primeras `fin` filas de un values_list anotado con `total` (COUNT(*) OVER ()
+    como última columna) y el total de filas del queryset sin recortar
+    """
+    filas = list(queryset if fin is None else queryset[:fin])
+    total = filas[0][-1] if filas else 0
+    return [fila[:-1] for fila in filas], total
+
+def get_repair_history_by_trackid(track_id, limit=None, offset=0):
+    """
+    Obtiene el historial completo de un equipo por su TrackId, paginado con
+    limit/offset. Usa exactamente dos consultas ya ordenadas, cada una
+    acotada a offset + limit filas (las primeras offset + limit del historial
+    salen de esas); los totales vienen de COUNT(*) OVER () en las mismas
+    consultas.
+    """
+    fin = None if limit is None else offset + limit
+    total = Window(Count('*'))
+    # Fallas MQS y reparaciones MES, ordenadas en la base
+    mqs_rows, total_fallas = _filas_y_total(
+        MQS.objects.with_names(*MQS_EVENT_FIELDS).filter(TrackId=track_id).annotate(total=total)
+        .order_by('ts', 'id').values_list(*MQS_EVENT_FIELDS, 'total'),
+        fin,
+    )
+    mes_rows, total_reparaciones = _filas_y_total(
+        MES.objects.filter(NS=track_id).annotate(total=total)
+        .order_by('ts', 'id').values_list(*MES_EVENT_FIELDS, 'total'),
+        fin,
+    )
+
+    full_history = list(islice(merge_history(mqs_rows, mes_rows), offset, fin))
 
-def get_repair_history_by_trackid(track_id):
-    """
-    Obtiene el historial completo de un equipo por su TrackId
-    """
-    # Obtener todas las fallas MQS
-    mqs_records = MQS.objects.filter(TrackId=track_id).order_by('date', 'Time')
-    
-    # Obtener todas las reparaciones MES
-    mes_records = MES.objects.filter(NS=track_id).order_by('FECHA_REPARACION', 'HORA_REPARACION')
-    
-    # Crear historial combinado
-    full_history = []
-    
-    for mqs in mqs_records:
-        event = {
-            'fecha': mqs.date,
-            'hora': mqs.Time,
-            'tipo': 'Falla MQS',
-            'testcode': mqs.Testcode,
-            'descripcion': mqs.Testcode_Desc,
-            'station': mqs.Station,
-            'line': mqs.Line
-        }
-        full_history.append(event)
-    
-    for mes in mes_records:
-        event = {
-            'fecha': mes.FECHA_REPARACION,
-            'hora': mes.HORA_REPARACION,
-            'tipo': 'Reparación MES',
-            'codigo': mes.CODIGO_FALLA,
-            'accion': mes.ACCION,
-            'causa': mes.CAUSA,
-            'reparador': mes.REPARADOR
-        }
-        full_history.append(event)
-    
-    # Ordenar por fecha y hora
-    full_history.sort(key=lambda x: (x['fecha'], x['hora']))
-    
     return {
         'track_id': track_id,
-        'total_fallas': mqs_records.count(),
-        'total_reparaciones': mes_records.count(),
+        'total_fallas': total_fallas,
+        'total_reparaciones': total_reparaciones,
+        'offset': offset,
+        'limit': limit,
         'historial': full_history
     }
 
+def _agrupar_por_clave(rows):
+    """
+    Agrupa filas (clave, *campos) por su primera columna conservando el orden
+    """
+    grupos = defaultdict(list)
+    for clave, *campos in rows:
+        grupos[clave].append(campos)
+    return grupos
+
+def iter_repair_histories(track_ids, chunk_size=BATCH_CHUNK_SIZE):
+    """
+    Genera el historial de cada TrackId en el orden recibido, con dos consultas
+    TrackId__in/NS__in por bloque de `chunk_size` equipos
+    """
+    track_ids = list(dict.fromkeys(t for t in track_ids if t))
+    for chunk in chunked(track_ids, chunk_size):
+        fallas = _agrupar_por_clave(
+            MQS.objects.with_names(*MQS_EVENT_FIELDS).filter(TrackId__in=chunk).order_by('ts')
+            .values_list('TrackId', *MQS_EVENT_FIELDS).iterator()
+        )
+        reparaciones = _agrupar_por_clave(
+            MES.objects.filter(NS__in=chunk).order_by('ts')
+            .values_list('NS', *MES_EVENT_FIELDS).iterator()
+        )
+        for track_id in chunk:
+            mqs_rows = fallas.get(track_id, [])
+            mes_rows = reparaciones.get(track_id, [])
+            yield {
+                'track_id': track_id,
+                'total_fallas': len(mqs_rows),
+                'total_reparaciones': len(mes_rows),
+                'historial': list(merge_history(mqs_rows, mes_rows))
+            }
+
 def get_top_repairs_by_model(date_from, date_to, limit=10):
     """
     Obtiene los modelos con más reparaciones
@@ -1,42 +1,55 @@
 from django.db import models
-from ..models import MQS, MES
+from django.db.models import F, Sum
+from ..models import MQS, MES, DimTestcode, StationDailyStats, TestcodeDailyStats
 
 def get_top_failures_by_family(family=None, limit=10, date_from=None, date_to=None):
     """
-    Obtiene los testcodes con más fallas por familia
+    Obtiene los testcodes con más fallas por familia (desde el resumen diario)
     """
-    query = MQS.objects.filter(Prime=True)  # Solo equipos en Prime
+    query = TestcodeDailyStats.objects.all()  # Solo contiene fallas de equipos en Prime
     
     if family:
-        query = query.filter(Family=family)
+        query = query.filter(family=family)
         
     if date_from and date_to:
         query = query.filter(date__range=[date_from, date_to])
     
-    # Agrupar por Testcode y contar
-    top_failures = query.values('Family', 'Testcode', 'Testcode_Desc') \
-                       .annotate(failure_count=models.Count('id')) \
+    # Agrupar por Testcode y sumar los contadores diarios
+    top_failures = query.values(Family=F('family'), Testcode=F('testcode')) \
+                       .annotate(failure_count=Sum('failure_count')) \
                        .order_by('Family', '-failure_count')[:limit]
                        
-    return top_failures
+    return with_testcode_descriptions(top_failures)
+
+def with_testcode_descriptions(rows):
+    """
+    Agrega Testcode_Desc (desde DimTestcode, una consulta) a filas con 'Testcode'
+    """
+    rows = list(rows)
+    descripciones = dict(
+        DimTestcode.objects.filter(code__in={r['Testcode'] for r in rows}).values_list('code', 'description')
+    )
+    for r in rows:
+        r['Testcode_Desc'] = descripciones.get(r['Testcode'], '')
+    return rows
 
 def get_station_performance(date_from, date_to, line=None, family=None):
     """
-    Analiza el rendimiento de cada estación
+    Analiza el rendimiento de cada estación (desde el resumen diario)
     """
-    query = MQS.objects.filter(date__range=[date_from, date_to])
+    query = StationDailyStats.objects.filter(date__range=[date_from, date_to])
     
     if line:
-        query = query.filter(Line=line)
+        query = query.filter(line=line)
     if family:
-        query = query.filter(Family=family)
+        query = query.filter(family=family)
         
     # Agrupar por estación
-    stations = query.values('Station', 'Line', 'Family') \
+    stations = query.values(Station=F('station'), Line=F('line'), Family=F('family')) \
                 .annotate(
-                    total_tests=models.Count('id'),
-                    failures=models.Count('id', filter=models.Q(Prime=True)),
-                    ntf_count=models.Count('id', filter=models.Q(NTF=True)),
+                    total_tests=Sum('total_tests'),
+                    failures=Sum('failures'),
+                    ntf_count=Sum('ntf_count'),
                 )
                 
     # Calcular porcentajes
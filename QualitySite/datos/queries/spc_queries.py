@@ -0,0 +1,214 @@
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.conf import settings
+from ..cache import versioned_keys
+from ..ingest.dimensions import dimension_names
+from ..models import MQS
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - dependencia opcional
+    np = None
+
+# Constantes de cartas de control por tamaño de subgrupo: (A2, D3, D4, d2)
+CONTROL_CONSTANTS = {
+    2: (1.880, 0.0, 3.267, 1.128),
+    3: (1.023, 0.0, 2.574, 1.693),
+    4: (0.729, 0.0, 2.282, 2.059),
+    5: (0.577, 0.0, 2.114, 2.326),
+    6: (0.483, 0.0, 2.004, 2.534),
+    7: (0.419, 0.076, 1.924, 2.704),
+    8: (0.373, 0.136, 1.864, 2.847),
+    9: (0.337, 0.184, 1.816, 2.970),
+    10: (0.308, 0.223, 1.777, 3.078),
+}
+MR_D2 = 1.128  # d2 para rangos móviles de 2 puntos
+MR_D4 = 3.267
+
+
+def _require_numpy():
+    if np is None:
+        raise ImproperlyConfigured("El módulo SPC requiere numpy (pip install numpy)")
+
+
+def load_measurements(date_from, date_to, station=None, testcode=None, family=None, line=None):
+    """
+    Carga Test_Val/LL/UL en arrays de NumPy agrupados por (Station, Testcode),
+    en orden cronológico dentro de cada grupo
+    """
+    query = MQS.objects.filter(date__range=[date_from, date_to]).filter_names(
+        Station=station, Testcode=testcode, Family=family, Line=line,
+    )
+
+    # Agrupado por las claves de dimensión; el texto se traduce solo para las claves de los grupos
+    filas = list(query.order_by('ts', 'id').values_list('station_dim_id', 'testcode_dim_id', 'Test_Val', 'LL', 'UL'))
+    if not filas:
+        return {}
+
+    estaciones, testcodes, valores, ll, ul = zip(*filas)
+    indice = {}
+    codigos = np.fromiter(
+        (indice.setdefault(clave, len(indice)) for clave in zip(estaciones, testcodes)),
+        dtype=np.int64, count=len(filas),
+    )
+    valores = np.asarray(valores, dtype=np.float64)
+    ll = np.asarray(ll, dtype=np.float64)
+    ul = np.asarray(ul, dtype=np.float64)
+
+    # Orden estable por grupo: conserva el orden cronológico dentro de cada uno
+    orden = np.argsort(codigos, kind='stable')
+    codigos = codigos[orden]
+    cortes = np.flatnonzero(np.diff(codigos)) + 1
+    nombres_estacion = dimension_names('Station', estaciones)
+    nombres_testcode = dimension_names('Testcode', testcodes)
+    claves = [(nombres_estacion[e], nombres_testcode[t]) for e, t in indice]
+    grupos = {}
+    for valores_g, ll_g, ul_g, codigo in zip(
+        np.split(valores[orden], cortes),
+        np.split(ll[orden], cortes),
+        np.split(ul[orden], cortes),
+        codigos[np.r_[0, cortes]],
+    ):
+        grupos[claves[codigo]] = (valores_g, ll_g, ul_g)
+    return grupos
+
+
+def _round(value, digits=6):
+    if value is None or not np.isfinite(value):
+        return None
+    return round(float(value), digits)
+
+
+def _capability(mean, sigma, lsl, usl):
+    if sigma is None or sigma <= 0 or usl <= lsl:
+        return None, None
+    return (usl - lsl) / (6 * sigma), min(usl - mean, mean - lsl) / (3 * sigma)
+
+
+def control_limits(valores, lsl, usl, subgroup_size):
+    """
+    Límites de las cartas X-bar/R e I-MR y capacidad (Cp/Cpk con sigma dentro
+    de subgrupos, Pp/Ppk con la desviación total)
+    """
+    a2, d3, d4, d2 = CONTROL_CONSTANTS[subgroup_size]
+    mean = float(valores.mean())
+    std = float(valores.std(ddof=1)) if len(valores) > 1 else 0.0
+
+    # X-bar/R sobre subgrupos consecutivos completos
+    subgrupos = len(valores) // subgroup_size
+    xbar_r = None
+    sigma_within = None
+    if subgrupos >= 2:
+        matriz = valores[:subgrupos * subgroup_size].reshape(subgrupos, subgroup_size)
+        medias = matriz.mean(axis=1)
+        rangos = np.ptp(matriz, axis=1)
+        xbarbar, rbar = float(medias.mean()), float(rangos.mean())
+        sigma_within = rbar / d2
+        xbar_r = {
+            'subgroup_size': subgroup_size,
+            'subgroups': subgrupos,
+            'center': _round(xbarbar),
+            'ucl': _round(xbarbar + a2 * rbar),
+            'lcl': _round(xbarbar - a2 * rbar),
+            'r_center': _round(rbar),
+            'r_ucl': _round(d4 * rbar),
+            'r_lcl': _round(d3 * rbar),
+        }
+
+    # Individuales y rango móvil
+    mrbar = float(np.abs(np.diff(valores)).mean()) if len(valores) > 1 else 0.0
+    sigma_i = mrbar / MR_D2
+    imr = {
+        'center': _round(mean),
+        'ucl': _round(mean + 3 * sigma_i),
+        'lcl': _round(mean - 3 * sigma_i),
+        'sigma': _round(sigma_i),
+        'mr_center': _round(mrbar),
+        'mr_ucl': _round(MR_D4 * mrbar),
+    }
+
+    cp, cpk = _capability(mean, sigma_within, lsl, usl)
+    pp, ppk = _capability(mean, std, lsl, usl)
+    return {
+        'n': int(len(valores)),
+        'mean': _round(mean),
+        'std': _round(std),
+        'lsl': _round(lsl),
+        'usl': _round(usl),
+        'cp': _round(cp, 4),
+        'cpk': _round(cpk, 4),
+        'pp': _round(pp, 4),
+        'ppk': _round(ppk, 4),
+        'xbar_r': xbar_r,
+        'imr': imr,
+    }
+
+
+def _windows(flags, size, minimum):
+    if len(flags) < size:
+        return np.zeros(0, dtype=bool)
+    return np.lib.stride_tricks.sliding_window_view(flags, size).sum(axis=1) >= minimum
+
+
+def western_electric_rules(valores, center, sigma):
+    """
+    Cuenta las violaciones de las reglas de Western Electric sobre la carta de
+    individuales (cada ventana que cumple la condición cuenta una vez):
+
+    1. Un punto fuera de ±3σ
+    2. 2 de 3 puntos consecutivos más allá de 2σ del mismo lado
+    3. 4 de 5 puntos consecutivos más allá de 1σ del mismo lado
+    4. 8 puntos consecutivos del mismo lado de la línea central
+    """
+    if not sigma or sigma <= 0:
+        return {'rule1': 0, 'rule2': 0, 'rule3': 0, 'rule4': 0}
+    z = (valores - center) / sigma
+    return {
+        'rule1': int(np.count_nonzero(np.abs(z) > 3)),
+        'rule2': int(np.count_nonzero(_windows(z > 2, 3, 2) | _windows(z < -2, 3, 2))),
+        'rule3': int(np.count_nonzero(_windows(z > 1, 5, 4) | _windows(z < -1, 5, 4))),
+        'rule4': int(np.count_nonzero(_windows(z > 0, 8, 8) | _windows(z < 0, 8, 8))),
+    }
+
+
+def get_spc_stats(date_from, date_to, station=None, testcode=None, family=None, line=None,
+                  subgroup_size=5, min_samples=10, limit=50):
+    """
+    Cp/Cpk, cartas X-bar/R e I-MR y reglas de Western Electric por
+    (Station, Testcode). El resultado completo se cachea por conjunto de
+    filtros (sin `limit`) y se invalida con la versión de MQS: las mediciones
+    se leen una sola vez por filtro aunque cambie el límite pedido.
+    """
+    _require_numpy()
+    cache_key, = versioned_keys(
+        'spc-stats',
+        [[str(date_from), str(date_to), station, testcode, family, line, subgroup_size, min_samples]],
+        ('mqs',), date_from, date_to,
+    )
+    resultados = cache.get(cache_key)
+    if resultados is None:
+        resultados = _compute_spc_stats(date_from, date_to, station, testcode, family, line,
+                                        subgroup_size, min_samples)
+        cache.set(cache_key, resultados, settings.ANALYTICS_CACHE_TIMEOUT)
+    return resultados[:limit]
+
+
+def _compute_spc_stats(date_from, date_to, station, testcode, family, line, subgroup_size, min_samples):
+    resultados = []
+    for (st, tc), (valores, ll, ul) in load_measurements(date_from, date_to, station, testcode, family, line).items():
+        if len(valores) < min_samples:
+            continue
+        # Límites de especificación vigentes: los de la medición más reciente
+        limites = control_limits(valores, float(ll[-1]), float(ul[-1]), subgroup_size)
+        reglas = western_electric_rules(valores, limites['imr']['center'], limites['imr']['sigma'])
+        resultados.append({
+            'station': st,
+            'testcode': tc,
+            **limites,
+            'rules': reglas,
+            'out_of_control': any(reglas.values()),
+        })
+
+    # Peor capacidad primero; los grupos sin límites de especificación al final
+    resultados.sort(key=lambda r: (r['cpk'] is None, r['cpk'] if r['cpk'] is not None else 0))
+    return resultados
@@ -1,5 +1,13 @@
-from django.db import models
-from ..models import YieldTurno, MQS, MES
+import asyncio
+from datetime import timedelta
+from django.db import connection
+from ..aio import run_query
+from ..ingest.dimensions import dimension_names
+from ..ingest.rollups import ALL, YIELD_COUNTS
+from ..metrics import yield_metrics
+from ..models import YieldTurno, YieldDailyRollup, MQS, MES, DimFamily, DimLine
+
+BUCKET_DAYS = {'day': 1, 'week': 7}
 
 def get_yield_stats(date_from, date_to, family=None, line=None):
     """
@@ -7,53 +15,177 @@ def get_yield_stats(date_from, date_to, family=None, line=None):
     """
     # Query base para YieldTurno
     query = YieldTurno.objects.filter(date__range=[date_from, date_to])
-    
+
     # Filtros opcionales
     if family:
         query = query.filter(Family=family)
     if line:
         query = query.filter(Line=line)
-    
+
     return query
 
+def get_mes_repairs_by_group(date_from, date_to, family=None, line=None):
+    """
+    Cuenta las reparaciones MES de los TrackIds testeados en MQS, agrupadas por
+    (date, Line, Family, Process), con una sola consulta agregada sobre las
+    claves de dimensión de MQS; el texto se traduce al final.
+    """
+    qn = connection.ops.quote_name
+    columna = {nombre: qn(MQS._meta.get_field(nombre).column) for nombre in
+               ('date', 'line_dim', 'family_dim', 'process_dim', 'TrackId')}
+    filtros = [f"{columna['date']} BETWEEN %s AND %s"]
+    params = [date_from, date_to]
+    for fk, dimension, valor in (('family_dim', DimFamily, family), ('line_dim', DimLine, line)):
+        if valor:
+            filtros.append(f"{columna[fk]} IN (SELECT {qn('id')} FROM {qn(dimension._meta.db_table)} "
+                           f"WHERE {qn('name')} = %s)")
+            params.append(valor)
+
+    sql = f"""
+        SELECT t.fecha, t.linea, t.familia, t.proceso, COUNT(m.{qn('id')})
+        FROM (
+            SELECT DISTINCT {columna['date']} AS fecha, {columna['line_dim']} AS linea,
+                   {columna['family_dim']} AS familia, {columna['process_dim']} AS proceso,
+                   {columna['TrackId']} AS track_id
+            FROM {qn(MQS._meta.db_table)}
+            WHERE {' AND '.join(filtros)}
+        ) t
+        JOIN {qn(MES._meta.db_table)} m ON m.{qn('NS')} = t.track_id
+        GROUP BY t.fecha, t.linea, t.familia, t.proceso
+    """
+    to_date = MQS._meta.get_field('date').to_python
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        filas = cursor.fetchall()
+    lineas = dimension_names('Line', {f[1] for f in filas})
+    familias = dimension_names('Family', {f[2] for f in filas})
+    procesos = dimension_names('Process', {f[3] for f in filas})
+    return {
+        (to_date(fecha), lineas[linea], familias[familia], procesos[proceso]): total
+        for fecha, linea, familia, proceso, total in filas
+    }
+
+YIELD_STATS_FIELDS = (
+    'date', 'Line', 'Family', 'Process', 'Turno', 'Jornada', 'Prime_Handle', 'Prime_Pass',
+    'Prime_Fail', 'Prime_NTF_Count', 'Prime_Defect_Count', 'FTY', 'DPHU', 'NTF'
+)
+
+def _yield_rows(date_from, date_to, family=None, line=None):
+    return list(get_yield_stats(date_from, date_to, family, line).values(*YIELD_STATS_FIELDS))
+
+def _merge_repairs(yields, repairs):
+    results = []
+    for yield_data in yields:
+        results.append({
+            'date': yield_data['date'],
+            'line': yield_data['Line'],
+            'family': yield_data['Family'],
+            'turno': yield_data['Turno'],
+            'jornada': yield_data['Jornada'],
+            'equipos_procesados': yield_data['Prime_Handle'],
+            'equipos_ok': yield_data['Prime_Pass'],
+            'equipos_fail': yield_data['Prime_Fail'],
+            'ntf_count': yield_data['Prime_NTF_Count'],
+            'defect_count': yield_data['Prime_Defect_Count'],
+            'fty': yield_data['FTY'],
+            'dphu': yield_data['DPHU'],
+            'ntf_rate': yield_data['NTF'],
+            'mes_repairs_count': repairs.get(
+                (yield_data['date'], yield_data['Line'], yield_data['Family'], yield_data['Process']), 0
+            ),
+        })
+
+    return results
+
 def get_yield_complete_stats(date_from, date_to, family=None, line=None):
     """
     Obtiene estadísticas completas de Yield incluyendo reparaciones MES
     """
     # Obtener datos básicos
-    yields = get_yield_stats(date_from, date_to, family, line)
-    results = []
-    
-    for yield_data in yields:
-        # Datos básicos del yield
-        yield_stats = {
-            'date': yield_data.date,
-            'line': yield_data.Line,
-            'family': yield_data.Family,
-            'turno': yield_data.Turno,
-            'jornada': yield_data.Jornada,
-            'equipos_procesados': yield_data.Prime_Handle,
-            'equipos_ok': yield_data.Prime_Pass,
-            'equipos_fail': yield_data.Prime_Fail,
-            'ntf_count': yield_data.Prime_NTF_Count,
-            'defect_count': yield_data.Prime_Defect_Count,
-            'fty': yield_data.FTY,
-            'dphu': yield_data.DPHU,
-            'ntf_rate': yield_data.NTF
-        }
-        
-        # Obtener TrackIds relacionados con este yield
-        mqs_records = yield_data.mqs_records
-        track_ids = mqs_records.values_list('TrackId', flat=True).distinct()
-        
-        # Contar reparaciones en MES para estos TrackIds
-        mes_repairs_count = MES.objects.filter(
-            NS__in=track_ids
-        ).count()
-        
-        yield_stats['mes_repairs_count'] = mes_repairs_count
-        
-        # Añadir al resultado
-        results.append(yield_stats)
-    
-    return results
\ No newline at end of file
+    yields = _yield_rows(date_from, date_to, family, line)
+
+    # Reparaciones MES por (date, Line, Family, Process): una consulta para todo el rango
+    repairs = get_mes_repairs_by_group(date_from, date_to, family, line)
+
+    return _merge_repairs(yields, repairs)
+
+async def aget_yield_complete_stats(date_from, date_to, family=None, line=None):
+    """
+    Versión async de get_yield_complete_stats: Yield y reparaciones MES se
+    consultan en paralelo
+    """
+    yields, repairs = await asyncio.gather(
+        run_query(_yield_rows, date_from, date_to, family, line),
+        run_query(get_mes_repairs_by_group, date_from, date_to, family, line),
+    )
+    return _merge_repairs(yields, repairs)
+
+def _cumulative(fecha, jornada, turno):
+    # Acumulado hasta `fecha` inclusive: una búsqueda por el índice único
+    fila = YieldDailyRollup.objects.filter(jornada=jornada, turno=turno, date__lte=fecha) \
+        .order_by('-date').values(*[f'cum_{k}' for k in YIELD_COUNTS]).first()
+    return {k: fila[f'cum_{k}'] if fila else 0 for k in YIELD_COUNTS}
+
+def _window(date_from, date_to, inicio, fin):
+    total = {k: fin[k] - inicio[k] for k in YIELD_COUNTS}
+    fty, dphu, ntf = yield_metrics(total['pass'], total['defect'], total['ntf'], total['handle'])
+    return {
+        'start': date_from,
+        'end': date_to,
+        'days': (date_to - date_from).days + 1,
+        'fty': fty,
+        'dphu': dphu,
+        'ntf': ntf,
+        'total_units': total['handle'],
+        'pass_units': total['pass'],
+        'fail_units': total['fail'],
+        'ntf_units': total['ntf'],
+        'defect_units': total['defect'],
+    }
+
+def get_yield_window(date_from, date_to, jornada=ALL, turno=ALL):
+    """
+    FTY/DPHU/NTF ponderados por volumen (sumas de conteos Prime) para
+    [date_from, date_to], restando dos acumulados: costo constante para
+    cualquier largo de ventana
+    """
+    return _window(
+        date_from, date_to,
+        _cumulative(date_from - timedelta(days=1), jornada, turno),
+        _cumulative(date_to, jornada, turno),
+    )
+
+def is_rollup_key(jornada, turno):
+    """
+    Combinaciones de YieldDailyRollup: (ALL, ALL), (jornada, ALL) y (jornada, turno)
+    """
+    jornadas = {valor for valor, _ in YieldTurno.JORNADA_CHOICES}
+    turnos = {valor for valor, _ in YieldTurno.TURNO_CHOICES}
+    if jornada == ALL:
+        return turno == ALL
+    return jornada in jornadas and (turno == ALL or turno in turnos)
+
+def get_yield_rollup(date, windows=(7, 30), jornada=ALL, turno=ALL, bucket=None, buckets=0):
+    """
+    Ventanas móviles que terminan en `date` (inclusive) y, opcionalmente, una
+    serie de `buckets` períodos consecutivos de un día o una semana
+    """
+    resultado = {
+        'date': date,
+        'jornada': jornada,
+        'turno': turno,
+        'windows': {
+            str(dias): get_yield_window(date - timedelta(days=dias - 1), date, jornada, turno)
+            for dias in windows
+        },
+    }
+    if bucket:
+        # Los períodos consecutivos comparten bordes: buckets + 1 acumulados en total
+        dias = BUCKET_DAYS[bucket]
+        bordes = [date - timedelta(days=i * dias) for i in reversed(range(buckets + 1))]
+        acumulados = [_cumulative(borde, jornada, turno) for borde in bordes]
+        resultado['series'] = [
+            _window(bordes[i] + timedelta(days=1), bordes[i + 1], acumulados[i], acumulados[i + 1])
+            for i in range(buckets)
+        ]
+    return resultado
@@ -1,17 +1,41 @@
 from rest_framework import serializers
 from .models import MQS, MES, YieldTurno  # Mantener solo esta importación
 
-class MQSSerializer(serializers.ModelSerializer):
+class DynamicFieldsModelSerializer(serializers.ModelSerializer):
+    """
+    ModelSerializer que acepta `fields=[...]` para serializar solo un subconjunto
+    de campos (usado junto con .only() en las vistas de listado)
+    """
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop('fields', None)
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+class MQSSerializer(DynamicFieldsModelSerializer):
+    # Texto de las dimensiones, anotado por MQS.objects.with_names()
+    Line = serializers.CharField(read_only=True)
+    Family = serializers.CharField(read_only=True)
+    Model = serializers.CharField(read_only=True)
+    Process = serializers.CharField(read_only=True)
+    Station = serializers.CharField(read_only=True)
+    Fixture = serializers.CharField(read_only=True)
+    Testcode = serializers.CharField(read_only=True)
+    Testcode_Desc = serializers.CharField(read_only=True)
+    Fail_Desc = serializers.CharField(read_only=True)
+
     class Meta:
         model = MQS
-        fields = '__all__'
+        # Las FKs de dimensión son internas; la API expone su texto
+        fields = MQS.API_FIELDS
 
-class MESSerializer(serializers.ModelSerializer):
+class MESSerializer(DynamicFieldsModelSerializer):
     class Meta:
         model = MES
         fields = '__all__'
 
-class YieldTurnoSerializer(serializers.ModelSerializer):
+class YieldTurnoSerializer(DynamicFieldsModelSerializer):
     class Meta:
         model = YieldTurno
         fields = '__all__'
@@ -1,3 +1,1190 @@
-from django.test import TestCase
+import csv
+import importlib
+import io
+import os
+import re
+import shutil
+import tempfile
+import unittest
+from datetime import date, datetime, time, timedelta
+from unittest import mock
+from django.db import connection
+from django.db.models import Count, Q, Sum
+from asgiref.sync import sync_to_async
+from django.apps import apps as django_apps
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from django.core.cache import cache
+from django.core.management import call_command
+from QualitySite import jobs
+from . import exports
+from .queries import spc_queries
+from .queries.mes_queries import get_repair_history_by_trackid
+from .queries.yield_queries import ALL, get_yield_window
+from .ingest import fetch, parallel
+from .ingest.dimensions import build_mqs, dimension_cache
+from .ingest.importers import MESImporter, MQSImporter, YieldImporter
+from .ingest.pipeline import run_pipeline
+from .ingest.streaming import decode_lines
+from .ingest.parsers import parse_mqs_values
+from .ingest.typed import combine_ts, parse_date_dmy, parse_date_ymd, parse_time_hm, parse_time_hms
+from .models import (
+    MES, MQS, DimFailDesc, ExportRun, IngestionCheckpoint, IngestionRun, StationDailyStats, TestcodeDailyStats,
+    YieldTurno,
+)
+from . import partitions
+from .partitions import (
+    add_months, create_partition, default_partition_name, ensure_partitions, list_partitions, month_start,
+    months_to_ensure, partition_name, scanned_partitions,
+)
 
-# Create your tests here.
+SIN_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+CACHE_LOCAL = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tests'}}
+
+MES_HEADERS = ['MODELO', 'NS', 'FECHA REPARACION', 'HORA REPARACION', 'FECHA RECHAZO', 'HORA RECHAZO',
+               'POSICION', 'FUNCION', 'CODIGO DE FALLA REPARACION', 'CAUSA DE REPARACION',
+               'ACCION CORRECTIVA', 'ORIGEN', 'IMAGEN', 'REPARADOR', 'COMENTARIO']
+
+COMANDOS = {'import_mqs_csv': 'mqs', 'import_mes': 'mes', 'import_yield_csv': 'yield'}
+
+YIELD_HEADERS = ['Name', 'Date', 'Jornada', 'Turno', 'Line', 'Family', 'Process', 'Prime Pass',
+                 'Prime Fail', 'Prime Handle', 'Prime NTF Count', 'Prime Defect Count']
+
+
+def generar_fuentes(directorio, hasta, dias, por_dia, lineas, familias, estaciones):
+    """
+    Escribe los CSV de MQS, MES y Yield con `dias` días (hasta la fecha dada
+    inclusive) y `por_dia` pruebas MQS por día; devuelve las rutas
+    """
+    rutas = {nombre: os.path.join(directorio, f'{nombre}.csv') for nombre in ('mqs', 'mes', 'yield')}
+    with open(rutas['mqs'], 'w', newline='') as f_mqs, open(rutas['mes'], 'w', newline='') as f_mes, \
+            open(rutas['yield'], 'w', newline='') as f_yield:
+        mqs, mes, yld = csv.writer(f_mqs), csv.writer(f_mes), csv.writer(f_yield)
+        mqs.writerow(MQSImporter.expected_headers)
+        mes.writerow(MES_HEADERS)
+        yld.writerow(YIELD_HEADERS)
+        for d in range(dias - 1, -1, -1):
+            fecha = hasta - timedelta(days=d)
+            for i in range(por_dia):
+                linea, familia = lineas[i % len(lineas)], familias[i % len(familias)]
+                estacion, testcode = estaciones[i % len(estaciones)], f'TC{i % 7}'
+                track = f'T{fecha:%Y%m%d}{i:04d}'
+                hora = f'{(i // 60) % 24:02d}:{i % 60:02d}:00'
+                falla = i % 3 == 0
+                mqs.writerow(['x', 1, fecha.isoformat(), hora, linea, familia, 'M', 'P', estacion, 'F', track,
+                              'Y' if i % 6 == 0 else 'N', 'Y' if falla else 'N', testcode,
+                              f'desc {testcode}', f'falla {i % 5}', 1, i % 10, 0, 9])
+                if falla:
+                    mes.writerow(['M', track, fecha.isoformat(), hora[:5], f'{fecha:%d/%m/%Y}', hora[:5], 'U1', 'F',
+                                  testcode, 'causa', 'acc', 'ORI', '', 'rep', 'com'])
+            for linea in lineas:
+                for familia in familias:
+                    for jornada, turno in (('Day', '1'), ('Night', '2')):
+                        yld.writerow([f'{linea}{familia}{turno}', fecha.isoformat(), jornada, turno, linea, familia,
+                                      'P', 40, 5, 45, 2, 3])
+    return rutas
+
+
+def fila_mqs(fecha, track_id=None, hora=time(8, 0), **campos):
+    """Fila MQS ya parseada (como parse_mqs_row) con valores por defecto"""
+    return {
+        'TrackId': track_id or f'T{fecha:%Y%m%d}', 'date': fecha, 'Time': hora, 'ts': combine_ts(fecha, hora),
+        'Station': 'S1', 'NTF': False, 'Test_Val': 0.5, 'Line': 'L1', 'Family': 'FA', 'Model': 'M',
+        'Process': 'P', 'Fixture': 'F', 'Testcode': 'TC1', 'Testcode_Desc': 'desc', 'Fail_Desc': '',
+        'TestTime': 1.0, 'LL': 0.0, 'UL': 1.0, 'Prime': True, **campos,
+    }
+
+
+@override_settings(CACHES=SIN_CACHE, ALLOWED_HOSTS=['testserver'])
+class QueryCountTests(TestCase):
+    """
+    La cantidad de queries de las vistas analíticas y de los listados no
+    depende del volumen de datos (sin N+1 por fila, grupo ni día)
+    """
+    maxDiff = None
+
+    def setUp(self):
+        self.directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directorio)
+        self.client = APIClient()
+        self.hoy = timezone.now().date()
+        self.desde = (self.hoy - timedelta(days=60)).isoformat()
+
+    def cargar(self, dias, por_dia, lineas, familias, estaciones):
+        rutas = generar_fuentes(tempfile.mkdtemp(dir=self.directorio), self.hoy, dias, por_dia,
+                                lineas, familias, estaciones)
+        for importer_class in (MESImporter, MQSImporter, YieldImporter):
+            importer_class(url=rutas[importer_class.source], log=lambda *args: None).run()
+
+    def urls(self):
+        rango = f'date_from={self.desde}&date_to={self.hoy.isoformat()}'
+        return [
+            '/dashboard/?days=30',
+            f'/stats/yield/?{rango}',
+            f'/stats/top-failures/?{rango}',
+            f'/stats/station-performance/?{rango}',
+            f'/stats/yield/rollup/?date={self.hoy.isoformat()}&jornada=Day&turno=1',
+            '/mqs/',
+            '/mes/',
+            '/yield/',
+        ]
+
+    def contar_queries(self):
+        conteos = {}
+        for url in self.urls():
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, f'{url}: {response.content[:200]}')
+            conteos[url] = len(queries)
+        return conteos
+
+    def test_queries_constantes_con_el_volumen(self):
+        self.cargar(dias=2, por_dia=6, lineas=['L1'], familias=['FA'], estaciones=['S1'])
+        esperados = self.contar_queries()
+
+        # Diez veces más días, filas por día y grupos (líneas, familias, estaciones)
+        self.cargar(dias=20, por_dia=60, lineas=['L1', 'L2', 'L3'], familias=['FA', 'FB', 'FC'],
+                    estaciones=['S1', 'S2', 'S3', 'S4'])
+        for url, cantidad in esperados.items():
+            with self.subTest(url=url), self.assertNumQueries(cantidad):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+
+
+@override_settings(CACHES=SIN_CACHE, ALLOWED_HOSTS=['testserver'])
+class ListOrderingTests(TestCase):
+    """
+    `?ordering=` acepta solo columnas indexadas y la paginación por cursor
+    recorre el orden pedido sin saltear ni repetir filas
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        directorio = tempfile.mkdtemp()
+        try:
+            rutas = generar_fuentes(directorio, timezone.now().date(), dias=3, por_dia=9,
+                                    lineas=['L1', 'L2'], familias=['FA'], estaciones=['S1'])
+            MQSImporter(url=rutas['mqs'], log=lambda *args: None).run()
+        finally:
+            shutil.rmtree(directorio)
+
+    def recorrer(self, url):
+        filas = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, response.content[:200])
+            filas += response.json()['results']
+            url = response.json()['next']
+        return filas
+
+    def test_orden_soportado_pagina_completo(self):
+        for ordering in ('ts', '-ts', 'TrackId', '-date', 'date,-TrackId'):
+            with self.subTest(ordering=ordering):
+                filas = self.recorrer(f'/mqs/?ordering={ordering}&page_size=4&fields=TrackId,ts')
+                claves = [(f['TrackId'], f['ts'], f['id']) for f in filas]
+                self.assertEqual(len(filas), 27)
+                self.assertEqual(len(set(claves)), 27)
+                if ordering == 'TrackId':
+                    self.assertEqual([f['TrackId'] for f in filas], sorted(f['TrackId'] for f in filas))
+                if ordering == 'ts':
+                    self.assertEqual([f['ts'] for f in filas], sorted(f['ts'] for f in filas))
+
+    def test_orden_no_indexado_responde_400(self):
+        for ordering in ('Fail_Desc', '-Test_Val', 'ts,Station'):
+            with self.subTest(ordering=ordering):
+                response = self.client.get(f'/mqs/?ordering={ordering}')
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('ordering', response.json())
+
+    def test_cursor_de_otro_orden_es_invalido(self):
+        siguiente = self.client.get('/mqs/?ordering=ts&page_size=4').json()['next']
+        response = self.client.get(siguiente.replace('ordering=ts', 'ordering=-ts'))
+        self.assertEqual(response.status_code, 404)
+
+
+class FailDescDimensionTests(TestCase):
+    """
+    Las descripciones de falla se guardan una vez por md5, sin límite de largo
+    (Postgres no indexa textos de más de ~2.7 kB)
+    """
+
+    def test_descripcion_larga(self):
+        texto = 'sensor fuera de rango; ' * 500
+        fecha = date(2025, 5, 10)
+        MQS.objects.bulk_create(build_mqs([
+            fila_mqs(fecha, 'T1', Fail_Desc=texto),
+            fila_mqs(fecha, 'T2', Fail_Desc=texto),
+            fila_mqs(fecha, 'T3', Fail_Desc='otra'),
+        ]))
+        self.assertEqual(DimFailDesc.objects.count(), 2)
+        self.assertEqual(DimFailDesc.objects.get(md5=DimFailDesc.key_for(texto)).name, texto)
+        self.assertEqual(MQS.objects.with_names('Fail_Desc').get(TrackId='T1').Fail_Desc, texto)
+        self.assertEqual(MQS.objects.filter_names(Fail_Desc=texto).count(), 2)
+
+
+
+def fila_mes(track_id, fecha, hora, codigo):
+    return MES(MODELO='M', NS=track_id, FECHA_REPARACION=fecha, HORA_REPARACION=hora, ts=combine_ts(fecha, hora),
+               FECHA_RECHAZO=fecha, HORA_RECHAZO=hora, POSICION='U1', FUNCION='F', CODIGO_FALLA=codigo,
+               CAUSA='causa', ACCION='acc', ORIGEN='ORI', REPARADOR='rep')
+
+
+class RepairHistoryTests(TestCase):
+    """
+    El historial paginado trae de la base solo offset + limit filas por fuente
+    y cuenta los totales en las mismas dos consultas
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        fecha = date(2025, 5, 10)
+        MQS.objects.bulk_create(build_mqs([
+            fila_mqs(fecha, 'T1', hora=time(8, i), Testcode=f'TC{i}') for i in range(0, 50, 2)
+        ] + [fila_mqs(fecha, 'OTRO')]))
+        MES.objects.bulk_create([fila_mes('T1', fecha, time(8, i), f'C{i}') for i in range(1, 30, 2)])
+
+    def test_paginas_iguales_al_historial_completo(self):
+        completo = get_repair_history_by_trackid('T1')
+        self.assertEqual((completo['total_fallas'], completo['total_reparaciones']), (25, 15))
+        self.assertEqual(len(completo['historial']), 40)
+        self.assertNotIn('ts', completo['historial'][0])
+        horas = [evento['hora'] for evento in completo['historial']]
+        self.assertEqual(horas, sorted(horas))
+
+        for offset, limit in ((0, 10), (10, 10), (35, 10), (40, 5)):
+            with self.subTest(offset=offset, limit=limit):
+                with CaptureQueriesContext(connection) as queries:
+                    pagina = get_repair_history_by_trackid('T1', limit=limit, offset=offset)
+                self.assertEqual(len(queries), 2)
+                self.assertTrue(all('LIMIT' in q['sql'] for q in queries))
+                self.assertEqual(pagina['historial'], completo['historial'][offset:offset + limit])
+                self.assertEqual((pagina['total_fallas'], pagina['total_reparaciones']), (25, 15))
+
+    def test_sin_eventos(self):
+        historial = get_repair_history_by_trackid('NADA', limit=5)
+        self.assertEqual((historial['total_fallas'], historial['total_reparaciones'], historial['historial']),
+                         (0, 0, []))
+
+
+class ImportCommandTests(TestCase):
+    """Los comandos de importación contra archivos CSV locales"""
+
+    def setUp(self):
+        self.directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directorio)
+        self.rutas = generar_fuentes(self.directorio, date(2025, 5, 10), dias=2, por_dia=6,
+                                     lineas=['L1'], familias=['FA'], estaciones=['S1'])
+
+    def importar(self, comando, **opciones):
+        stdout, stderr = io.StringIO(), io.StringIO()
+        call_command(comando, source=self.rutas[COMANDOS[comando]], stdout=stdout, stderr=stderr, **opciones)
+        self.assertEqual(stderr.getvalue(), '')
+        return stdout.getvalue()
+
+    def test_importa_y_reimporta_sin_duplicar(self):
+        esperados = {'import_mqs_csv': (MQS, 12), 'import_mes': (MES, 4), 'import_yield_csv': (YieldTurno, 4)}
+        for comando, (model, cantidad) in esperados.items():
+            with self.subTest(comando=comando):
+                salida = self.importar(comando)
+                self.assertIn(f'Total registros nuevos añadidos: {cantidad}', salida)
+                self.assertEqual(model.objects.count(), cantidad)
+
+                # El mismo archivo otra vez no agrega filas, tampoco forzando el parseo
+                self.importar(comando)
+                self.importar(comando, force=True)
+                self.assertEqual(model.objects.count(), cantidad)
+
+    def test_decode_lines_con_caracter_partido_entre_bloques(self):
+        contenido = 'a,b\n"año\nñandú",€\n'.encode('utf-8')
+        corte = contenido.index('ñ'.encode('utf-8')) + 1  # Entre los dos bytes de la ñ
+        bloques = [contenido[:corte], contenido[corte:corte + 1], contenido[corte + 1:]]
+        lineas = list(decode_lines(bloques))
+        self.assertEqual(''.join(lineas), contenido.decode('utf-8'))
+        self.assertEqual(list(csv.reader(lineas)), [['a', 'b'], ['año\nñandú', '€']])
+
+
+
+class MESImportTests(TestCase):
+    """
+    Las reparaciones se insertan por bloques según su clave natural: las
+    consultas no crecen con las filas y las repetidas se descartan
+    """
+
+    def setUp(self):
+        self.directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directorio)
+
+    def importar(self, hasta, por_dia, repetidas=0):
+        ruta = generar_fuentes(tempfile.mkdtemp(dir=self.directorio), hasta, dias=2, por_dia=por_dia,
+                               lineas=['L1'], familias=['FA'], estaciones=['S1'])['mes']
+        with open(ruta) as f:
+            filas = f.readlines()[1:]
+        with open(ruta, 'a') as f:
+            f.writelines(filas[:repetidas])
+        importer = MESImporter(url=ruta, log=lambda *args: None)
+        with CaptureQueriesContext(connection) as queries:
+            importer.run()
+        return importer.stats, len(queries)
+
+    def test_queries_constantes_y_claves_repetidas(self):
+        stats, pocas = self.importar(date(2025, 5, 10), por_dia=30)
+        self.assertEqual((stats['nuevos'], stats['existentes']), (20, 0))
+
+        # Triple de filas, dentro del límite de parámetros por INSERT de SQLite
+        stats, muchas = self.importar(date(2025, 4, 10), por_dia=90)
+        self.assertEqual(stats['nuevos'], 60)
+        self.assertEqual(muchas, pocas)
+
+        # Mismos días con más filas y algunas repetidas dentro del archivo
+        stats, _ = self.importar(date(2025, 5, 10), por_dia=60, repetidas=5)
+        self.assertEqual((stats['nuevos'], stats['existentes']), (20, 25))
+        self.assertEqual(MES.objects.count(), 100)
+        self.assertEqual(MES.objects.values('NS', 'FECHA_REPARACION', 'HORA_REPARACION', 'CODIGO_FALLA').distinct().count(), 100)
+
+class CheckpointTests(TestCase):
+    """
+    La marca de agua salta el prefijo ya importado, reprocesa todo si ese
+    prefijo cambió y no avanza si hubo errores de escritura
+    """
+
+    def setUp(self):
+        self.directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directorio)
+        self.rutas = self.fuentes(date(2025, 5, 10))
+
+    def fuentes(self, hasta):
+        return generar_fuentes(tempfile.mkdtemp(dir=self.directorio), hasta, dias=2, por_dia=6,
+                               lineas=['L1'], familias=['FA'], estaciones=['S1'])
+
+    def importar(self, importer_class):
+        mensajes = []
+        importer = importer_class(url=self.rutas[importer_class.source],
+                                  log=lambda mensaje, nivel='info': mensajes.append(mensaje))
+        importer.run()
+        return importer, mensajes
+
+    def agregar_filas(self, fuente, hasta):
+        with open(self.fuentes(hasta)[fuente]) as f:
+            nuevas = f.readlines()[1:]
+        with open(self.rutas[fuente], 'a') as f:
+            f.writelines(nuevas)
+        return len(nuevas)
+
+    def test_solo_procesa_las_filas_agregadas(self):
+        self.importar(MQSImporter)
+        agregadas = self.agregar_filas('mqs', date(2025, 5, 12))
+
+        importer, _ = self.importar(MQSImporter)
+        self.assertEqual(importer.cursor.skip, 12)
+        self.assertEqual(importer.stats['candidatas'], agregadas)
+        self.assertEqual(importer.stats['nuevos'], agregadas)
+        self.assertEqual(MQS.objects.count(), 12 + agregadas)
+        self.assertEqual(importer.cursor.checkpoint.last_row_offset, 12 + agregadas)
+
+    def test_editar_una_fila_procesada_reprocesa_todo(self):
+        self.importar(MQSImporter)
+        with open(self.rutas['mqs']) as f:
+            lineas = f.readlines()
+        lineas[2] = lineas[2].replace('falla 1', 'falla editada')
+        with open(self.rutas['mqs'], 'w') as f:
+            f.writelines(lineas)
+        agregadas = self.agregar_filas('mqs', date(2025, 5, 12))
+
+        importer, mensajes = self.importar(MQSImporter)
+        self.assertTrue(any('Reprocesando desde el inicio' in m for m in mensajes))
+        self.assertEqual(importer.stats['candidatas'], 12 + agregadas)
+        self.assertEqual(importer.stats['nuevos'], agregadas)
+        self.assertEqual(importer.cursor.checkpoint.last_row_offset, 12 + agregadas)
+
+    def test_errores_de_escritura_no_avanzan_la_marca(self):
+        with mock.patch('QualitySite.datos.ingest.importers.upsert', side_effect=RuntimeError('sin conexión')):
+            importer, _ = self.importar(YieldImporter)
+        self.assertEqual(importer.stats['errores_escritura'], 4)
+        checkpoint = IngestionCheckpoint.objects.get(source=importer.key)
+        self.assertEqual((checkpoint.last_row_offset, checkpoint.prefix_hash, checkpoint.body_hash), (0, '', ''))
+
+        # La corrida siguiente reintenta todas las filas
+        importer, _ = self.importar(YieldImporter)
+        self.assertEqual(importer.stats['nuevos'], 4)
+        self.assertEqual(YieldTurno.objects.count(), 4)
+        self.assertEqual(IngestionCheckpoint.objects.get(source=importer.key).last_row_offset, 4)
+
+
+
+class PipelineTests(TestCase):
+    """
+    run_pipeline escribe las tres fuentes y registra el ciclo; si una fuente
+    falla, las demás quedan confirmadas
+    """
+
+    def setUp(self):
+        self.directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directorio)
+        self.rutas = generar_fuentes(self.directorio, date(2025, 5, 10), dias=2, por_dia=6,
+                                     lineas=['L1'], familias=['FA'], estaciones=['S1'])
+
+    def correr(self):
+        return run_pipeline(urls=self.rutas, log=lambda *args: None)
+
+    def test_ciclo_completo(self):
+        run = self.correr()
+        self.assertEqual((run.status, run.errors), ('ok', ''))
+        self.assertEqual({source: filas['nuevos'] for source, filas in run.rows.items()}, {'mes': 4, 'mqs': 12, 'yield': 4})
+        self.assertEqual((MES.objects.count(), MQS.objects.count(), YieldTurno.objects.count()), (4, 12, 4))
+        self.assertEqual(set(run.timings), {'mes', 'mqs', 'yield', 'rollups'})
+        self.assertTrue(all({'fetch', 'parse', 'write'} <= set(run.timings[s]) for s in ('mes', 'mqs', 'yield')))
+        self.assertIsNotNone(run.finished_at)
+        self.assertEqual(IngestionRun.objects.get(), run)
+        self.assertEqual(StationDailyStats.objects.values('date').distinct().count(), 2)
+
+        # Sin cambios en los archivos: nada que escribir
+        run = self.correr()
+        self.assertEqual(run.status, 'ok')
+        self.assertEqual((MES.objects.count(), MQS.objects.count(), YieldTurno.objects.count()), (4, 12, 4))
+
+    def test_falla_de_una_fuente_no_frena_las_demas(self):
+        with mock.patch.object(MQSImporter, 'parse', side_effect=RuntimeError('CSV ilegible')):
+            run = self.correr()
+        self.assertEqual(run.status, 'error')
+        self.assertEqual(run.errors, 'mqs: CSV ilegible')
+        self.assertEqual((MES.objects.count(), MQS.objects.count(), YieldTurno.objects.count()), (4, 0, 4))
+        marcas = dict(IngestionCheckpoint.objects.values_list('source', 'last_row_offset'))
+        self.assertEqual(marcas, {f'mes:{self.rutas["mes"]}': 4, f'mqs:{self.rutas["mqs"]}': 0,
+                                  f'yield:{self.rutas["yield"]}': 4})
+
+        # La corrida siguiente importa solo la fuente que había fallado
+        run = self.correr()
+        self.assertEqual(run.status, 'ok')
+        self.assertEqual({source: filas.get('nuevos', 0) for source, filas in run.rows.items()},
+                         {'mes': 0, 'mqs': 12, 'yield': 0})
+        self.assertEqual(MQS.objects.count(), 12)
+
+
+class SchedulerLockTests(TestCase):
+    """
+    Los jobs solo corren mientras el proceso conserva el lock del scheduler;
+    al perderlo el scheduler se detiene
+    """
+
+    def setUp(self):
+        self.addCleanup(setattr, jobs, '_scheduler_lock', None)
+        self.job = mock.Mock(__name__='job_de_prueba', return_value='hecho')
+        self.protegido = jobs.requires_scheduler_lock(self.job)
+
+    def test_sin_lock_configurado_el_job_corre(self):
+        jobs._scheduler_lock = None
+        self.assertEqual(self.protegido(1, clave=2), 'hecho')
+        self.job.assert_called_once_with(1, clave=2)
+
+    def test_lock_vigente_y_perdido(self):
+        lock = mock.Mock()
+        scheduler = mock.MagicMock()
+        jobs.build_scheduler(scheduler_class=lambda: scheduler, lock=lock)
+        detener_si_perdio_el_lock = scheduler.add_listener.call_args.args[0]
+
+        lock.held.return_value = True
+        self.assertEqual(self.protegido(), 'hecho')
+
+        lock.held.return_value = False
+        with self.assertRaises(jobs.SchedulerLockLost) as contexto:
+            self.protegido()
+        self.assertEqual(self.job.call_count, 1)
+        self.assertEqual(lock.held.call_count, 2)
+
+        # El listener de errores detiene el scheduler solo por la pérdida del lock
+        detener_si_perdio_el_lock(mock.Mock(exception=RuntimeError('otro error')))
+        scheduler.shutdown.assert_not_called()
+        detener_si_perdio_el_lock(mock.Mock(exception=contexto.exception))
+        scheduler.shutdown.assert_called_once_with(wait=False)
+
+    def test_run_scheduler_sale_si_otra_instancia_tiene_el_lock(self):
+        stderr = io.StringIO()
+        with mock.patch('QualitySite.datos.management.commands.run_scheduler.SessionLock') as session_lock, \
+                mock.patch('QualitySite.datos.management.commands.run_scheduler.build_scheduler') as build:
+            session_lock.return_value.__enter__.return_value = False
+            call_command('run_scheduler', stdout=io.StringIO(), stderr=stderr)
+        build.assert_not_called()
+        self.assertIn('Otra instancia del scheduler ya está corriendo', stderr.getvalue())
+
+
+class TimestampTests(TestCase):
+    """
+    ts es siempre la fecha + hora de cada fila, al importar y al calcularla
+    en la migración 0012
+    """
+
+    def setUp(self):
+        directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directorio)
+        rutas = generar_fuentes(directorio, date(2025, 5, 10), dias=2, por_dia=90, lineas=['L1'], familias=['FA'],
+                                estaciones=['S1'])
+        for importer_class in (MESImporter, MQSImporter):
+            importer_class(url=rutas[importer_class.source], log=lambda *args: None).run()
+        MQS.objects.bulk_create(build_mqs([
+            fila_mqs(date(2024, 12, 31), 'BORDE1', hora=time(23, 59, 59)),
+            fila_mqs(date(2025, 1, 1), 'BORDE2', hora=time(0, 0)),
+        ]))
+
+    def assertTsCoincide(self):
+        for model, fecha, hora in ((MQS, 'date', 'Time'), (MES, 'FECHA_REPARACION', 'HORA_REPARACION')):
+            filas = list(model.objects.values_list('ts', fecha, hora))
+            self.assertGreater(len(filas), 2)
+            for ts, dia, momento in filas:
+                with self.subTest(model=model.__name__, fecha=dia, hora=momento):
+                    self.assertEqual(ts, combine_ts(dia, momento))
+
+    def test_importacion(self):
+        self.assertTsCoincide()
+
+    def test_migracion(self):
+        calcular_ts = importlib.import_module('QualitySite.datos.migrations.0012_timestamps').calcular_ts
+        MQS.objects.update(ts=timezone.now())
+        MES.objects.update(ts=timezone.now())
+        calcular_ts(django_apps, None)
+        self.assertTsCoincide()
+
+    def test_sin_hora_es_medianoche(self):
+        self.assertEqual(combine_ts(date(2025, 5, 10), None), combine_ts(date(2025, 5, 10), time.min))
+
+class ParallelParseTests(unittest.TestCase):
+    """
+    El parseo paralelo por rangos de bytes y los conversores rápidos dan lo
+    mismo que el parseo secuencial y strptime
+    """
+
+    def setUp(self):
+        self.directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directorio)
+        self.ruta = os.path.join(self.directorio, 'mqs.csv')
+        with open(self.ruta, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(MQSImporter.expected_headers)
+            for i in range(120):
+                # Descripciones con saltos de línea y comillas para que los cortes caigan dentro de campos
+                descripcion = '\n'.join(f'línea "{j}" año' for j in range(i % 4 + 1))
+                fecha = 'fecha mala' if i == 57 else f'2025-05-{i % 28 + 1:02d}'
+                writer.writerow(['x', 1, fecha, f'{i % 24:02d}:{i % 60:02d}:00', 'L1', 'FA', 'M', 'P', 'S1', 'F',
+                                 f'T{i:04d}', 'N', 'Y', f'TC{i % 7}', 'desc, con coma', descripcion, 1, i, 0, 9])
+
+    def secuencial(self):
+        filas, errores = [], []
+        with open(self.ruta, encoding='utf-8-sig', newline='') as f:
+            for index, row in enumerate(csv.DictReader(f)):
+                try:
+                    filas.append(parse_mqs_values(row))
+                except ValueError as e:
+                    errores.append(f"{e} en fila {index + 1}")
+        return filas, errores
+
+    @staticmethod
+    def juntar(bloques):
+        filas, errores = [], []
+        for filas_bloque, errores_bloque in bloques:
+            filas.extend(filas_bloque)
+            errores.extend(errores_bloque)
+        return filas, errores
+
+    def test_rangos_con_saltos_de_linea_entre_comillas(self):
+        esperado = self.secuencial()
+        self.assertEqual(len(esperado[0]), 119)
+        self.assertEqual(esperado[1], ['Error en formato de fecha: fecha mala en fila 58'])
+
+        with open(self.ruta, 'rb') as f:
+            contenido = f.read()
+        inicio_datos = contenido.index(b'\n') + 1
+        cortes_entre_comillas = 0
+
+        with mock.patch.object(parallel, 'MIN_RANGE_SIZE', 1), mock.patch.object(parallel, 'SCAN_SIZE', 7):
+            for partes in range(1, 60):
+                with self.subTest(partes=partes):
+                    fieldnames, rangos = parallel.split_ranges(self.ruta, partes)
+                    self.assertEqual(fieldnames, MQSImporter.expected_headers)
+                    # Rangos contiguos que cubren todo el archivo
+                    self.assertEqual([inicio for inicio, _ in rangos], [inicio_datos] + [fin for _, fin in rangos[:-1]])
+                    self.assertEqual(rangos[-1][1], len(contenido))
+                    objetivo = inicio_datos + (len(contenido) - inicio_datos) // partes
+                    cortes_entre_comillas += contenido[:objetivo].count(b'"') % 2
+                    filas = [fila for rango in rangos for fila in parallel.parse_mqs_range(self.ruta, *rango, fieldnames)[0]]
+                    self.assertEqual(filas, esperado[0])
+
+            for workers in (2, 3):
+                with self.subTest(workers=workers):
+                    self.assertEqual(self.juntar(parallel.parse_file_parallel(self.ruta, workers)), esperado)
+        self.assertGreater(cortes_entre_comillas, 0)
+
+    def test_conversores_rapidos_iguales_a_strptime(self):
+        def resultado(funcion, valor):
+            try:
+                return funcion(valor)
+            except ValueError as e:
+                return type(e), str(e)
+
+        dias = [date(1999, 12, 1) + timedelta(days=n) for n in range(0, 12000, 7)]
+        horas = [time(s // 3600, s // 60 % 60, s % 60) for s in range(0, 86400, 61)]
+        casos = {
+            (parse_date_ymd, '%Y-%m-%d'): [d.isoformat() for d in dias] + [
+                '2024-02-29', '2025-02-29', '2025-13-01', '2025-5-1', '2025-05-1x', '2025/05/01', '', ' 2025-05-01',
+            ],
+            (parse_date_dmy, '%d/%m/%Y'): [f'{d:%d/%m/%Y}' for d in dias] + [
+                '29/02/2024', '29/02/2025', '31/04/2025', '1/5/2025', '01-05-2025', '',
+            ],
+            (parse_time_hms, '%H:%M:%S'): [f'{h:%H:%M:%S}' for h in horas] + [
+                '24:00:00', '23:60:00', '1:02:03', '01:02', '01:02:03.5', '+1:02:03', '',
+            ],
+            (parse_time_hm, '%H:%M'): [f'{h:%H:%M}' for h in horas] + ['24:00', '9:05', '09:5', '09:05:00', ''],
+        }
+        for (funcion, formato), valores in casos.items():
+            def con_strptime(valor):
+                valor = datetime.strptime(valor, formato)
+                return valor.time() if '%H' in formato else valor.date()
+
+            for valor in valores:
+                with self.subTest(funcion=funcion.__name__, valor=valor):
+                    esperado = resultado(con_strptime, valor)
+                    self.assertEqual(resultado(funcion.__wrapped__, valor), esperado)
+                    self.assertEqual(resultado(funcion, valor), esperado)
+
+
+class RollupEquivalenceTests(TestCase):
+    """
+    Los resúmenes diarios de MQS coinciden con agregar MQS directamente después
+    de importar, de reconstruirlos y de reimportar el mismo día
+    """
+
+    def setUp(self):
+        self.directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directorio)
+        self.hasta = date(2025, 5, 10)
+
+    def importar(self, por_dia, force=False):
+        rutas = generar_fuentes(tempfile.mkdtemp(dir=self.directorio), self.hasta, dias=3, por_dia=por_dia,
+                                lineas=['L1', 'L2'], familias=['FA', 'FB', 'FC'], estaciones=['S1', 'S2', 'S3'])
+        MQSImporter(url=rutas['mqs'], force=force, log=lambda *args: None).run()
+        return rutas
+
+    def assertEstacionesEquivalentes(self):
+        esperado = MQS.objects.with_names('Line', 'Family', 'Station').values('date', 'Line', 'Family', 'Station').annotate(
+            total_tests=Count('id'), failures=Count('id', filter=Q(Prime=True)), ntf_count=Count('id', filter=Q(NTF=True)),
+        )
+        self.assertCountEqual(
+            StationDailyStats.objects.values_list('date', 'line', 'family', 'station', 'total_tests', 'failures', 'ntf_count'),
+            [tuple(f.values()) for f in esperado],
+        )
+
+    def assertTestcodesEquivalentes(self):
+        esperado = MQS.objects.filter(Prime=True).with_names('Line', 'Family', 'Testcode').values(
+            'date', 'Line', 'Family', 'Testcode',
+        ).annotate(n=Count('id'))
+        self.assertCountEqual(
+            TestcodeDailyStats.objects.values_list('date', 'line', 'family', 'testcode', 'failure_count'),
+            [tuple(f.values()) for f in esperado],
+        )
+
+    def etapas(self, rebuild):
+        """Importa, opcionalmente reconstruye, y reimporta los mismos días; genera el nombre de cada etapa"""
+        self.importar(por_dia=30)
+        self.assertEqual(StationDailyStats.objects.values('date').distinct().count(), 3)
+        yield 'importación'
+        if rebuild:
+            call_command('rebuild_rollups', stdout=io.StringIO())
+            yield 'rebuild_rollups'
+        # Los mismos días otra vez, sin filas nuevas y luego con filas agregadas
+        self.importar(por_dia=30, force=True)
+        self.assertEqual(MQS.objects.count(), 90)
+        yield 'reimportación'
+        self.importar(por_dia=45)
+        self.assertEqual(MQS.objects.count(), 135)
+        yield 'reimportación con filas nuevas'
+
+    def test_estaciones(self):
+        # _refresh_stations recalcula cada fecha tocada
+        for etapa in self.etapas(rebuild=True):
+            with self.subTest(etapa):
+                self.assertEstacionesEquivalentes()
+
+    def test_contadores_incrementales_de_testcodes(self):
+        # record_testcode_failures suma solo las filas realmente insertadas
+        for etapa in self.etapas(rebuild=False):
+            with self.subTest(etapa):
+                self.assertTestcodesEquivalentes()
+
+    def test_testcodes_reconstruidos(self):
+        # _refresh_testcodes reemplaza los contadores y los incrementos siguientes parten de ahí
+        for etapa in self.etapas(rebuild=True):
+            with self.subTest(etapa):
+                self.assertTestcodesEquivalentes()
+
+def indices_usados(queryset):
+    """
+    Índices que usa el plan de un queryset; en una tabla particionada se
+    agrega el índice padre del que hereda cada índice de partición
+    """
+    plan = queryset.explain()
+    nombres = set(re.findall(r'(?:Index Scan|Index Only Scan|Bitmap Index Scan)(?: Backward)? (?:using|on) "?(\w+)"?', plan))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT p.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE c.relname = ANY(%s)",
+            [list(nombres)],
+        )
+        nombres.update(fila[0] for fila in cursor.fetchall())
+    return nombres, plan
+
+
+def nombre_indice(model, fields):
+    """Nombre del índice de Meta.indexes o de la columna con db_index"""
+    for index in model._meta.indexes:
+        if list(index.fields) == list(fields):
+            return index.name
+    with connection.cursor() as cursor:
+        constraints = connection.introspection.get_constraints(cursor, model._meta.db_table)
+    columnas = [model._meta.get_field(f).column for f in fields]
+    return next(nombre for nombre, info in constraints.items() if info['index'] and info['columns'] == columnas)
+
+
+@unittest.skipUnless(connection.vendor == 'postgresql', 'EXPLAIN de índices solo en Postgres')
+class IndexUsageTests(TestCase):
+    """
+    Los filtros y órdenes de las consultas calientes usan el índice pensado
+    para ellos (con seq scan deshabilitado: en tablas de prueba chicas el
+    planner preferiría recorrerlas enteras)
+    """
+
+    def setUp(self):
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+
+    def casos(self):
+        desde, hasta = date(2025, 5, 1), date(2025, 5, 31)
+        prime = MQS.objects.filter(Prime=True)
+        return [
+            ('listado MQS por ts', MQS.objects.filter(ts__gte=desde).order_by('-ts', '-id')[:100],
+             [nombre_indice(MQS, ['ts'])]),
+            ('historial por TrackId', MQS.objects.filter(TrackId='T1'), [nombre_indice(MQS, ['TrackId'])]),
+            ('MQS por fecha/línea/familia',
+             MQS.objects.filter(date__range=(desde, hasta)).filter_names(Line='L1', Family='FA')
+             .values('process_dim').annotate(n=Count('id')),
+             ['mqs_date_line_fam_proc_idx']),
+            ('testcodes por día', prime.filter(date=desde).values('family_dim', 'testcode_dim').annotate(n=Count('id')),
+             ['mqs_prime_date_fam_tc_idx']),
+            ('fallas prime por familia', prime.filter_names(Family='FA').filter(date__gte=desde).values('date'),
+             ['mqs_prime_family_date_idx', 'mqs_prime_date_fam_tc_idx']),
+            ('reparaciones por NS', MES.objects.filter(NS='T1'), ['mes_ns_idx']),
+            ('listado MES por ts', MES.objects.filter(ts__gte=desde).order_by('-ts', '-id')[:100], ['mes_ts_idx']),
+            ('yield por fecha/línea/familia', YieldTurno.objects.filter(date__range=(desde, hasta), Line='L1', Family='FA'),
+             ['yield_date_line_family_idx']),
+            ('listado Yield por fecha', YieldTurno.objects.filter(date__gte=desde).order_by('-date', '-id')[:100],
+             ['yield_date_id_idx']),
+        ]
+
+    def test_consultas_calientes_usan_su_indice(self):
+        for descripcion, queryset, esperados in self.casos():
+            with self.subTest(descripcion):
+                usados, plan = indices_usados(queryset)
+                self.assertTrue(usados & set(esperados), f"Se esperaba {esperados}; plan:\n{plan}")
+
+
+class PartitionPlanningTests(unittest.TestCase):
+    """Cálculo de meses y nombres de particiones (sin base de datos)"""
+
+    def test_add_months(self):
+        self.assertEqual(add_months(date(2025, 5, 20), 0), date(2025, 5, 1))
+        self.assertEqual(add_months(date(2025, 11, 1), 2), date(2026, 1, 1))
+        self.assertEqual(add_months(date(2025, 1, 31), -1), date(2024, 12, 1))
+        self.assertEqual(add_months(date(2025, 3, 1), -15), date(2023, 12, 1))
+        self.assertEqual(add_months(date(2025, 3, 1), 24), date(2027, 3, 1))
+
+    def test_nombres(self):
+        self.assertEqual(partition_name('quality_mqs', date(2025, 5, 17)), 'quality_mqs_p2025_05')
+        self.assertEqual(partition_name('quality_mqs', date(987, 12, 1)), 'quality_mqs_p0987_12')
+        self.assertEqual(default_partition_name('quality_mqs'), 'quality_mqs_default')
+
+    def test_meses_a_asegurar(self):
+        self.assertEqual(months_to_ensure(3, today=date(2025, 11, 15)),
+                         [date(2025, 11, 1), date(2025, 12, 1), date(2026, 1, 1), date(2026, 2, 1)])
+        self.assertEqual(months_to_ensure(0, today=date(2025, 5, 31)), [date(2025, 5, 1)])
+
+    def test_ensure_partitions_crea_solo_las_que_faltan(self):
+        existentes = {date(2025, 12, 1)}
+        with mock.patch.object(partitions, 'is_partitioned', return_value=True), \
+                mock.patch.object(partitions, 'create_partition',
+                                  side_effect=lambda table, mes: mes not in existentes) as crear:
+            creadas = ensure_partitions('quality_mqs', months_ahead=2, today=date(2025, 11, 3))
+        self.assertEqual(creadas, ['quality_mqs_p2025_11', 'quality_mqs_p2026_01'])
+        self.assertEqual([c.args[1] for c in crear.call_args_list],
+                         [date(2025, 11, 1), date(2025, 12, 1), date(2026, 1, 1)])
+
+    def test_ensure_partitions_sin_particionado_no_hace_nada(self):
+        with mock.patch.object(partitions, 'is_partitioned', return_value=False), \
+                mock.patch.object(partitions, 'create_partition') as crear:
+            self.assertEqual(ensure_partitions('quality_mqs'), [])
+        crear.assert_not_called()
+
+
+@unittest.skipUnless(connection.vendor == 'postgresql', 'particionado solo en Postgres')
+class PartitionPruningTests(TestCase):
+    """
+    Las consultas acotadas a un mes recorren una sola partición y las filas de
+    un mes sin partición caen en la DEFAULT hasta que create_partition las mueve
+    """
+    tabla = MQS._meta.db_table
+
+    def insertar(self, fecha):
+        obj, = build_mqs([fila_mqs(fecha)])
+        obj.save()
+        # Las FKs son diferidas: sin verificarlas ahora, el ATTACH PARTITION de
+        # create_partition fallaría por eventos de triggers pendientes
+        connection.check_constraints()
+        return obj
+
+    def filas_en(self, particion):
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT COUNT(*) FROM {connection.ops.quote_name(particion)}")
+            return cursor.fetchone()[0]
+
+    def del_mes(self, mes):
+        return MQS.objects.filter(date__gte=mes, date__lt=add_months(mes, 1))
+
+    def test_consulta_de_un_mes_recorre_una_particion(self):
+        mes = month_start(date.today())
+        create_partition(self.tabla, mes)
+        self.insertar(mes)
+        self.assertEqual(scanned_partitions(self.del_mes(mes)), [partition_name(self.tabla, mes)])
+        self.assertEqual(
+            scanned_partitions(MQS.objects.filter(date__range=(mes + timedelta(days=1), mes + timedelta(days=9)))),
+            [partition_name(self.tabla, mes)],
+        )
+
+    def test_mes_sin_particion_cae_en_la_default_hasta_crearla(self):
+        mes = date(2001, 1, 1)
+        nombre = partition_name(self.tabla, mes)
+        default = default_partition_name(self.tabla)
+        self.assertNotIn(nombre, {n for _, n in list_partitions(self.tabla)})
+
+        obj = self.insertar(mes + timedelta(days=14))
+        self.assertEqual(self.filas_en(default), 1)
+        self.assertEqual(scanned_partitions(self.del_mes(mes)), [default])
+
+        self.assertTrue(create_partition(self.tabla, mes))
+        self.assertEqual(self.filas_en(default), 0)
+        self.assertEqual(self.filas_en(nombre), 1)
+        self.assertEqual(scanned_partitions(self.del_mes(mes)), [nombre])
+        self.assertTrue(MQS.objects.filter(pk=obj.pk, date=obj.date).exists())
+
+
+class RespuestaFalsa:
+    """Respuesta de requests.get con el cuerpo en bloques y sin validadores HTTP (como Google Sheets)"""
+    status_code = 200
+    headers = {}
+
+    def __init__(self, cuerpo, bloque=1000):
+        self.bloques = [cuerpo[i:i + bloque] for i in range(0, len(cuerpo), bloque)]
+
+    def iter_content(self, chunk_size=None):
+        return iter(self.bloques)
+
+    def raise_for_status(self):
+        pass
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class RemoteFetchTests(TestCase):
+    """
+    Una fuente remota sin ETag ni Last-Modified con el mismo cuerpo que la
+    última importación se descarta por hash antes de parsear
+    """
+    url = 'https://example.test/mqs.csv'
+
+    def setUp(self):
+        directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directorio)
+        rutas = generar_fuentes(directorio, date(2025, 5, 10), dias=2, por_dia=5,
+                                lineas=['L1'], familias=['FA'], estaciones=['S1'])
+        with open(rutas['mqs'], 'rb') as f:
+            self.cuerpo = f.read()
+
+    def importar(self, cuerpo):
+        importer = MQSImporter(url=self.url, log=lambda *args: None)
+        with mock.patch.object(fetch.requests, 'get', return_value=RespuestaFalsa(cuerpo)) as get, \
+                mock.patch.object(MQSImporter, 'parse', autospec=True, side_effect=MQSImporter.parse) as parse:
+            cambio = importer.run()
+        get.assert_called_once()
+        return cambio, importer, parse
+
+    def test_cuerpo_sin_cambios_no_se_parsea(self):
+        cambio, _, _ = self.importar(self.cuerpo)
+        self.assertTrue(cambio)
+        self.assertEqual(MQS.objects.count(), 10)
+
+        cambio, importer, parse = self.importar(self.cuerpo)
+        self.assertFalse(cambio)
+        self.assertEqual(importer.fetched.reason, 'hash')
+        parse.assert_not_called()
+        self.assertEqual(MQS.objects.count(), 10)
+
+    def test_cuerpo_modificado_se_importa(self):
+        self.importar(self.cuerpo)
+        fila = b'x,1,2025-05-11,10:00:00,L1,FA,M,P,S1,F,TNUEVO,N,Y,TC1,desc TC1,falla,1,1,0,9\r\n'
+        cambio, importer, parse = self.importar(self.cuerpo + fila)
+        self.assertTrue(cambio)
+        parse.assert_called()
+        self.assertEqual(importer.stats['nuevos'], 1)
+        self.assertEqual(MQS.objects.count(), 11)
+
+
+class HiloInmediato:
+    """Reemplazo de threading.Thread que ejecuta la exportación al llamar start()"""
+    def __init__(self, target, args=(), **kwargs):
+        self.args = args
+
+    def start(self):
+        exports.run_export(*self.args)
+
+
+@unittest.skipIf(exports.pa is None, 'requiere pyarrow')
+@override_settings(CACHES=SIN_CACHE, ALLOWED_HOSTS=['testserver'])
+class ParquetExportTests(TestCase):
+    """
+    POST /exports/<dataset>/ no exporta dentro del request: encola la
+    exportación y responde 202 con la URL de su estado
+    """
+
+    def setUp(self):
+        directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directorio)
+        ajustes = override_settings(PARQUET_EXPORT_ROOT=directorio)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        rutas = generar_fuentes(directorio, timezone.now().date(), dias=2, por_dia=5,
+                                lineas=['L1'], familias=['FA'], estaciones=['S1'])
+        MQSImporter(url=rutas['mqs'], log=lambda *args: None).run()
+
+    def test_post_encola_y_responde_202(self):
+        with mock.patch.object(exports.threading, 'Thread') as thread:
+            response = self.client.post('/exports/mqs/')
+        self.assertEqual(response.status_code, 202)
+        run = ExportRun.objects.get()
+        self.assertEqual(response['Location'], f'/exports/mqs/runs/{run.pk}/')
+        self.assertEqual(run.status, 'running')
+        thread.return_value.start.assert_called_once()
+
+        # Una segunda solicitud reutiliza la exportación en curso
+        with mock.patch.object(exports.threading, 'Thread') as thread:
+            response = self.client.post('/exports/mqs/')
+        self.assertEqual(response.json()['run'], run.pk)
+        thread.assert_not_called()
+
+    def test_estado_de_la_exportacion(self):
+        with mock.patch.object(exports.threading, 'Thread', HiloInmediato):
+            location = self.client.post('/exports/mqs/')['Location']
+        estado = self.client.get(location).json()
+        self.assertEqual(estado['status'], 'ok')
+        self.assertEqual(sum(p['rows'] for p in estado['written']), 10)
+        self.assertEqual(self.client.get(location.replace('/mqs/', '/mes/')).status_code, 404)
+
+
+@override_settings(CACHES=SIN_CACHE, ALLOWED_HOSTS=['testserver'])
+class YieldRollupViewTests(TestCase):
+    """
+    El rollup de Yield solo acepta las combinaciones de jornada/turno que
+    existen en YieldDailyRollup
+    """
+
+    def test_combinaciones_validas(self):
+        for query in ('', 'jornada=ALL&turno=ALL', 'jornada=Day', 'jornada=Night&turno=ALL', 'jornada=Day&turno=1',
+                      'jornada=Night&turno=3'):
+            with self.subTest(query=query):
+                response = self.client.get(f'/stats/yield/rollup/?date=2025-05-10&{query}')
+                self.assertEqual(response.status_code, 200, response.content[:200])
+
+    def test_combinaciones_invalidas_dan_400(self):
+        for query in ('turno=1', 'jornada=ALL&turno=2', 'jornada=Morning', 'jornada=day', 'jornada=Day&turno=4',
+                      'jornada=Night&turno='):
+            with self.subTest(query=query):
+                response = self.client.get(f'/stats/yield/rollup/?date=2025-05-10&{query}')
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('jornada', response.json()['error'])
+
+
+
+class YieldWindowTests(TestCase):
+    """
+    Las ventanas sobre acumulados de Yield coinciden con sumar YieldTurno aunque
+    los días se importen desordenados o se corrijan después
+    """
+
+    def setUp(self):
+        self.directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directorio)
+        self.inicio = date(2025, 5, 1)
+
+    def importar_dia(self, dia, escala=1):
+        fecha = self.inicio + timedelta(days=dia)
+        ruta = os.path.join(tempfile.mkdtemp(dir=self.directorio), 'yield.csv')
+        with open(ruta, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(YIELD_HEADERS)
+            for linea in ('L1', 'L2'):
+                for jornada, turno in (('Day', '1'), ('Day', '2'), ('Night', '3')):
+                    base = escala * (dia + 1) * (2 if linea == 'L2' else 1) + int(turno)
+                    writer.writerow([f'{linea}{turno}', fecha.isoformat(), jornada, turno, linea, 'FA', 'P',
+                                     10 * base, base, 11 * base, base % 4, base % 5])
+        YieldImporter(url=ruta, log=lambda *args: None).run()
+
+    def assertVentanasEquivalentes(self, dias):
+        for jornada, turno in ((ALL, ALL), ('Day', ALL), ('Day', '1'), ('Day', '2'), ('Night', ALL), ('Night', '3')):
+            filtros = {k: v for k, v in (('Jornada', jornada), ('Turno', turno)) if v != ALL}
+            for a in range(dias):
+                for b in range(a, dias):
+                    desde, hasta = self.inicio + timedelta(days=a), self.inicio + timedelta(days=b)
+                    with self.subTest(jornada=jornada, turno=turno, desde=desde, hasta=hasta):
+                        esperado = YieldTurno.objects.filter(date__range=(desde, hasta), **filtros).aggregate(
+                            total_units=Sum('Prime_Handle'), pass_units=Sum('Prime_Pass'), fail_units=Sum('Prime_Fail'),
+                            ntf_units=Sum('Prime_NTF_Count'), defect_units=Sum('Prime_Defect_Count'),
+                        )
+                        ventana = get_yield_window(desde, hasta, jornada, turno)
+                        self.assertEqual({k: ventana[k] for k in esperado}, {k: v or 0 for k, v in esperado.items()})
+
+    def test_dias_desordenados_y_corregidos(self):
+        for dia in (4, 1, 3, 0, 2):
+            self.importar_dia(dia)
+        self.assertVentanasEquivalentes(5)
+
+        # Corregir un día intermedio corre la diferencia sobre los acumulados posteriores
+        self.importar_dia(2, escala=3)
+        self.assertEqual(YieldTurno.objects.count(), 30)
+        self.assertVentanasEquivalentes(5)
+
+
+@override_settings(CACHES=CACHE_LOCAL, ALLOWED_HOSTS=['testserver'])
+class AnalyticsCacheTests(TestCase):
+    """
+    Una importación invalida la caché de los meses que toca: la respuesta
+    siguiente trae los datos nuevos con otro ETag
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directorio)
+        self.importar(date(2025, 5, 10))
+        self.url = '/stats/top-failures/?date_from=2025-05-01&date_to=2025-05-31'
+        self.otro_mes = '/stats/top-failures/?date_from=2025-04-01&date_to=2025-04-30'
+
+    def importar(self, fecha):
+        rutas = generar_fuentes(tempfile.mkdtemp(dir=self.directorio), fecha, dias=1, por_dia=30,
+                                lineas=['L1'], familias=['FA'], estaciones=['S1'])
+        MQSImporter(url=rutas['mqs'], log=lambda *args: None).run()
+
+    def test_importar_cambia_datos_y_etag(self):
+        antes = self.client.get(self.url)
+        etag = antes.headers['ETag']
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        etag_otro_mes = self.client.get(self.otro_mes).headers['ETag']
+
+        self.importar(date(2025, 5, 11))
+
+        despues = self.client.get(self.url)
+        self.assertEqual(despues.status_code, 200)
+        self.assertNotEqual(despues.json(), antes.json())
+        self.assertEqual(sum(f['failure_count'] for f in despues.json()), 2 * sum(f['failure_count'] for f in antes.json()))
+        self.assertNotEqual(despues.headers['ETag'], etag)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=despues.headers['ETag']).status_code, 304)
+
+        # Un mes que la importación no tocó se sigue sirviendo desde la caché
+        with self.assertNumQueries(0):
+            response = self.client.get(self.otro_mes, HTTP_IF_NONE_MATCH=etag_otro_mes)
+        self.assertEqual(response.status_code, 304)
+
+
+@override_settings(CACHES=SIN_CACHE, ALLOWED_HOSTS=['testserver'])
+class AsyncViewTests(TransactionTestCase):
+    """
+    Cada ruta async responde lo mismo que su versión síncrona y valida los
+    parámetros enteros con 400. TransactionTestCase: las consultas corren en
+    hilos con su propia conexión y tienen que ver las filas importadas.
+    """
+
+    def setUp(self):
+        # Las importaciones confirmadas cachean IDs de dimensión que el flush entre tests borra
+        dimension_cache.clear()
+        self.addCleanup(dimension_cache.clear)
+        directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directorio)
+        self.hoy = timezone.now().date()
+        rutas = generar_fuentes(directorio, self.hoy, dias=3, por_dia=30, lineas=['L1', 'L2'], familias=['FA'],
+                                estaciones=['S1', 'S2'])
+        for importer_class in (MESImporter, MQSImporter, YieldImporter):
+            importer_class(url=rutas[importer_class.source], log=lambda *args: None).run()
+        self.rango = f'date_from={(self.hoy - timedelta(days=7)).isoformat()}&date_to={self.hoy.isoformat()}'
+
+    async def test_mismas_respuestas_que_las_vistas_sincronas(self):
+        for url in ('dashboard/?days=7', f'stats/yield/?{self.rango}', f'stats/top-failures/?{self.rango}&limit=3',
+                    f'stats/station-performance/?{self.rango}&line=L1'):
+            with self.subTest(url=url):
+                response = await self.async_client.get(f'/async/{url}')
+                self.assertEqual(response.status_code, 200, response.content[:200])
+                sincrona = await sync_to_async(self.client.get)(f'/{url}')
+                self.assertEqual(response.json(), sincrona.json())
+                self.assertEqual(response.headers['ETag'], sincrona.headers['ETag'])
+                self.assertTrue(response.json())
+
+    async def test_parametros_invalidos_dan_400(self):
+        urls = ['dashboard/?days=x', 'dashboard/?days=0', 'dashboard/?days=99999999',
+                f'stats/top-failures/?{self.rango}&limit=x', f'stats/top-failures/?{self.rango}&limit=-1',
+                'stats/yield/', 'stats/station-performance/?date_from=2025-05-01']
+        for url in urls:
+            with self.subTest(url=url):
+                response = await self.async_client.get(f'/async/{url}')
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('error', response.json())
+                sincrona = await sync_to_async(self.client.get)(f'/{url}')
+                self.assertEqual(sincrona.status_code, 400)
+
+@unittest.skipIf(spc_queries.np is None, 'requiere numpy')
+@override_settings(CACHES=CACHE_LOCAL, ALLOWED_HOSTS=['testserver'])
+class SPCViewTests(TestCase):
+    """
+    El resultado SPC se cachea por filtros: otro `limit` no vuelve a leer las
+    mediciones de MQS. `limit` se valida como entero positivo acotado.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        directorio = tempfile.mkdtemp()
+        try:
+            rutas = generar_fuentes(directorio, timezone.now().date(), dias=3, por_dia=40,
+                                    lineas=['L1'], familias=['FA'], estaciones=['S1', 'S2'])
+            MQSImporter(url=rutas['mqs'], log=lambda *args: None).run()
+        finally:
+            shutil.rmtree(directorio)
+
+    def setUp(self):
+        cache.clear()
+        hoy = timezone.now().date()
+        self.url = f'/stats/spc/?date_from={(hoy - timedelta(days=7)).isoformat()}&date_to={hoy.isoformat()}&min_samples=3'
+
+    def test_otro_limit_no_relee_mediciones(self):
+        self.assertEqual(len(self.client.get(f'{self.url}&limit=3').json()), 3)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(f'{self.url}&limit=100')
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(len(response.json()), 3)
+        self.assertFalse([q for q in queries.captured_queries if MQS._meta.db_table in q['sql']])
+
+    def test_limit_invalido_responde_400(self):
+        for limit in ('0', '-1', '100000', 'x'):
+            with self.subTest(limit=limit):
+                self.assertEqual(self.client.get(f'{self.url}&limit={limit}').status_code, 400)
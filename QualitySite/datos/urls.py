@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import async_views, views
 
 urlpatterns = [
     # APIs básicas existentes
@@ -12,7 +12,21 @@ urlpatterns = [
     
     # Queries específicas
     path('stats/yield/', views.YieldStatsView.as_view(), name='yield-stats'),
+    path('stats/yield/rollup/', views.YieldRollupView.as_view(), name='yield-rollup'),
     path('stats/top-failures/', views.TopFailuresView.as_view(), name='top-failures'),
+    path('stats/repair-history/batch/', views.RepairHistoryBatchView.as_view(), name='repair-history-batch'),
     path('stats/repair-history/<str:track_id>/', views.RepairHistoryView.as_view(), name='repair-history'),
     path('stats/station-performance/', views.StationPerformanceView.as_view(), name='station-performance'),
+    path('stats/spc/', views.SPCView.as_view(), name='spc'),
+
+    # Versiones async (ASGI) de las vistas analíticas
+    path('async/dashboard/', async_views.AsyncDashboardView.as_view(), name='async-dashboard-summary'),
+    path('async/stats/yield/', async_views.AsyncYieldStatsView.as_view(), name='async-yield-stats'),
+    path('async/stats/top-failures/', async_views.AsyncTopFailuresView.as_view(), name='async-top-failures'),
+    path('async/stats/station-performance/', async_views.AsyncStationPerformanceView.as_view(), name='async-station-performance'),
+
+    # Snapshots Parquet para análisis offline
+    path('exports/<str:dataset>/', views.ParquetExportView.as_view(), name='parquet-export'),
+    path('exports/<str:dataset>/runs/<int:pk>/', views.ParquetExportRunView.as_view(), name='parquet-export-run'),
+    path('exports/<str:dataset>/<str:fecha>/', views.ParquetPartitionView.as_view(), name='parquet-partition'),
 ]
\ No newline at end of file
@@ -1,60 +1,104 @@
-from django.shortcuts import render
+import json
+import os
+import re
+from datetime import datetime, timedelta
+from django.core.serializers.json import DjangoJSONEncoder
+from django.core.exceptions import ImproperlyConfigured
+from django.http import FileResponse, Http404, StreamingHttpResponse
+from django.shortcuts import get_object_or_404, render
+from django.urls import reverse
+from django.utils import timezone
 from rest_framework.generics import ListAPIView
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, filters
 from django_filters.rest_framework import DjangoFilterBackend
-from .models import MQS, MES, YieldTurno
+from .models import MQS, MES, ExportRun, YieldTurno
 from .serializers import MQSSerializer, MESSerializer, YieldTurnoSerializer
+from .cache import CachedAnalyticsMixin
+from .filters import MQSFilter
+from .exports import DATASETS, list_partitions, partition_path, start_export
+from .mixins import SparseFieldsMixin, StreamingListMixin
+from .pagination import KeysetOrderingFilter, KeysetPagination
 
 # Importar las funciones de consulta
 # Si todavía no tienes estos módulos, deberás crearlos primero
 from .queries.mqs_queries import get_top_failures_by_family, get_station_performance
-from .queries.mes_queries import get_repair_history_by_trackid
-from .queries.yield_queries import get_yield_complete_stats
+from .queries.mes_queries import get_repair_history_by_trackid, iter_repair_histories
+from .queries.yield_queries import ALL, BUCKET_DAYS, get_yield_complete_stats, get_yield_rollup, is_rollup_key
 from .queries.dashboard_queries import get_dashboard_summary
+from .queries.spc_queries import CONTROL_CONSTANTS, get_spc_stats
 
 # Create your views here.
 
-class MQSListView(ListAPIView):
+class MQSListView(SparseFieldsMixin, StreamingListMixin, ListAPIView):
     queryset = MQS.objects.all()
     serializer_class = MQSSerializer
-    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, filters.SearchFilter]
-    filterset_fields = ['date', 'Family', 'Line', 'Station', 'Testcode', 'NTF', 'Prime']
-    ordering_fields = ['date', 'Time', 'TrackId']
-    search_fields = ['TrackId', 'Testcode', 'Testcode_Desc', 'Fail_Desc']
+    pagination_class = KeysetPagination
+    filter_backends = [DjangoFilterBackend, KeysetOrderingFilter, filters.SearchFilter]
+    # Solo columnas indexadas: cada orden es un keyset que recorre un índice
+    ordering_fields = ['ts', 'date', 'TrackId']
+    ordering = ['-ts']
+    filterset_class = MQSFilter
+    search_fields = ['TrackId', 'testcode_dim__code', 'testcode_dim__description', 'fail_desc_dim__name']
 
-class MESListView(ListAPIView):
+class MESListView(SparseFieldsMixin, StreamingListMixin, ListAPIView):
     queryset = MES.objects.all()
     serializer_class = MESSerializer
-    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, filters.SearchFilter]
-    filterset_fields = ['MODELO', 'NS', 'FECHA_REPARACION', 'POSICION', 'CODIGO_FALLA', 'CAUSA', 'ORIGEN', 'REPARADOR']
-    ordering_fields = ['FECHA_REPARACION', 'HORA_REPARACION', 'NS']
+    pagination_class = KeysetPagination
+    filter_backends = [DjangoFilterBackend, KeysetOrderingFilter, filters.SearchFilter]
+    ordering_fields = ['ts', 'NS']
+    ordering = ['-ts']
+    filterset_fields = {
+        'MODELO': ['exact'], 'NS': ['exact'], 'FECHA_REPARACION': ['exact'], 'ts': ['gte', 'lt'],
+        'POSICION': ['exact'], 'CODIGO_FALLA': ['exact'], 'CAUSA': ['exact'], 'ORIGEN': ['exact'], 'REPARADOR': ['exact'],
+    }
     search_fields = ['NS', 'COMENTARIO', 'CODIGO_FALLA']
 
-class YieldTurnoListView(ListAPIView):
+class YieldTurnoListView(SparseFieldsMixin, StreamingListMixin, ListAPIView):
     queryset = YieldTurno.objects.all()
     serializer_class = YieldTurnoSerializer
-    filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
+    pagination_class = KeysetPagination
+    filter_backends = [DjangoFilterBackend, KeysetOrderingFilter]
+    ordering_fields = ['date', 'Name']
+    ordering = ['-date']
     filterset_fields = ['date', 'Jornada', 'Turno', 'Line', 'Family', 'Process']
-    ordering_fields = ['date', 'FTY', 'DPHU', 'NTF', 'Prime_Handle']
 
-class DashboardView(APIView):
+MAX_DASHBOARD_DAYS = 3660
+MAX_TOP_FAILURES_LIMIT = 1000
+
+class DashboardView(CachedAnalyticsMixin, APIView):
     """
     Vista para el dashboard principal con resumen de estadísticas
     """
+    cache_endpoint = 'dashboard'
+
     def get(self, request):
         try:
-            days = request.query_params.get('days', 7)
-            data = get_dashboard_summary(days_back=int(days))
-            return Response(data)
+            days = int(request.query_params.get('days', 7))
+            if not 1 <= days <= MAX_DASHBOARD_DAYS:
+                raise ValueError
+        except ValueError:
+            return Response({"error": f"days debe ser un entero entre 1 y {MAX_DASHBOARD_DAYS}"},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            today = timezone.now().date()
+            return self.cached_response(
+                request,
+                lambda: get_dashboard_summary(date=today, days_back=days),
+                today - timedelta(days=days), today,
+                extra=today,
+            )
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-class YieldStatsView(APIView):
+class YieldStatsView(CachedAnalyticsMixin, APIView):
     """
     Vista para estadísticas completas de Yield
     """
+    cache_endpoint = 'yield-stats'
+
     def get(self, request):
         date_from = request.query_params.get('date_from')
         date_to = request.query_params.get('date_to')
@@ -66,24 +110,81 @@ class YieldStatsView(APIView):
                           status=status.HTTP_400_BAD_REQUEST)
             
         try:
-            stats = get_yield_complete_stats(date_from, date_to, family, line)
-            return Response(stats)
+            return self.cached_response(
+                request,
+                lambda: get_yield_complete_stats(date_from, date_to, family, line),
+                date_from, date_to,
+            )
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-class TopFailuresView(APIView):
+class TopFailuresView(CachedAnalyticsMixin, APIView):
     """
     Vista para obtener el top de fallas por familia
     """
+    cache_endpoint = 'top-failures'
+    cache_sources = ('mqs',)
+
     def get(self, request):
         family = request.query_params.get('family')
-        limit = int(request.query_params.get('limit', 10))
         date_from = request.query_params.get('date_from')
         date_to = request.query_params.get('date_to')
-        
         try:
-            failures = get_top_failures_by_family(family, limit, date_from, date_to)
-            return Response(failures)
+            limit = int(request.query_params.get('limit', 10))
+            if not 1 <= limit <= MAX_TOP_FAILURES_LIMIT:
+                raise ValueError
+        except ValueError:
+            return Response({"error": f"limit debe ser un entero entre 1 y {MAX_TOP_FAILURES_LIMIT}"},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            return self.cached_response(
+                request,
+                lambda: list(get_top_failures_by_family(family, limit, date_from, date_to)),
+                date_from, date_to,
+            )
+        except Exception as e:
+            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+MAX_ROLLUP_DAYS = 3660
+
+class YieldRollupView(APIView):
+    """
+    FTY/DPHU/NTF ponderados por volumen en ventanas móviles (por defecto 7 y
+    30 días) a partir de los acumulados diarios de Yield; costo constante por ventana
+    """
+    def get(self, request):
+        try:
+            fecha = request.query_params.get('date')
+            fecha = datetime.strptime(fecha, '%Y-%m-%d').date() if fecha else timezone.now().date()
+            windows = [int(w) for w in request.query_params.get('windows', '7,30').split(',') if w.strip()]
+            buckets = int(request.query_params.get('buckets', 12))
+            if not windows or not all(1 <= w <= MAX_ROLLUP_DAYS for w in windows) or not 1 <= buckets <= 366:
+                raise ValueError
+        except ValueError:
+            return Response({"error": f"date debe ser YYYY-MM-DD, windows una lista de días entre 1 y {MAX_ROLLUP_DAYS} y buckets entre 1 y 366"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        bucket = request.query_params.get('bucket')
+        if bucket and bucket not in BUCKET_DAYS:
+            return Response({"error": f"bucket debe ser uno de: {', '.join(BUCKET_DAYS)}"}, status=status.HTTP_400_BAD_REQUEST)
+        jornada = request.query_params.get('jornada', ALL)
+        turno = request.query_params.get('turno', ALL)
+        if not is_rollup_key(jornada, turno):
+            jornadas = ', '.join(valor for valor, _ in YieldTurno.JORNADA_CHOICES)
+            turnos = ', '.join(valor for valor, _ in YieldTurno.TURNO_CHOICES)
+            return Response({"error": f"jornada debe ser {ALL} o una de: {jornadas}; turno debe ser {ALL} o uno de: "
+                                      f"{turnos}, y solo se puede elegir turno junto con una jornada"},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            return Response(get_yield_rollup(
+                fecha,
+                windows=windows,
+                jornada=jornada,
+                turno=turno,
+                bucket=bucket,
+                buckets=buckets,
+            ))
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
@@ -93,15 +194,69 @@ class RepairHistoryView(APIView):
     """
     def get(self, request, track_id):
         try:
-            history = get_repair_history_by_trackid(track_id)
+            limit = request.query_params.get('limit')
+            limit = int(limit) if limit else None
+            offset = int(request.query_params.get('offset', 0))
+            if (limit is not None and limit < 0) or offset < 0:
+                raise ValueError
+        except ValueError:
+            return Response({"error": "limit y offset deben ser enteros no negativos"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            history = get_repair_history_by_trackid(track_id, limit=limit, offset=offset)
             return Response(history)
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-class StationPerformanceView(APIView):
+MAX_BATCH_TRACK_IDS = 20000
+
+class RepairHistoryBatchView(APIView):
+    """
+    Historial de reparaciones de muchos equipos en una sola llamada: POST con
+    `track_ids` (lista JSON o texto separado por comas/saltos de línea) o un
+    archivo `file` con un TrackId por línea. Responde NDJSON, una línea por
+    TrackId en el orden recibido.
+    """
+    def _track_ids(self, request):
+        archivo = request.FILES.get('file')
+        if archivo:
+            contenido = archivo.read().decode('utf-8-sig', errors='replace')
+            # Primera columna de cada línea; se ignora un encabezado "TrackId"
+            ids = [linea.split(',')[0].strip() for linea in contenido.splitlines()]
+            return [t for t in ids if t and t.lower() != 'trackid']
+
+        valores = request.data.getlist('track_ids') if hasattr(request.data, 'getlist') else request.data.get('track_ids')
+        if isinstance(valores, str):
+            valores = [valores]
+        if not isinstance(valores, list):
+            return None
+        ids = []
+        for valor in valores:
+            ids.extend(t for t in re.split(r'[\s,]+', str(valor)) if t)
+        return ids
+
+    def post(self, request):
+        track_ids = self._track_ids(request)
+        if not track_ids:
+            return Response({"error": "Se requiere una lista track_ids o un archivo file"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if len(track_ids) > MAX_BATCH_TRACK_IDS:
+            return Response({"error": f"Máximo {MAX_BATCH_TRACK_IDS} TrackIds por llamada"},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        cuerpo = (
+            json.dumps(history, cls=DjangoJSONEncoder) + '\n'
+            for history in iter_repair_histories(track_ids)
+        )
+        return StreamingHttpResponse(cuerpo, content_type='application/x-ndjson')
+
+class StationPerformanceView(CachedAnalyticsMixin, APIView):
     """
     Vista para analizar el rendimiento de estaciones
     """
+    cache_endpoint = 'station-performance'
+    cache_sources = ('mqs',)
+
     def get(self, request):
         date_from = request.query_params.get('date_from')
         date_to = request.query_params.get('date_to')
@@ -113,7 +268,128 @@ class StationPerformanceView(APIView):
                           status=status.HTTP_400_BAD_REQUEST)
             
         try:
-            stats = get_station_performance(date_from, date_to, line, family)
-            return Response(stats)
+            return self.cached_response(
+                request,
+                lambda: list(get_station_performance(date_from, date_to, line, family)),
+                date_from, date_to,
+            )
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+MAX_SPC_LIMIT = 1000
+
+class SPCView(CachedAnalyticsMixin, APIView):
+    """
+    Control estadístico de procesos por Station/Testcode: Cp/Cpk, cartas
+    X-bar/R e I-MR y violaciones de reglas de Western Electric
+    """
+    cache_endpoint = 'spc'
+    cache_sources = ('mqs',)
+
+    def get(self, request):
+        date_from = request.query_params.get('date_from')
+        date_to = request.query_params.get('date_to')
+        if not date_from or not date_to:
+            return Response({"error": "Se requieren parámetros date_from y date_to"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        try:
+            subgroup_size = int(request.query_params.get('subgroup_size', 5))
+            min_samples = int(request.query_params.get('min_samples', 10))
+            limit = int(request.query_params.get('limit', 50))
+        except ValueError:
+            return Response({"error": "subgroup_size, min_samples y limit deben ser enteros"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if subgroup_size not in CONTROL_CONSTANTS:
+            return Response({"error": f"subgroup_size debe estar entre {min(CONTROL_CONSTANTS)} y {max(CONTROL_CONSTANTS)}"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if not 1 <= limit <= MAX_SPC_LIMIT:
+            return Response({"error": f"limit debe estar entre 1 y {MAX_SPC_LIMIT}"},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            return self.cached_response(
+                request,
+                lambda: get_spc_stats(
+                    date_from, date_to,
+                    station=request.query_params.get('station'),
+                    testcode=request.query_params.get('testcode'),
+                    family=request.query_params.get('family'),
+                    line=request.query_params.get('line'),
+                    subgroup_size=subgroup_size,
+                    min_samples=max(2, min_samples),
+                    limit=limit,
+                ),
+                date_from, date_to,
+            )
+        except ImproperlyConfigured as e:
+            return Response({"error": str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        except Exception as e:
+            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+class ParquetExportView(APIView):
+    """
+    Snapshots Parquet particionados por fecha de un dataset (mqs, mes, yield).
+    GET lista las particiones exportadas; POST encola la exportación de las que
+    faltan y responde 202 con la URL de su estado en Location.
+    """
+    def get(self, request, dataset):
+        if dataset not in DATASETS:
+            raise Http404
+        try:
+            return Response({'dataset': dataset, 'partitions': list_partitions(dataset)})
+        except ImproperlyConfigured as e:
+            return Response({"error": str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+    def post(self, request, dataset):
+        if dataset not in DATASETS:
+            raise Http404
+        try:
+            run, _ = start_export(dataset)
+        except ImproperlyConfigured as e:
+            return Response({"error": str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        except Exception as e:
+            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        location = reverse('parquet-export-run', args=[dataset, run.pk])
+        return Response(
+            {'dataset': dataset, 'run': run.pk, 'status': run.status, 'status_url': request.build_absolute_uri(location)},
+            status=status.HTTP_202_ACCEPTED,
+            headers={'Location': location},
+        )
+
+class ParquetExportRunView(APIView):
+    """
+    Estado de una exportación lanzada con POST: running, ok (con las
+    particiones escritas) o error
+    """
+    def get(self, request, dataset, pk):
+        run = get_object_or_404(ExportRun, pk=pk, dataset=dataset)
+        return Response({
+            'dataset': run.dataset,
+            'run': run.pk,
+            'status': run.status,
+            'started_at': run.started_at,
+            'finished_at': run.finished_at,
+            'written': run.written,
+            'errors': run.errors,
+        })
+
+class ParquetPartitionView(APIView):
+    """
+    Descarga el archivo Parquet de una partición (fecha YYYY-MM-DD)
+    """
+    def get(self, request, dataset, fecha):
+        if dataset not in DATASETS:
+            raise Http404
+        try:
+            fecha = datetime.strptime(fecha, '%Y-%m-%d').date()
+        except ValueError:
+            return Response({"error": "Fecha inválida, se espera YYYY-MM-DD"}, status=status.HTTP_400_BAD_REQUEST)
+        path = partition_path(dataset, fecha)
+        if not os.path.exists(path):
+            raise Http404("Partición no exportada")
+        return FileResponse(
+            open(path, 'rb'),
+            as_attachment=True,
+            filename=f"{dataset}-{fecha.isoformat()}.parquet",
+            content_type='application/vnd.apache.parquet',
+        )
@@ -1,96 +1,125 @@
+import functools
 import logging
-from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.events import EVENT_JOB_ERROR
+from apscheduler.schedulers.blocking import BlockingScheduler
 from django_apscheduler.jobstores import DjangoJobStore
 from apscheduler.executors.pool import ThreadPoolExecutor
 from apscheduler.triggers.interval import IntervalTrigger
 from django_apscheduler.jobstores import register_events
-from django.core.management import call_command
+from django_apscheduler.models import DjangoJob
+from django_apscheduler.util import close_old_connections
+from QualitySite.datos.ingest.pipeline import run_pipeline
+from QualitySite.datos.partitions import PARTITIONED_TABLES, ensure_partitions
 
 logger = logging.getLogger(__name__)
 
-def start_scheduler():
+LEGACY_JOB_IDS = ['import_mes_job', 'import_mqs_job', 'import_yield_job']
+
+# SessionLock del proceso que ejecuta el scheduler (ver run_scheduler)
+_scheduler_lock = None
+
+class SchedulerLockLost(RuntimeError):
+    pass
+
+def requires_scheduler_lock(func):
     """
-    Inicializa el scheduler y registra los jobs.
+    Antes de cada ejecución comprueba que este proceso sigue teniendo el lock
+    del scheduler; si lo perdió, el job no corre y el scheduler se detiene
+    (otra instancia puede haberlo tomado)
     """
-    try:
-        # Configuración del scheduler
-        scheduler = BackgroundScheduler()
-        scheduler.add_jobstore(DjangoJobStore(), "default")
-        scheduler.add_executor(ThreadPoolExecutor(10))
-        register_events(scheduler)
-
-        # Registrar los jobs
-        scheduler.add_job(
-            import_mes_job,
-            trigger=IntervalTrigger(minutes=10),
-            id="import_mes_job",
-            replace_existing=True,
-        )
-        logger.info("Job 'import_mes_job' registrado para ejecutarse cada 10 minutos.")
-
-        scheduler.add_job(
-            import_mqs_job,
-            trigger=IntervalTrigger(minutes=10),
-            id="import_mqs_job",
-            replace_existing=True,
-        )
-        logger.info("Job 'import_mqs_job' registrado para ejecutarse cada 10 minutos.")
-
-        scheduler.add_job(
-            import_yield_job,
-            trigger=IntervalTrigger(minutes=10),
-            id="import_yield_job",
-            replace_existing=True,
-        )
-        logger.info("Job 'import_yield_job' registrado para ejecutarse cada 10 minutos.")
-
-        scheduler.add_job(
-            example_job,
-            trigger=IntervalTrigger(seconds=30),
-            id="example_job",
-            replace_existing=True,
-        )
-        logger.info("Job 'example_job' registrado para ejecutarse cada 30 segundos.")
-
-        # Iniciar el scheduler
-        scheduler.start()
-        logger.info("Scheduler iniciado correctamente.")
-    except Exception as e:
-        logger.error(f"Error al iniciar el scheduler: {e}")
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if _scheduler_lock is not None and not _scheduler_lock.held():
+            raise SchedulerLockLost(f"Se perdió el lock del scheduler; '{func.__name__}' no se ejecuta")
+        return func(*args, **kwargs)
+    return wrapper
 
-def import_mes_job():
+def build_scheduler(scheduler_class=BlockingScheduler, lock=None):
     """
-    Ejecuta el comando para importar datos de MES desde el CSV.
+    Crea el scheduler con sus jobs registrados, sin iniciarlo.
+    Lo usa el comando run_scheduler, que es el único proceso que debe ejecutarlo;
+    `lock` es el SessionLock que lo garantiza y que se verifica antes de cada job.
     """
-    try:
-        logger.info("Ejecutando job 'import_mes_job'...")
-        call_command('import_mes')
-        logger.info("Job 'import_mes_job' ejecutado correctamente.")
-    except Exception as e:
-        logger.error(f"Error en el job 'import_mes_job': {e}")
+    global _scheduler_lock
+    _scheduler_lock = lock
+
+    # Configuración del scheduler
+    scheduler = scheduler_class()
+    scheduler.add_jobstore(DjangoJobStore(), "default")
+    scheduler.add_executor(ThreadPoolExecutor(10))
+    register_events(scheduler)
+
+    def detener_si_perdio_el_lock(event):
+        if isinstance(event.exception, SchedulerLockLost):
+            logger.error(f"{event.exception}: se detiene el scheduler")
+            scheduler.shutdown(wait=False)
+
+    scheduler.add_listener(detener_si_perdio_el_lock, EVENT_JOB_ERROR)
+
+    # Los jobs por fuente de versiones anteriores quedaron persistidos en el
+    # jobstore: se eliminan para que no corran en paralelo con el pipeline
+    DjangoJob.objects.filter(id__in=LEGACY_JOB_IDS).delete()
+
+    # Registrar los jobs. max_instances=1 + coalesce: si un ciclo se demora, los
+    # ticks vencidos se agrupan en una sola ejecución en lugar de solaparse
+    scheduler.add_job(
+        ingest_pipeline_job,
+        trigger=IntervalTrigger(minutes=10),
+        id="ingest_pipeline_job",
+        max_instances=1,
+        coalesce=True,
+        replace_existing=True,
+    )
+    logger.info("Job 'ingest_pipeline_job' registrado para ejecutarse cada 10 minutos.")
+
+    scheduler.add_job(
+        ensure_partitions_job,
+        trigger=IntervalTrigger(hours=24),
+        id="ensure_partitions_job",
+        max_instances=1,
+        coalesce=True,
+        replace_existing=True,
+    )
+    logger.info("Job 'ensure_partitions_job' registrado para ejecutarse cada 24 horas.")
+
+    scheduler.add_job(
+        example_job,
+        trigger=IntervalTrigger(seconds=30),
+        id="example_job",
+        replace_existing=True,
+    )
+    logger.info("Job 'example_job' registrado para ejecutarse cada 30 segundos.")
+
+    return scheduler
 
-def import_mqs_job():
+@requires_scheduler_lock
+@close_old_connections
+def ingest_pipeline_job():
     """
-    Ejecuta el comando para importar datos de MQS desde el CSV.
+    Ejecuta un ciclo del pipeline de importación (MES, MQS y Yield).
     """
     try:
-        logger.info("Ejecutando job 'import_mqs_job'...")
-        call_command('import_mqs_csv')
-        logger.info("Job 'import_mqs_job' ejecutado correctamente.")
+        logger.info("Ejecutando job 'ingest_pipeline_job'...")
+        run = run_pipeline()
+        logger.info(f"Job 'ingest_pipeline_job' ejecutado: {run.status} en {run.duration:.1f}s.")
     except Exception as e:
-        logger.error(f"Error en el job 'import_mqs_job': {e}")
+        logger.error(f"Error en el job 'ingest_pipeline_job': {e}")
 
-def import_yield_job():
+@requires_scheduler_lock
+@close_old_connections
+def ensure_partitions_job():
     """
-    Ejecuta el comando para importar datos de YieldTurno desde el CSV.
+    Crea por adelantado las particiones mensuales de las tablas particionadas.
     """
     try:
-        logger.info("Ejecutando job 'import_yield_job'...")
-        call_command('import_yield_csv')
-        logger.info("Job 'import_yield_job' ejecutado correctamente.")
+        for table in PARTITIONED_TABLES:
+            creadas = ensure_partitions(table)
+            if creadas:
+                logger.info(f"Job 'ensure_partitions_job': particiones creadas {', '.join(creadas)}.")
     except Exception as e:
-        logger.error(f"Error en el job 'import_yield_job': {e}")
+        logger.error(f"Error en el job 'ensure_partitions_job': {e}")
 
+@requires_scheduler_lock
 def example_job():
     """
     Job de ejemplo que se ejecuta cada 30 segundos.
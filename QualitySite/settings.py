@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -103,6 +104,33 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Caché de las vistas analíticas. Por defecto en archivos para que la comparta el
+# proceso run_scheduler (que invalida al importar) con los workers web;
+# QUALITY_CACHE_BACKEND=locmem solo sirve con un único proceso.
+
+if os.environ.get('QUALITY_CACHE_BACKEND', 'file') == 'file':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': BASE_DIR / 'django_cache',
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'quality-analytics',
+        }
+    }
+
+ANALYTICS_CACHE_TIMEOUT = 60 * 60  # Segundos; las importaciones invalidan antes por versión
+
+# Snapshots Parquet particionados por fecha (comando export_parquet / endpoint /exports/)
+PARQUET_EXPORT_ROOT = os.environ.get('QUALITY_PARQUET_ROOT', BASE_DIR / 'exports')
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -168,6 +196,11 @@ LOGGING = {
             'level': 'DEBUG',
             'propagate': True,
         },
+        'QualitySite': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': True,
+        },
         'apscheduler': {
             'handlers': ['console'],
             'level': 'DEBUG',